@@ -1,32 +1,34 @@
 from typing import Any, Dict
 from app.agents.base_agent import BaseAgent
 from app.models.product_analysis import AgentVerdict, TrafficLightStatus
+from app.services.ingredient_normalizer import get_normalized_ingredients
+from app.services.keyword_matcher import compile_matcher
+
+PALM_OIL_MATCHER = compile_matcher(["palm oil"])
 
 class ActivistAgent(BaseAgent):
     """
     The Activist: Drafts emails or tweets to brands regarding specific ethical violations.
     """
+    profile_dependent = False
+
     def __init__(self):
         super().__init__(agent_name="The Activist")
 
     async def analyze(self, product_data: Dict[str, Any], context: Dict[str, Any] = None) -> AgentVerdict:
-        # The Activist only acts if there are issues found by other agents (Judge, Corporate Detective)
-        # In a real system, we would inspect the other verdicts. 
-        # Here, we'll re-run a quick check or rely on passed context if we had a shared state.
-        # For simplicity, let's check for "Palm Oil" or "Plastic" in the product data directly.
+        # The Activist acts on issues found directly in the product data, and on the
+        # ownership issues found by the Corporate Detective (passed in by the scheduler).
+        # For simplicity, we check for "Palm Oil" or "Plastic" in the product data directly.
+        upstream_verdicts = (context or {}).get("verdicts", {})
         
-        ingredients = product_data.get("ingredients", [])
+        ingredients = get_normalized_ingredients(product_data)
         packaging = product_data.get("packaging", "")
         brand = product_data.get("brand_owner") or product_data.get("brands", "Unknown Brand")
         
         actions = []
         
         # Check for Palm Oil violation
-        has_palm_oil = False
-        for ingredient in ingredients:
-            if isinstance(ingredient, str) and "palm oil" in ingredient.lower():
-                has_palm_oil = True
-                break
+        has_palm_oil = bool(PALM_OIL_MATCHER.keywords_found(ingredients))
         
         if has_palm_oil:
             tweet = f"Hey @{brand.replace(' ', '')}, why are you still using Palm Oil in {product_data.get('product_name')}? #Deforestation #EthicalLens"
@@ -39,6 +41,14 @@ class ActivistAgent(BaseAgent):
              tweet = f"Hey @{brand.replace(' ', '')}, please switch to sustainable packaging for {product_data.get('product_name')}! #EndPlasticWaste"
              actions.append({"type": "Tweet", "content": tweet})
 
+        # Check the parent company's track record
+        corporate_verdict = upstream_verdicts.get("Corporate Detective")
+        if corporate_verdict and corporate_verdict.details.get("issues"):
+            parent = corporate_verdict.details.get("parent_company")
+            issues = ", ".join(corporate_verdict.details["issues"])
+            email = f"Subject: Concern regarding {parent}'s record on {issues}\n\nDear {parent} Team,\n\nAs a customer of {brand}, I am concerned about..."
+            actions.append({"type": "Email Draft", "content": email})
+
         if actions:
             return AgentVerdict(
                 agent_name=self.agent_name,
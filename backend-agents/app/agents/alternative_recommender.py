@@ -1,13 +1,31 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 from app.agents.base_agent import BaseAgent
 from app.models.product_analysis import AgentVerdict, TrafficLightStatus
+from app.services.cache import data_fingerprint
+from app.services.carbon_estimator import catalog_product
+from app.services.ingredient_normalizer import get_normalized_ingredients, normalize_text
+from app.services.local_product_store import LocalProductStore
+from app.services.product_index import ProductIndex
+from app.services.profile_compiler import CompiledProfile, compile_profile
+
+# Similar products considered per recommendation, before the profile filters
+CANDIDATES_PER_RECOMMENDATION = 10
 
 class AlternativeRecommenderAgent(BaseAgent):
     """
     The Alternative Recommender: Suggests compliant alternatives if the scanned product is rejected.
+
+    With a similarity index over the local catalog, alternatives are the
+    products most similar to the scanned one (ingredients and name), minus
+    those containing one of the user's allergens or that the Judge would not
+    rate GREEN for their values, re-ranked by similarity times value score.
+    Without one, it falls back to a few curated alternatives per category.
     """
-    def __init__(self):
+    def __init__(self, index: Optional[ProductIndex] = None, store: Optional[LocalProductStore] = None, top_k: int = 5):
         super().__init__(agent_name="Alternative Recommender")
+        self.index = index if store is not None else None # Candidates are read back from the store
+        self.store = store
+        self.top_k = top_k
         # Mock Database of Alternatives
         # In reality, this would query a product DB filtering by user constraints
         self.alternatives_db = {
@@ -25,11 +43,34 @@ class AlternativeRecommenderAgent(BaseAgent):
             ]
         }
 
+    def data_version(self) -> str:
+        if self.index is None:
+            return data_fingerprint(self.alternatives_db)
+        return data_fingerprint([self.alternatives_db, self.index.version])
+
     async def analyze(self, product_data: Dict[str, Any], context: Dict[str, Any] = None) -> AgentVerdict:
         # Check if we need to recommend anything
-        # We look at the 'current_status' passed in context, or we assume we run after others
+        # The scheduler passes the Bio-Shield and Judge verdicts so we know why the product was rejected.
         # For simplicity, we'll always provide recommendations if we can match the category
-        
+        upstream_verdicts = (context or {}).get("verdicts", {})
+        triggered_by = [name for name, verdict in upstream_verdicts.items() if verdict.status != TrafficLightStatus.GREEN]
+
+        if self.index is not None:
+            user_profile = (context or {}).get("user_profile")
+            recommendations = self._recommend(product_data, compile_profile(user_profile) if user_profile else None)
+            if recommendations:
+                return AgentVerdict(
+                    agent_name=self.agent_name,
+                    score=100.0,
+                    status=TrafficLightStatus.GREEN, # Always Green as it's a helper
+                    reasoning=f"Found {len(recommendations)} similar alternatives in the product catalog.",
+                    details={
+                        "category": product_data.get("category"),
+                        "recommendations": recommendations,
+                        "triggered_by": triggered_by
+                    }
+                )
+
         # Try to guess category from product name or keywords
         product_name = product_data.get("product_name", "").lower()
         category = None
@@ -59,6 +100,61 @@ class AlternativeRecommenderAgent(BaseAgent):
             reasoning=f"Found {len(recommendations)} alternatives for category '{category}'.",
             details={
                 "category": category,
-                "recommendations": recommendations
+                "recommendations": recommendations,
+                "triggered_by": triggered_by
             }
         )
+
+    def _recommend(self, product_data: Dict[str, Any], profile: Optional[CompiledProfile]) -> List[Dict[str, Any]]:
+        """
+        Top-k similar catalog products that pass the profile's allergen and value filters.
+        """
+        name = normalize_text(product_data.get("product_name") or "")
+        exclude = [product_data["barcode"]] if product_data.get("barcode") else []
+        candidates = self.index.search(
+            product_data,
+            k=self.top_k * CANDIDATES_PER_RECOMMENDATION,
+            category=product_data.get("category") if product_data.get("category") in self.index.category_names else None,
+            exclude=exclude,
+        )
+        records = self.store.get_many(candidate.barcode for candidate in candidates)
+
+        # What the scanned product is being replaced for
+        scanned = get_normalized_ingredients(product_data)
+        scanned_allergens = profile.allergen_matcher.keywords_found(scanned) if profile else set()
+        scanned_values = profile.value_matcher.keywords_found(scanned) if profile else set()
+
+        ranked = []
+        for candidate in candidates:
+            if candidate.barcode not in records:
+                continue
+            record = records[candidate.barcode][0]
+            if normalize_text(record.get("product_name") or "") == name:
+                continue # The same product under another barcode
+            ingredients = catalog_product(record)["normalized_ingredients"]
+            value_score, avoided = 100.0, []
+            if profile:
+                if profile.allergen_matcher.keywords_found(ingredients):
+                    continue
+                found = profile.value_matcher.keywords_found(ingredients)
+                # The Judge's penalties: 50 points per conflicting keyword at full weight
+                for _, weight, keywords in profile.active_values:
+                    value_score -= sum(50.0 * weight for keyword in keywords if keyword in found)
+                value_score = max(0.0, value_score)
+                if value_score < 80:
+                    continue # Only alternatives the Judge rates GREEN
+                avoided = [keyword for keyword in sorted(scanned_allergens | scanned_values) if keyword not in found]
+            ranked.append((candidate.similarity * value_score / 100, candidate, record, avoided))
+
+        ranked.sort(key=lambda item: item[0], reverse=True)
+        return [
+            {
+                "name": record.get("product_name") or "Unknown",
+                "barcode": candidate.barcode,
+                "brand": record.get("brands"),
+                "reason": f"Similar product without {', '.join(avoided)}" if avoided else "Similar product",
+                "similarity": candidate.similarity,
+                "score": round(score, 4),
+            }
+            for score, candidate, record, avoided in ranked[:self.top_k]
+        ]
@@ -1,5 +1,6 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Sequence
 from app.models.product_analysis import AgentVerdict
 
 class BaseAgent(ABC):
@@ -8,6 +9,10 @@ class BaseAgent(ABC):
     Enforces a common interface for analysis and verdict generation.
     """
 
+    # Whether the verdict depends on context["user_profile"]. Profile-independent
+    # agents are run once per product and their verdicts shared by every user.
+    profile_dependent = True
+
     def __init__(self, agent_name: str):
         self.agent_name = agent_name
 
@@ -24,3 +29,19 @@ class BaseAgent(ABC):
             AgentVerdict: The agent's findings, score, and status.
         """
         pass
+
+    async def analyze_batch(self, products: Sequence[Dict[str, Any]], contexts: Sequence[Optional[Dict[str, Any]]]) -> List[AgentVerdict]:
+        """
+        Analyzes many products at once, products[i] with contexts[i]; returns the
+        verdicts in the same order. Agents with per-call setup (profile compilation,
+        upstream calls) override this to do that work once for the whole batch.
+        """
+        return list(await asyncio.gather(*(self.analyze(product, context) for product, context in zip(products, contexts))))
+
+    def data_version(self) -> Optional[str]:
+        """
+        Version stamp of the reference data the agent's verdicts depend on
+        (brand DB, recycling rules, ...), or None if it has none.
+        Cached analyses computed against another version are discarded.
+        """
+        return None
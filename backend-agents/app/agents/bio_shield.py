@@ -1,7 +1,31 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
 from app.agents.base_agent import BaseAgent
 from app.models.product_analysis import AgentVerdict, TrafficLightStatus
 from app.models.user_profile import UserProfile
+from app.services.cache import data_fingerprint
+from app.services.ingredient_normalizer import NormalizedIngredients, get_normalized_ingredients
+from app.services.keyword_matcher import KeywordMatcher, compile_matcher
+from app.services.nutrient_rules import nutrient_rules, product_nutriments
+from app.services.profile_compiler import CompiledProfile, compile_profile
+from app.services.regulation_index import RegionRules, regulation_index
+
+# Simple keyword lists for now
+RESTRICTED_KEYWORDS = ["alcohol", "wine", "beer", "caffeine", "coffee", "energy drink"] # Not for minors
+TOXINS = ["paraben", "sulfate", "phthalate", "formaldehyde", "triclosan"]
+
+RESTRICTED_MATCHER = compile_matcher(RESTRICTED_KEYWORDS)
+TOXIN_MATCHER = compile_matcher(TOXINS)
+
+class ProductScan(NamedTuple):
+    """
+    The profile-independent part of the checks on one product, shared by every profile it is checked against.
+    """
+    ingredients: NormalizedIngredients
+    allergens_by_text: Dict[int, Set[str]] # Ingredient index -> allergens (of any profile in the batch) it contains
+    restricted_found: Set[str]
+    toxin_matches: Dict[str, List[int]]
+    banned_by_text: Dict[int, Set[str]] # Ingredient index -> ingredients banned in some region it contains
+    limited_additives: List[Tuple[str, float, str]] # Additives with a declared percentage and a limit in some region
 
 class BioShieldAgent(BaseAgent):
     """
@@ -10,33 +34,90 @@ class BioShieldAgent(BaseAgent):
     def __init__(self):
         super().__init__(agent_name="Bio-Shield")
 
+    def data_version(self) -> str:
+        return data_fingerprint([nutrient_rules.version, regulation_index.version])
+
     async def analyze(self, product_data: Dict[str, Any], context: Dict[str, Any] = None) -> AgentVerdict:
-        user_profile: UserProfile = context.get("user_profile")
-        if not user_profile:
-            return AgentVerdict(
-                agent_name=self.agent_name,
-                score=0.0,
-                status=TrafficLightStatus.YELLOW,
-                reasoning="No user profile provided for health check.",
-                details={}
-            )
+        return (await self.analyze_batch([product_data], [context]))[0]
 
-        ingredients = product_data.get("ingredients", [])
-        # Ensure ingredients is a list of strings
-        if not isinstance(ingredients, list):
-            ingredients = []
-            
-        allergens = user_profile.health_profile.allergens
-        
-        # 1. Allergen Check
-        detected_allergens = []
-        for ingredient in ingredients:
-            if not isinstance(ingredient, str):
+    async def analyze_batch(self, products: Sequence[Dict[str, Any]], contexts: Sequence[Optional[Dict[str, Any]]]) -> List[AgentVerdict]:
+        """
+        Each distinct product is scanned once for every profile in the batch (one
+        pass for all their allergens together), each distinct profile is compiled
+        once, and the nutrient rules are evaluated for all products and profiles
+        in one vectorized pass. Works for a pantry (one profile, many products) as
+        well as a household (one product, many profiles). With a region in the
+        context, ingredients are also checked against its regulations (one scan
+        for every region).
+        """
+        verdicts: List[Optional[AgentVerdict]] = [None] * len(products)
+        compiled: Dict[int, CompiledProfile] = {}
+        items: List[Tuple[int, CompiledProfile, Optional[RegionRules]]] = []
+        for i, context in enumerate(contexts):
+            user_profile: UserProfile = (context or {}).get("user_profile")
+            if not user_profile:
+                verdicts[i] = AgentVerdict(
+                    agent_name=self.agent_name,
+                    score=0.0,
+                    status=TrafficLightStatus.YELLOW,
+                    reasoning="No user profile provided for health check.",
+                    details={}
+                )
                 continue
-            for allergen in allergens:
-                if allergen.lower() in ingredient.lower():
-                    detected_allergens.append(ingredient)
-                    break
+            # Normalized allergens, rules and matchers, compiled once per distinct profile
+            profile = compiled.get(id(user_profile))
+            if profile is None:
+                profile = compiled[id(user_profile)] = compile_profile(user_profile)
+            items.append((i, profile, regulation_index.get((context or {}).get("region"))))
+        if not items:
+            return verdicts
+
+        rows: Dict[int, int] = {} # Distinct products, by identity
+        distinct: List[Dict[str, Any]] = []
+        for i, _, _ in items:
+            if id(products[i]) not in rows:
+                rows[id(products[i])] = len(distinct)
+                distinct.append(products[i])
+
+        profiles = list({profile.fingerprint: profile for _, profile, _ in items}.values())
+        allergen_matcher = compile_matcher(dict.fromkeys(a for profile in profiles for a in profile.allergens))
+        any_minor = any(profile.is_minor for profile in profiles)
+        any_region = any(region is not None for _, _, region in items)
+        scans = [self._scan(product, allergen_matcher, any_minor, any_region) for product in distinct]
+
+        # Disease Guard: products x rules, once for the whole rule set every profile's rules come from
+        nutriments = [product_nutriments(product) for product in distinct]
+        hits: Dict[int, Any] = {}
+        for profile in profiles:
+            parent = profile.nutrient_guard.parent
+            if len(profile.nutrient_guard) and id(parent) not in hits:
+                hits[id(parent)] = parent.evaluate(parent.matrix(nutriments))
+
+        for i, profile, region in items:
+            row = rows[id(products[i])]
+            guard = profile.nutrient_guard
+            nutrient_warnings = guard.warnings_from(hits[id(guard.parent)][row, guard.indices], nutriments[row]) if len(guard) else []
+            verdicts[i] = self._check(scans[row], profile, nutrient_warnings, region)
+        return verdicts
+
+    @staticmethod
+    def _scan(product_data: Dict[str, Any], allergen_matcher: KeywordMatcher, restricted: bool, regulated: bool) -> ProductScan:
+        # Canonical ingredients, normalized once per product by the pipeline
+        ingredients = get_normalized_ingredients(product_data)
+        return ProductScan(
+            ingredients=ingredients,
+            allergens_by_text=allergen_matcher.keywords_by_text(ingredients),
+            restricted_found=RESTRICTED_MATCHER.keywords_found(ingredients) if restricted else set(),
+            toxin_matches=TOXIN_MATCHER.texts_by_keyword(ingredients),
+            banned_by_text=regulation_index.scan_banned(ingredients) if regulated else {},
+            limited_additives=regulation_index.scan_additives(product_data) if regulated else [],
+        )
+
+    def _check(self, scan: ProductScan, profile: CompiledProfile, nutrient_warnings: List[str], region: Optional[RegionRules] = None) -> AgentVerdict:
+        ingredients = scan.ingredients
+
+        # 1. Allergen Check
+        detected_allergens = [ingredients.raw[i] for i, found in sorted(scan.allergens_by_text.items()) if not found.isdisjoint(profile.allergens)]
         
         if detected_allergens:
              return AgentVerdict(
@@ -47,52 +128,47 @@ class BioShieldAgent(BaseAgent):
                 details={"detected_allergens": detected_allergens}
             )
 
-        # 2. Disease Guard (Diabetes, Hypertension)
-        conditions = user_profile.health_profile.conditions
-        nutriments = product_data.get("raw_data", {}).get("nutriments", {})
-        
-        warnings = []
-        
-        # Diabetes Check (High Sugar)
-        if "Diabetes" in conditions:
-            sugars_100g = nutriments.get("sugars_100g", 0)
-            if sugars_100g > 10: # Threshold: 10g/100g
-                warnings.append(f"High Sugar ({sugars_100g}g/100g) - Risk for Diabetes")
-
-        # Hypertension Check (High Sodium)
-        if "Hypertension" in conditions:
-            salt_100g = nutriments.get("salt_100g", 0)
-            if salt_100g > 1.5: # Threshold: 1.5g/100g (High salt)
-                warnings.append(f"High Salt ({salt_100g}g/100g) - Risk for Hypertension")
-
-        # 3. Age Check
-        age = user_profile.health_profile.age
-        if age is not None and age < 18:
+        # 2. Regional regulations: ingredients banned where the user is
+        if region is not None:
+            banned = regulation_index.banned_in(scan.banned_by_text, region)
+            if banned:
+                return AgentVerdict(
+                    agent_name=self.agent_name,
+                    score=0.0,
+                    status=TrafficLightStatus.RED,
+                    reasoning="Contains ingredients banned in your region: " + ", ".join(f"{ingredients.raw[b.text_index]} (banned in {b.banned_in})" for b in banned),
+                    details={"banned_ingredients": [ingredients.raw[b.text_index] for b in banned], "region": region.region_code}
+                )
+
+        # 3. Disease Guard (e.g. Diabetes -> sugar, Hypertension -> salt), evaluated by analyze_batch
+        warnings = list(nutrient_warnings)
+
+        # 4. Age Check
+        age = profile.age
+        if profile.is_minor:
             # Check for Alcohol or High Caffeine
-            # Simple keyword check for now
-            restricted_keywords = ["alcohol", "wine", "beer", "caffeine", "coffee", "energy drink"]
-            for keyword in restricted_keywords:
-                for ingredient in ingredients:
-                     if isinstance(ingredient, str) and keyword in ingredient.lower():
-                        warnings.append(f"Contains {keyword} - Not recommended for age {age}")
-                        break
-
-        # 4. Contraindication Guard (Mock)
+            for keyword in RESTRICTED_KEYWORDS:
+                if keyword in scan.restricted_found:
+                    warnings.append(f"Contains {keyword} - Not recommended for age {age}")
+
+        # 5. Contraindication Guard (Mock)
         # Example: MAOIs vs Aged Cheese (Tyramine)
         # In a real app, we'd check user medications against food interactions
-        if "MAOI" in user_profile.health_profile.dietary_restrictions: # Using dietary_restrictions field for meds mock
-             if "cheese" in [i.lower() for i in ingredients if isinstance(i, str)]:
+        if profile.takes_maoi:
+             if "cheese" in ingredients.texts:
                  warnings.append("Potential Interaction: Cheese contains Tyramine (avoid with MAOIs)")
 
-        # 5. Cosmetic Safety Guard
+        # 6. Cosmetic Safety Guard
         # Check for common harmful chemicals in beauty products
-        category = product_data.get("category", "unknown")
-        if category == "beauty" or True: # Check everywhere for now, as these shouldn't be in food either
-            toxins = ["paraben", "sulfate", "phthalate", "formaldehyde", "triclosan"]
-            for toxin in toxins:
-                for ingredient in ingredients:
-                    if isinstance(ingredient, str) and toxin in ingredient.lower():
-                        warnings.append(f"Contains {ingredient} (Potential Toxin: {toxin.title()})")
+        # (everywhere for now, as these shouldn't be in food either)
+        for toxin in TOXINS:
+            for i in scan.toxin_matches.get(toxin, []):
+                warnings.append(f"Contains {ingredients.raw[i]} (Potential Toxin: {toxin.title()})")
+
+        # 7. Regional additive limits, for the ingredients with a declared percentage
+        if region is not None:
+            for excess in regulation_index.additive_excesses(scan.limited_additives, region):
+                warnings.append(f"{excess.text} ({excess.percent}%) exceeds the {excess.limit}% limit in {excess.limited_in}")
 
         if warnings:
             return AgentVerdict(
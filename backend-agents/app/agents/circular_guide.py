@@ -1,11 +1,19 @@
 from typing import Any, Dict
 from app.agents.base_agent import BaseAgent
 from app.models.product_analysis import AgentVerdict, TrafficLightStatus
+from app.services.cache import data_fingerprint
+from app.services.regulation_index import regulation_index
 
 class CircularGuideAgent(BaseAgent):
     """
     The Circular Guide: Provides local recycling advice based on product packaging and user location.
+
+    With a region in the context, advice comes from the regulation index: the
+    first material named in the packaging that the region, or a parent
+    region, has a rule for. Otherwise the default rules below apply.
     """
+    profile_dependent = False # Location comes from the shared context, not the profile
+
     def __init__(self):
         super().__init__(agent_name="Circular Guide")
         # Mock Local Recycling Rules DB
@@ -24,16 +32,23 @@ class CircularGuideAgent(BaseAgent):
             }
         }
 
+    def data_version(self) -> str:
+        return data_fingerprint([self.recycling_rules, regulation_index.version])
+
     async def analyze(self, product_data: Dict[str, Any], context: Dict[str, Any] = None) -> AgentVerdict:
         # Extract packaging info (Mocking extraction from raw data if not present)
         packaging = product_data.get("packaging", "Plastic") # Default to Plastic if unknown
         
-        # Determine location (Mocking location from context or default)
-        location = context.get("location", "default")
-        
-        rules = self.recycling_rules.get(location, self.recycling_rules["default"])
-        
-        advice = rules.get(packaging)
+        # Determine location: the region's rules if it has any, the mock rules otherwise
+        region = regulation_index.get((context or {}).get("region"))
+        if region is not None:
+            location = region.region_code
+            found = regulation_index.recycling_advice(packaging, region)
+            advice = found[1] if found else None
+        else:
+            location = (context or {}).get("location", "default")
+            rules = self.recycling_rules.get(location, self.recycling_rules["default"])
+            advice = rules.get(packaging)
         if not advice:
             # Fallback for unknown materials
             advice = "Check local guidelines. Status unknown."
@@ -1,20 +1,22 @@
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 from app.agents.base_agent import BaseAgent
+from app.config import settings
 from app.models.product_analysis import AgentVerdict, TrafficLightStatus
+from app.services.brand_graph import DEFAULT_BRAND_OWNERSHIP_PATH, BrandGraph
 
 class CorporateDetectiveAgent(BaseAgent):
     """
     The Corporate Detective: Traces brand ownership to find parent companies and their ethical track record.
     """
-    def __init__(self):
+    profile_dependent = False
+
+    def __init__(self, brand_graph: Optional[BrandGraph] = None):
         super().__init__(agent_name="Corporate Detective")
-        # Mock Knowledge Graph / Database
-        self.brand_ownership_db = {
-            "Ben & Jerry's": {"parent": "Unilever", "issues": ["Plastic Pollution", "Palm Oil"]},
-            "Oatly": {"parent": "Oatly Group", "investors": ["Blackstone"], "issues": ["Deforestation links (via investor)"]},
-            "Innocent Drinks": {"parent": "Coca-Cola", "issues": ["Plastic Pollution", "Water Usage"]},
-            "Seventh Generation": {"parent": "Unilever", "issues": ["Plastic Pollution"]}
-        }
+        # Brand ownership knowledge graph (app/data/brand_ownership.json unless configured otherwise)
+        self.brand_graph = brand_graph or BrandGraph.from_file(settings.brand_ownership_path or DEFAULT_BRAND_OWNERSHIP_PATH)
+
+    def data_version(self) -> str:
+        return self.brand_graph.version
 
     async def analyze(self, product_data: Dict[str, Any], context: Dict[str, Any] = None) -> AgentVerdict:
         brand = product_data.get("brand_owner") or product_data.get("brands")
@@ -28,17 +30,9 @@ class CorporateDetectiveAgent(BaseAgent):
                 details={}
             )
 
-        # Simple fuzzy match for mock DB
-        parent_info = None
-        matched_brand = None
-        
-        for db_brand, info in self.brand_ownership_db.items():
-            if db_brand.lower() in brand.lower():
-                parent_info = info
-                matched_brand = db_brand
-                break
+        record = self.brand_graph.resolve(brand)
         
-        if not parent_info:
+        if not record:
              return AgentVerdict(
                 agent_name=self.agent_name,
                 score=100.0,
@@ -47,8 +41,8 @@ class CorporateDetectiveAgent(BaseAgent):
                 details={"brand_checked": brand}
             )
 
-        parent_name = parent_info.get("parent")
-        issues = parent_info.get("issues", [])
+        parent_name = record.parent
+        issues = list(record.issues)
         
         score = 100.0
         if issues:
@@ -62,14 +56,20 @@ class CorporateDetectiveAgent(BaseAgent):
         elif score < 80:
             status = TrafficLightStatus.YELLOW
 
+        reasoning = f"Brand '{record.name}' is owned by '{parent_name}'"
+        if record.ultimate_parent not in (record.name, parent_name):
+            reasoning += f" (ultimately '{record.ultimate_parent}')"
         return AgentVerdict(
             agent_name=self.agent_name,
             score=score,
             status=status,
-            reasoning=f"Brand '{matched_brand}' is owned by '{parent_name}', associated with: {', '.join(issues)}.",
+            reasoning=f"{reasoning}, associated with: {', '.join(issues)}.",
             details={
                 "parent_company": parent_name,
+                "ultimate_parent": record.ultimate_parent,
                 "issues": issues,
-                "ownership_trace": f"{matched_brand} -> {parent_name}"
+                "investors": list(record.investors),
+                "ownership_path": list(record.ownership_path),
+                "ownership_trace": " -> ".join(record.ownership_path)
             }
         )
@@ -1,7 +1,10 @@
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Sequence, Set
 from app.agents.base_agent import BaseAgent
 from app.models.product_analysis import AgentVerdict, TrafficLightStatus
 from app.models.user_profile import UserProfile
+from app.services.ingredient_normalizer import get_normalized_ingredients
+from app.services.keyword_matcher import compile_matcher
+from app.services.profile_compiler import CompiledProfile, compile_profile
 
 class JudgeAgent(BaseAgent):
     """
@@ -11,48 +14,58 @@ class JudgeAgent(BaseAgent):
         super().__init__(agent_name="Judge")
 
     async def analyze(self, product_data: Dict[str, Any], context: Dict[str, Any] = None) -> AgentVerdict:
-        user_profile: UserProfile = context.get("user_profile")
-        if not user_profile:
-             return AgentVerdict(
-                agent_name=self.agent_name,
-                score=50.0,
-                status=TrafficLightStatus.YELLOW,
-                reasoning="No user profile provided for value judgment.",
-                details={}
-            )
+        return (await self.analyze_batch([product_data], [context]))[0]
 
+    async def analyze_batch(self, products: Sequence[Dict[str, Any]], contexts: Sequence[Optional[Dict[str, Any]]]) -> List[AgentVerdict]:
+        """
+        Compiles each distinct profile once, and scans each distinct product once
+        for the value keywords of every profile in the batch.
+        """
+        verdicts: List[Optional[AgentVerdict]] = [None] * len(products)
+        compiled: Dict[int, CompiledProfile] = {}
+        items = []
+        for i, context in enumerate(contexts):
+            user_profile: UserProfile = (context or {}).get("user_profile")
+            if not user_profile:
+                verdicts[i] = AgentVerdict(
+                    agent_name=self.agent_name,
+                    score=50.0,
+                    status=TrafficLightStatus.YELLOW,
+                    reasoning="No user profile provided for value judgment.",
+                    details={}
+                )
+                continue
+            # Active value categories and their matcher, compiled once per distinct profile
+            profile = compiled.get(id(user_profile))
+            if profile is None:
+                profile = compiled[id(user_profile)] = compile_profile(user_profile)
+            items.append((i, user_profile, profile))
+
+        value_matcher = compile_matcher(dict.fromkeys(k for profile in compiled.values() for k in profile.value_matcher.keywords))
+        found: Dict[int, Set[str]] = {} # Value keywords in each distinct product
+        for i, user_profile, profile in items:
+            product_data = products[i]
+            if id(product_data) not in found:
+                # Canonical ingredients, normalized once per product by the pipeline
+                found[id(product_data)] = value_matcher.keywords_found(get_normalized_ingredients(product_data))
+            verdicts[i] = self._judge(user_profile, profile, found[id(product_data)])
+        return verdicts
+
+    def _judge(self, user_profile: UserProfile, profile: CompiledProfile, found: Set[str]) -> AgentVerdict:
         weights = user_profile.value_profile.weights
-        ingredients = product_data.get("ingredients", [])
-        # Ensure ingredients is a list of strings
-        if not isinstance(ingredients, list):
-            ingredients = []
-            
+
         score = 100.0
         reasons = []
         
-        # Define some simple keyword maps for values (in a real app, this would be a Knowledge Graph or DB)
-        value_keywords = {
-            "palm_oil": ["palm oil", "palmitate", "palm kernel"],
-            "animal_welfare": ["gelatin", "lard", "tallow"], # Simple check for non-vegan items as proxy
-            "plastic_waste": [], # Hard to check from ingredients alone
-            "fair_labor": [] # Hard to check from ingredients alone
-        }
-
-        for value_category, weight in weights.items():
-            if weight <= 0:
-                continue
-                
-            keywords = value_keywords.get(value_category, [])
+        for value_category, weight, keywords in profile.active_values:
             for keyword in keywords:
-                for ingredient in ingredients:
-                    if isinstance(ingredient, str) and keyword.lower() in ingredient.lower():
-                        # Penalty proportional to weight. 
-                        # If weight is 1.0 (Critical), penalty is high (e.g., -50).
-                        # If weight is 0.5, penalty is -25.
-                        penalty = 50.0 * weight
-                        score -= penalty
-                        reasons.append(f"Found {keyword} ({value_category} conflict)")
-                        break # Count once per category
+                if keyword in found:
+                    # Penalty proportional to weight. 
+                    # If weight is 1.0 (Critical), penalty is high (e.g., -50).
+                    # If weight is 0.5, penalty is -25.
+                    penalty = 50.0 * weight
+                    score -= penalty
+                    reasons.append(f"Found {keyword} ({value_category} conflict)")
         
         # Normalize score
         score = max(0.0, min(100.0, score))
@@ -6,6 +6,8 @@ class LocalvoreScoutAgent(BaseAgent):
     """
     The Localvore Scout: Calculates "Food Miles" by detecting the Country of Origin.
     """
+    profile_dependent = False # Compares against a fixed user country
+
     def __init__(self):
         super().__init__(agent_name="Localvore Scout")
         # Mock User Location (Ideally this comes from the mobile app context)
@@ -1,19 +1,63 @@
-from typing import Any, Dict
+import asyncio
+import time
+from typing import Any, Dict, NamedTuple, Optional, Sequence
 from app.agents.base_agent import BaseAgent
 from app.models.product_analysis import AgentVerdict, TrafficLightStatus
+from app.services.cache import MISSING
+from app.services.circuit_breaker import CircuitOpenError
 from app.services.open_food_facts import OpenFoodFactsClient
 from app.services.open_beauty_facts import OpenBeautyFactsClient
 from app.services.general_product import GeneralProductClient
+from app.services.local_product_store import LocalProductStore
+from app.services.product_cache import ProductCache
+
+class ProductLookup(NamedTuple):
+    """
+    Outcome of resolving a barcode against the product sources.
+    """
+    product_info: Optional[Dict[str, Any]]
+    source: Optional[str]
+    category: Optional[str]
+    source_timings: Dict[str, Dict[str, Any]]
+    cache_status: str = "disabled"
 
 class ResearcherAgent(BaseAgent):
     """
     The Researcher: Fetches product data from external APIs (Open Food Facts, Open Beauty Facts, etc.).
+
+    Lookup modes:
+        "sequential": try each source in priority order until one answers.
+        "hedged": query every source concurrently and keep the highest-priority answer,
+                  cancelling lower-priority calls as soon as a better-ranked source has answered.
     """
-    def __init__(self):
+    LOOKUP_MODES = ("sequential", "hedged")
+
+    def __init__(
+        self,
+        lookup_mode: str = "hedged",
+        product_cache: Optional[ProductCache] = None,
+        local_store: Optional[LocalProductStore] = None,
+        http_client=None,
+    ):
         super().__init__(agent_name="Researcher")
-        self.off_client = OpenFoodFactsClient()
-        self.obf_client = OpenBeautyFactsClient()
+        if lookup_mode not in self.LOOKUP_MODES:
+            raise ValueError(f"Unknown lookup mode '{lookup_mode}', expected one of {self.LOOKUP_MODES}")
+        self.lookup_mode = lookup_mode
+        self.product_cache = product_cache
+        self.local_store = local_store
+        # The real pooled HTTP client, or the simulator's (see app.services.simulator)
+        self.off_client = OpenFoodFactsClient(http_client=http_client)
+        self.obf_client = OpenBeautyFactsClient(http_client=http_client)
         self.general_client = GeneralProductClient()
+
+        # Sources in priority order: (source name, category, fetcher)
+        # A category of None means the record carries its own category.
+        self.sources = [
+            ("Open Food Facts", "food", self._fetch_off),
+            ("Open Beauty Facts", "beauty", self._fetch_obf),
+            ("General Web Search", "general", self._fetch_general),
+            ("Demo Database", None, self._fetch_demo),
+        ]
         
         # Fallback data for demo purposes (if API fails or product missing)
         self.demo_db = {
@@ -74,40 +118,42 @@ class ResearcherAgent(BaseAgent):
                 details={}
             )
 
-        print(f"[{self.agent_name}] Fetching data for barcode: {barcode}")
-        
-        # 1. Try Open Food Facts
-        product_info = await self.off_client.get_product_by_barcode(barcode)
-        source = "Open Food Facts"
-        category = "food"
+        print(f"[{self.agent_name}] Fetching data for barcode: {barcode} ({self.lookup_mode})")
 
-        # 2. Try Open Beauty Facts if not found
-        if not product_info:
-             print(f"[{self.agent_name}] Not found in OFF, trying Open Beauty Facts...")
-             product_info = await self.obf_client.get_product_by_barcode(barcode)
-             if product_info:
-                 source = "Open Beauty Facts"
-                 category = "beauty"
+        return self._verdict(await self._lookup(barcode))
 
-        # 3. Try General Product Search (Universal Fallback)
-        if not product_info:
-            print(f"[{self.agent_name}] Not found in OBF, trying General Product Search...")
-            general_data = await self.general_client.get_product_by_barcode(barcode)
-            if general_data:
-                product_info = general_data
-                source = "General Web Search"
-                category = "general"
-                # Map general data to expected format
-                product_info["ingredients_text"] = ", ".join(general_data.get("materials", []))
-                product_info["brands"] = general_data.get("brand")
-                product_info["origins"] = general_data.get("origin")
-
-        # 4. Fallback to demo DB if not found
-        if not product_info and barcode in self.demo_db:
-            print(f"[{self.agent_name}] Using DEMO DATA for barcode: {barcode}")
-            product_info = self.demo_db[barcode]
-            source = "Demo Database"
-            category = product_info.get("category", "unknown")
+    async def analyze_many(self, barcodes: Sequence[str], max_concurrency: int = 16) -> Dict[str, Any]:
+        """
+        Bulk variant of analyze for a list of barcodes (a pantry, a receipt): the
+        local product store is read in one query, the other barcodes are looked up
+        max_concurrency at a time. Returns each distinct barcode's verdict, or the
+        exception its lookup raised.
+        """
+        barcodes = list(dict.fromkeys(barcodes))
+        results: Dict[str, Any] = {}
+        if self.local_store is not None and barcodes:
+            start = time.perf_counter()
+            stored = self.local_store.get_many(barcodes)
+            elapsed_ms = round((time.perf_counter() - start) * 1000, 3)
+            for barcode, (product_info, source, category) in stored.items():
+                timings = {"Local Product Store": {"elapsed_ms": elapsed_ms, "outcome": "hit"}}
+                results[barcode] = self._verdict(ProductLookup(product_info, source, category, timings, "local"))
+
+        remaining = [barcode for barcode in barcodes if barcode not in results]
+        if remaining:
+            print(f"[{self.agent_name}] Fetching data for {len(remaining)} barcodes ({self.lookup_mode})")
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def lookup(barcode: str) -> AgentVerdict:
+            async with semaphore:
+                return self._verdict(await self._lookup_cached(barcode))
+
+        outcomes = await asyncio.gather(*(lookup(barcode) for barcode in remaining), return_exceptions=True)
+        results.update(zip(remaining, outcomes))
+        return results
+
+    def _verdict(self, lookup: ProductLookup) -> AgentVerdict:
+        product_info, source, category = lookup.product_info, lookup.source, lookup.category
 
         if not product_info:
              return AgentVerdict(
@@ -115,7 +161,7 @@ class ResearcherAgent(BaseAgent):
                 score=50.0, # Neutral score for unknown product
                 status=TrafficLightStatus.YELLOW,
                 reasoning="Product not found in Open Food/Beauty Facts (and no demo data).",
-                details={}
+                details={"source_timings": lookup.source_timings, "cache_status": lookup.cache_status}
             )
 
         # Extract relevant details
@@ -143,6 +189,145 @@ class ResearcherAgent(BaseAgent):
                 "brand_owner": brands,
                 "ingredients": ingredients_list,
                 "packaging": packaging,
-                "raw_data": product_info 
+                "raw_data": product_info,
+                "lookup_mode": self.lookup_mode,
+                "source_timings": lookup.source_timings,
+                "cache_status": lookup.cache_status
             }
         )
+
+    async def _lookup(self, barcode: str) -> ProductLookup:
+        """
+        Resolves a barcode from the local product store first, then through the
+        product cache, falling back to the sources on a miss.
+        """
+        if self.local_store is not None:
+            start = time.perf_counter()
+            stored = self.local_store.get(barcode)
+            elapsed_ms = round((time.perf_counter() - start) * 1000, 3)
+            if stored:
+                product_info, source, category = stored
+                return ProductLookup(product_info, source, category, {"Local Product Store": {"elapsed_ms": elapsed_ms, "outcome": "hit"}}, "local")
+        return await self._lookup_cached(barcode)
+
+    async def _lookup_cached(self, barcode: str) -> ProductLookup:
+        """
+        Resolves a barcode through the product cache, falling back to the sources on a miss.
+        """
+        if self.product_cache is None:
+            return await self._lookup_sources(barcode)
+
+        entry, tier = await self.product_cache.get(barcode)
+        if entry is not MISSING:
+            print(f"[{self.agent_name}] Cache hit ({tier}) for barcode: {barcode}")
+            if entry is None:
+                return ProductLookup(None, None, None, {}, tier)
+            return ProductLookup(entry["product_info"], entry["source"], entry["category"], {}, tier)
+
+        lookup = await self._lookup_sources(barcode)
+        if self._skipped_better_source(lookup):
+            # A source that might have had the product failed or was down: don't remember a miss
+            # (or a fallback answer) for longer than this request, retry once it is back
+            return lookup._replace(cache_status="bypass")
+        if lookup.product_info:
+            await self.product_cache.set(barcode, {
+                "product_info": lookup.product_info,
+                "source": lookup.source,
+                "category": lookup.category,
+                # A generic placeholder is a miss in disguise, remember it only briefly
+                "not_found": bool(lookup.product_info.get("is_fallback"))
+            })
+        else:
+            await self.product_cache.set(barcode, None)
+        return lookup._replace(cache_status="miss")
+
+    def _skipped_better_source(self, lookup: ProductLookup) -> bool:
+        if lookup.product_info and not lookup.product_info.get("is_fallback"):
+            return False
+        return any(timing["outcome"] in ("error", "circuit_open") for timing in lookup.source_timings.values())
+
+    async def _lookup_sources(self, barcode: str) -> ProductLookup:
+        if self.lookup_mode == "hedged":
+            return await self._lookup_hedged(barcode)
+        return await self._lookup_sequential(barcode)
+
+    async def _fetch_off(self, barcode: str) -> Optional[Dict[str, Any]]:
+        return await self.off_client.get_product_by_barcode(barcode)
+
+    async def _fetch_obf(self, barcode: str) -> Optional[Dict[str, Any]]:
+        return await self.obf_client.get_product_by_barcode(barcode)
+
+    async def _fetch_general(self, barcode: str) -> Optional[Dict[str, Any]]:
+        general_data = await self.general_client.get_product_by_barcode(barcode)
+        if not general_data:
+            return None
+        # Map general data to expected format (on a copy, the client's record stays untouched)
+        product_info = dict(general_data)
+        product_info["ingredients_text"] = ", ".join(general_data.get("materials", []))
+        product_info["brands"] = general_data.get("brand")
+        product_info["origins"] = general_data.get("origin")
+        return product_info
+
+    async def _fetch_demo(self, barcode: str) -> Optional[Dict[str, Any]]:
+        return self.demo_db.get(barcode)
+
+    async def _timed_fetch(self, fetch, barcode: str, source: str, source_timings: Dict[str, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Runs one source fetcher and records how long it took and what it returned.
+        """
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            product_info = await fetch(barcode)
+            outcome = "hit" if product_info else "miss"
+            return product_info
+        except asyncio.CancelledError:
+            # The hedged lookup records cancelled sources itself
+            outcome = "cancelled"
+            raise
+        except CircuitOpenError:
+            # Skipped without a call, the upstream is known to be down
+            outcome = "circuit_open"
+            return None
+        except Exception as e:
+            print(f"[{self.agent_name}] {source} lookup failed: {e}")
+            return None
+        finally:
+            if outcome != "cancelled":
+                source_timings[source] = {
+                    "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+                    "outcome": outcome
+                }
+
+    async def _lookup_sequential(self, barcode: str) -> ProductLookup:
+        source_timings: Dict[str, Dict[str, Any]] = {}
+        for source, category, fetch in self.sources:
+            product_info = await self._timed_fetch(fetch, barcode, source, source_timings)
+            if product_info:
+                return ProductLookup(product_info, source, category or product_info.get("category", "unknown"), source_timings)
+            print(f"[{self.agent_name}] Not found in {source}, trying next source...")
+        return ProductLookup(None, None, None, source_timings)
+
+    async def _lookup_hedged(self, barcode: str) -> ProductLookup:
+        source_timings: Dict[str, Dict[str, Any]] = {}
+        start = time.perf_counter()
+        tasks = [
+            asyncio.ensure_future(self._timed_fetch(fetch, barcode, source, source_timings))
+            for source, _, fetch in self.sources
+        ]
+        try:
+            # Wait in priority order: a lower-ranked source that answers first is only used
+            # once every better-ranked source has come back empty.
+            for (source, category, _), task in zip(self.sources, tasks):
+                product_info = await task
+                if product_info:
+                    return ProductLookup(product_info, source, category or product_info.get("category", "unknown"), source_timings)
+            return ProductLookup(None, None, None, source_timings)
+        finally:
+            for (source, _, _), task in zip(self.sources, tasks):
+                if not task.done():
+                    task.cancel()
+                    source_timings[source] = {
+                        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+                        "outcome": "cancelled"
+                    }
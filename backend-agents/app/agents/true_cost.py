@@ -1,4 +1,4 @@
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Sequence
 from app.agents.base_agent import BaseAgent
 from app.models.product_analysis import AgentVerdict, TrafficLightStatus
 from app.services.carbon_api import CarbonAPIClient
@@ -8,17 +8,32 @@ class TrueCostAgent(BaseAgent):
     The True Cost Agent: Calculates the environmental footprint (CO2, Water) and hidden costs.
     Now uses a simulated Carbon API for scientific accuracy.
     """
+    profile_dependent = False
+
     def __init__(self):
         super().__init__(agent_name="True Cost")
         self.carbon_api = CarbonAPIClient()
 
+    def data_version(self) -> str:
+        return self.carbon_api.data_version()
+
     async def analyze(self, product_data: Dict[str, Any], context: Dict[str, Any] = None) -> AgentVerdict:
         product_name = product_data.get("product_name", "Unknown")
         print(f"[{self.agent_name}] Calculating true cost for: {product_name}")
 
         # Fetch Real Carbon Data
         carbon_footprint = await self.carbon_api.estimate_footprint(product_data)
-        
+        return self._verdict(carbon_footprint)
+
+    async def analyze_batch(self, products: Sequence[Dict[str, Any]], contexts: Sequence[Optional[Dict[str, Any]]]) -> List[AgentVerdict]:
+        """
+        One carbon API call (and one vectorized estimate) for the whole batch.
+        """
+        print(f"[{self.agent_name}] Calculating true cost for {len(products)} products")
+        footprints = await self.carbon_api.estimate_footprints(list(products))
+        return [self._verdict(carbon_footprint) for carbon_footprint in footprints]
+
+    def _verdict(self, carbon_footprint: float) -> AgentVerdict:
         # Determine Status based on Carbon Footprint (kg CO2e)
         # Thresholds: < 1.0 (Low/Green), 1.0 - 5.0 (Medium/Yellow), > 5.0 (High/Red)
         if carbon_footprint < 1.0:
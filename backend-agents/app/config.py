@@ -0,0 +1,90 @@
+import os
+from typing import Literal, Optional
+from pydantic import BaseModel, Field
+
+ENV_PREFIX = "ETHICAL_LENS_"
+
+class Settings(BaseModel):
+    """
+    Runtime configuration for the backend.
+    Every field can be overridden with an environment variable named
+    ETHICAL_LENS_<FIELD_NAME> (e.g. ETHICAL_LENS_HTTP_CONNECT_TIMEOUT=2.5).
+    """
+    # Shared HTTP client (upstream product APIs)
+    http_connect_timeout: float = Field(3.0, description="Seconds allowed to open a connection to an upstream API.")
+    http_read_timeout: float = Field(5.0, description="Seconds allowed between reads from an upstream API.")
+    http_max_connections: int = Field(100, description="Total size of the connection pool.")
+    http_max_connections_per_host: int = Field(20, description="Connections allowed to a single upstream host.")
+    http_keepalive_timeout: float = Field(30.0, description="Seconds an idle connection is kept open for reuse.")
+    http_dns_cache_ttl: int = Field(300, description="Seconds a resolved upstream address is cached.")
+
+    # Upstream services (see app.services.simulator)
+    upstream_mode: Literal["real", "simulated"] = Field("real", description="Talk to the real upstream APIs, or to the local simulator.")
+    simulator_config_path: str = Field("", description="JSON file with per-service latency and fault settings (simulated mode).")
+    simulator_seed: Optional[int] = Field(None, description="Seed for reproducible simulated latencies and faults.")
+
+    # Circuit breakers and adaptive timeouts (Open Food Facts / Open Beauty Facts)
+    circuit_breaker_failure_threshold: int = Field(5, description="Consecutive failed or slow calls that open an upstream's circuit.")
+    circuit_breaker_slow_call_threshold: float = Field(2.0, description="Seconds after which an answer counts as a failure, unless the upstream usually takes longer.")
+    circuit_breaker_reset_timeout: float = Field(30.0, description="Seconds an open circuit waits before letting a probe call through.")
+    adaptive_timeout_initial: float = Field(5.0, description="Per-call timeout until enough latencies have been observed.")
+    adaptive_timeout_min: float = Field(0.5, description="Lower bound of the adaptive per-call timeout.")
+    adaptive_timeout_max: float = Field(10.0, description="Upper bound of the adaptive per-call timeout, and the timeout of half-open probes.")
+    adaptive_timeout_percentile: float = Field(99.0, description="Latency percentile the timeout is derived from.")
+    adaptive_timeout_multiplier: float = Field(2.0, description="Safety factor applied to that percentile.")
+
+    # Product lookup cache (in front of the Researcher)
+    product_cache_size: int = Field(10000, description="Entries kept in the in-process LRU tier.")
+    product_cache_ttl: float = Field(86400.0, description="Seconds a found product stays cached.")
+    product_cache_negative_ttl: float = Field(900.0, description="Seconds a not-found barcode stays cached.")
+    product_cache_path: str = Field("product_cache.sqlite3", description="SQLite file for the on-disk tier (empty disables it).")
+
+    # Local product store (offline OFF/OBF dumps, see app.services.dump_importer)
+    local_store_path: str = Field("local_products.sqlite3", description="SQLite file of the imported dumps (ignored if missing).")
+    product_index_path: str = Field("product_index.npz", description="Similarity index of the local store, built by app.services.product_index (ignored if missing).")
+    product_index_max_postings: int = Field(4096, description="Postings read per query term, highest weights first.")
+    recommendation_count: int = Field(5, description="Alternatives the Alternative Recommender returns.")
+
+    # Knowledge base
+    brand_ownership_path: str = Field("", description="Brand ownership graph JSON (empty uses the bundled app/data/brand_ownership.json).")
+    nutrient_rules_path: str = Field("", description="Condition nutrient rules JSON for Bio-Shield (empty uses the bundled app/data/nutrient_rules.json).")
+    regulations_path: str = Field("", description="Regional regulations JSON for Bio-Shield and the Circular Guide (empty uses the bundled app/data/regulations.json).")
+    ingredient_synonyms_enabled: bool = Field(True, description="Resolve E-numbers and INCI names to common ingredient names before matching.")
+
+    # Compiled user profiles (Bio-Shield / Judge)
+    profile_cache_size: int = Field(1024, description="Compiled profiles kept in memory.")
+
+    # Full analysis results
+    analysis_cache_size: int = Field(10000, description="Complete analyses kept in memory.")
+    analysis_cache_ttl: float = Field(3600.0, description="Seconds a complete analysis stays valid.")
+
+    # Metrics
+    metrics_loop_lag_interval: float = Field(0.5, description="Seconds between event-loop lag probes (0 disables them).")
+
+    # Tracing (see app.services.tracing)
+    tracing_sample_ratio: float = Field(0.0, description="Share of requests traced, 0 disables tracing.")
+    tracing_exporter: Literal["file", "otlp_http"] = Field("file", description="Write spans to a local OTLP/JSON file, or POST them to a collector.")
+    tracing_file_path: str = Field("traces.otlp.jsonl", description="File the spans are appended to (file exporter).")
+    tracing_endpoint: str = Field("http://localhost:4318/v1/traces", description="Collector OTLP/HTTP endpoint (otlp_http exporter).")
+    tracing_batch_size: int = Field(512, description="Spans exported per batch.")
+    tracing_flush_interval: float = Field(2.0, description="Seconds between exports of queued spans.")
+
+    # Batch analysis
+    batch_max_items: int = Field(500, description="Barcodes accepted in one /analyze/batch request.")
+    batch_max_concurrency: int = Field(16, description="Items of a batch analysed at the same time.")
+    pantry_max_items: int = Field(1000, description="Barcodes accepted in one /pantry/audit request.")
+    household_max_members: int = Field(20, description="Profiles accepted in one /analyze/household request.")
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """
+        Builds the settings from the defaults above, overridden by the environment.
+        """
+        overrides = {}
+        for name in cls.model_fields:
+            value = os.environ.get(f"{ENV_PREFIX}{name.upper()}")
+            if value is not None:
+                overrides[name] = value
+        return cls(**overrides)
+
+settings = Settings.from_env()
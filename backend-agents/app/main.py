@@ -1,9 +1,16 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from typing import Optional, List
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Any, AsyncIterator, Callable, Dict, Optional, List
 
 from app.models.user_profile import UserProfile
-from app.models.product_analysis import ProductAnalysis, TrafficLightStatus
+from app.config import settings
+from app.models.household import HouseholdAnalysis
+from app.models.pantry_audit import PantryAudit
+from app.models.product_analysis import AgentVerdict, ProductAnalysis
 from app.agents.researcher import ResearcherAgent
 from app.agents.bio_shield import BioShieldAgent
 from app.agents.judge import JudgeAgent
@@ -13,91 +20,395 @@ from app.agents.alternative_recommender import AlternativeRecommenderAgent
 from app.agents.true_cost import TrueCostAgent
 from app.agents.localvore import LocalvoreScoutAgent
 from app.agents.activist import ActivistAgent
+from app.services.analysis_cache import AnalysisCache, SharedVerdictCache
+from app.services.analysis_pipeline import build_analysis, is_degraded, prepare_product, regional_key
+from app.services.cache import data_fingerprint
+from app.services.agent_scheduler import AgentScheduler, AgentTask
+from app.services.simulator import upstream_http_client, upstream_simulator
+from app.services.household import HouseholdAnalyzer
+from app.services.local_product_store import LocalProductStore
+from app.services.metrics import AGENT_LATENCY, EventLoopLagMonitor, MetricsMiddleware, metrics
+from app.services.product_cache import ProductCache
+from app.services.product_index import ProductIndex
+from app.services.nutrient_rules import nutrient_rules
+from app.services.regulation_index import regulation_index
+from app.services.pantry_audit import PantryAuditor
+from app.services.profile_compiler import fingerprint_profile, profile_compiler
+from app.services.tracing import TracingMiddleware, start_span, tracer
 
-app = FastAPI(title="Ethical Lens Backend", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled HTTP session for all upstream product APIs (a no-op in simulated mode)
+    await http_client.start()
+    if settings.metrics_loop_lag_interval > 0:
+        loop_lag_monitor.start()
+    tracer.start()
+    yield
+    await loop_lag_monitor.stop()
+    await tracer.shutdown()
+    await http_client.close()
+
+app = FastAPI(title="Ethical Lens Backend", version="0.1.0", lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
+loop_lag_monitor = EventLoopLagMonitor(interval=settings.metrics_loop_lag_interval)
+
+# Real upstream APIs or the local simulator, depending on settings.upstream_mode
+http_client = upstream_http_client()
 
 # Initialize Agents
-researcher = ResearcherAgent()
+analysis_cache = AnalysisCache.from_settings()
+shared_verdict_cache = SharedVerdictCache.from_settings()
+product_cache = ProductCache.from_settings()
+local_store = LocalProductStore.open_if_exists(settings.local_store_path)
+researcher = ResearcherAgent(product_cache=product_cache, local_store=local_store, http_client=http_client)
 bio_shield = BioShieldAgent()
 judge = JudgeAgent()
 corporate_detective = CorporateDetectiveAgent()
 circular_guide = CircularGuideAgent()
-alternative_recommender = AlternativeRecommenderAgent()
+# Similarity index of the local store, for catalog-backed alternatives
+product_index = ProductIndex.open_if_exists(settings.product_index_path, settings.product_index_max_postings) if local_store else None
+alternative_recommender = AlternativeRecommenderAgent(index=product_index, store=local_store, top_k=settings.recommendation_count)
 true_cost = TrueCostAgent()
 localvore = LocalvoreScoutAgent()
 activist = ActivistAgent()
 
+# Dependency graph for the post-research agents.
+# Agents without dependencies run concurrently; dependents wait for their inputs.
+agent_scheduler = AgentScheduler([
+    AgentTask(bio_shield),
+    AgentTask(judge),
+    AgentTask(corporate_detective),
+    AgentTask(circular_guide),
+    AgentTask(alternative_recommender, depends_on=[bio_shield.agent_name, judge.agent_name]),
+    AgentTask(true_cost),
+    AgentTask(localvore),
+    AgentTask(activist, depends_on=[corporate_detective.agent_name]),
+])
+household_analyzer = HouseholdAnalyzer(researcher, agent_scheduler, analysis_cache, shared_verdict_cache)
+pantry_auditor = PantryAuditor(researcher, agent_scheduler, analysis_cache, shared_verdict_cache, max_concurrency=settings.batch_max_concurrency)
+
+# Metrics read from the components' own statistics at scrape time
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    caches = {
+        "analysis": analysis_cache.stats(),
+        "shared_verdicts": shared_verdict_cache.stats(),
+        "profile": profile_compiler.stats(),
+    }
+    product = product_cache.stats()
+    caches["product"] = {
+        "hits": product["memory_hits"] + product["disk_hits"],
+        "misses": product["misses"],
+        "hit_ratio": product["hit_ratio"],
+    }
+    if local_store is not None:
+        store = local_store.stats()
+        caches["local_store"] = {
+            "hits": store["hits"],
+            "misses": store["lookups"] - store["hits"],
+            "hit_ratio": round(store["hits"] / store["lookups"], 4) if store["lookups"] else 0.0,
+        }
+    return caches
+
+metrics.callback(
+    "ethical_lens_cache_hit_ratio", "Hit ratio of each cache since start.", ["cache"],
+    lambda: {(name,): stats["hit_ratio"] for name, stats in cache_stats().items()}
+)
+metrics.callback(
+    "ethical_lens_cache_hits_total", "Cache hits since start.", ["cache"],
+    lambda: {(name,): stats["hits"] for name, stats in cache_stats().items()}, metric_type="counter"
+)
+metrics.callback(
+    "ethical_lens_cache_misses_total", "Cache misses since start.", ["cache"],
+    lambda: {(name,): stats["misses"] for name, stats in cache_stats().items()}, metric_type="counter"
+)
+metrics.callback(
+    "ethical_lens_upstream_in_flight", "Upstream HTTP requests currently in flight (OFF/OBF pool).", [],
+    lambda: {(): http_client.stats()["in_flight"]}
+)
+metrics.callback(
+    "ethical_lens_single_flight_in_flight", "Distinct upstream calls in flight, after coalescing.", ["upstream"],
+    lambda: {
+        ("open_food_facts",): researcher.off_client.single_flight.stats()["in_flight"],
+        ("open_beauty_facts",): researcher.obf_client.single_flight.stats()["in_flight"],
+        ("general_search",): researcher.general_client.single_flight.stats()["in_flight"],
+        ("carbon",): true_cost.carbon_api.single_flight.stats()["in_flight"],
+    }
+)
+
+REGION_DESCRIPTION = "Where the user is (e.g. 'US-CA', 'FR'), for regional bans and recycling rules."
+
 class AnalyzeRequest(BaseModel):
     barcode: str
     user_profile: UserProfile
     image_data: Optional[str] = None # Base64 encoded image if needed
+    region: Optional[str] = Field(None, description=REGION_DESCRIPTION)
+
+class HouseholdAnalyzeRequest(BaseModel):
+    barcode: str
+    user_profiles: List[UserProfile] = Field(..., min_length=1, description="Profiles of the household members sharing the scan.")
+    region: Optional[str] = Field(None, description=REGION_DESCRIPTION)
+
+class PantryAuditRequest(BaseModel):
+    barcodes: List[str] = Field(..., description="Barcodes of the pantry items or receipt lines (repeats allowed).")
+    user_profile: UserProfile
+    region: Optional[str] = Field(None, description=REGION_DESCRIPTION)
+
+class BatchAnalyzeRequest(BaseModel):
+    barcodes: List[str] = Field(..., description="Barcodes to analyse, e.g. from a receipt or pantry import.")
+    user_profile: UserProfile
+    max_concurrency: Optional[int] = Field(None, ge=1, description="Items analysed at once (capped by the server).")
+    region: Optional[str] = Field(None, description=REGION_DESCRIPTION)
 
 @app.get("/")
 async def root():
     return {"message": "Ethical Lens Backend is running"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """
+    Prometheus scrape endpoint: latency histograms per request route, agent and
+    upstream, cache hit ratios, in-flight gauges and event-loop lag.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/stats")
+async def stats():
+    """
+    Internal statistics used to size pools and caches under load.
+    """
+    return {
+        "upstream_mode": settings.upstream_mode,
+        "http_pool": http_client.stats(),
+        "simulator": upstream_simulator.stats(),
+        "analysis_cache": analysis_cache.stats(),
+        "shared_verdict_cache": shared_verdict_cache.stats(),
+        "product_cache": product_cache.stats(),
+        "local_store": local_store.stats() if local_store else None,
+        "product_index": product_index.stats() if product_index else None,
+        "profile_cache": profile_compiler.stats(),
+        "brand_graph": corporate_detective.brand_graph.stats(),
+        "nutrient_rules": nutrient_rules.stats(),
+        "regulations": regulation_index.stats(),
+        "tracing": tracer.stats(),
+        "circuit_breakers": {
+            "open_food_facts": researcher.off_client.circuit_breaker.stats(),
+            "open_beauty_facts": researcher.obf_client.circuit_breaker.stats(),
+        },
+        "single_flight": {
+            "open_food_facts": researcher.off_client.single_flight.stats(),
+            "open_beauty_facts": researcher.obf_client.single_flight.stats(),
+            "general_search": researcher.general_client.single_flight.stats(),
+            "carbon": true_cost.carbon_api.single_flight.stats()
+        }
+    }
+
+async def run_analysis(
+    barcode: str,
+    user_profile: UserProfile,
+    on_verdict: Optional[Callable[[AgentVerdict], Any]] = None,
+    region: Optional[str] = None,
+) -> ProductAnalysis:
+    """
+    Runs the full agent pipeline for one barcode and one user profile.
+    Complete results are cached per (barcode, profile, region) for the current knowledge-base version.
+    on_verdict, if given, is called with each verdict as soon as it is ready
+    (the Researcher's first). region is a known region code (see
+    RegulationIndex.region_code) or None.
+    """
+    with start_span("analysis", barcode=barcode) as span:
+        analysis = await _run_analysis(barcode, user_profile, on_verdict, region)
+        span.set_attributes({"cache_hit": analysis.cache_hit, "overall_status": analysis.overall_status.value})
+        return analysis
+
+async def _run_analysis(
+    barcode: str,
+    user_profile: UserProfile,
+    on_verdict: Optional[Callable[[AgentVerdict], Any]] = None,
+    region: Optional[str] = None,
+) -> ProductAnalysis:
+    profile_fingerprint = regional_key(fingerprint_profile(user_profile), region)
+    kb_version = data_fingerprint(agent_scheduler.data_versions())
+    cached = analysis_cache.get(barcode, profile_fingerprint, kb_version)
+    if cached is not None:
+        if on_verdict is not None:
+            for verdict in cached.agent_verdicts:
+                on_verdict(verdict)
+        return cached
+
+    # 1. Researcher: Fetch Product Data
+    # In a real scenario, we might pass the image_data to a Vision agent first if barcode is missing.
+    with start_span(f"agent {researcher.agent_name}", agent=researcher.agent_name, barcode=barcode) as span, AGENT_LATENCY.time(researcher.agent_name):
+        product_data_verdict = await researcher.analyze({"barcode": barcode})
+        span.set_attributes({
+            "outcome": "ok",
+            "status": product_data_verdict.status.value,
+            "source": product_data_verdict.details.get("source"),
+            "category": product_data_verdict.details.get("category"),
+            "cache_status": product_data_verdict.details.get("cache_status"),
+        })
+    if on_verdict is not None:
+        on_verdict(product_data_verdict)
+    
+    # 2. Normalization: the Researcher's details become the agents' product data,
+    # with canonical ingredients computed once and shared by every agent
+    agent_product_data, cache_ttl = prepare_product(product_data_verdict.details)
+
+    # 3. Parallel Analysis: every agent runs as soon as its dependencies are done
+    # Profile-independent agents (Corporate Detective, True Cost, ...) run once per product
+    # with a context free of user data, and their verdicts are shared by every user.
+    shared_verdicts = shared_verdict_cache.get_or_compute(
+        regional_key(barcode, region),
+        kb_version,
+        lambda: agent_scheduler.run_profile_independent(agent_product_data, {"region": region}),
+        ttl=cache_ttl,
+    )
+    # Only the profile-dependent agents (Bio-Shield, Judge, ...) run per user
+    context = {"user_profile": user_profile, "region": region}
+    agent_verdicts = await agent_scheduler.run(agent_product_data, context, shared_verdicts=shared_verdicts, on_verdict=on_verdict)
+
+    # 4. Aggregation
+    analysis = build_analysis(barcode, product_data_verdict, agent_verdicts)
+
+    # A degraded agent is a transient failure, don't pin it in the cache
+    if not is_degraded(agent_verdicts):
+        analysis_cache.set(barcode, profile_fingerprint, kb_version, analysis, ttl=cache_ttl)
+    return analysis
+
 @app.post("/analyze", response_model=ProductAnalysis)
 async def analyze_product(request: AnalyzeRequest):
     """
     Orchestrates the analysis of a product by multiple agents.
     """
     print(f"Received analysis request for barcode: {request.barcode}")
+    return await run_analysis(request.barcode, request.user_profile, region=regulation_index.region_code(request.region))
 
-    # 1. Researcher: Fetch Product Data
-    # In a real scenario, we might pass the image_data to a Vision agent first if barcode is missing.
-    product_data_verdict = await researcher.analyze({"barcode": request.barcode})
-    
-    # Extract the raw product data from the researcher's findings (mocked for now)
-    # In reality, the researcher would return the raw data as part of its details or a separate object.
-    # For this scaffold, we'll assume the 'details' contain the data we need for other agents.
-    product_context = product_data_verdict.details
-    
-    # Add ingredients for other agents to use (Mocking data if not present)
-    if "ingredients" not in product_context:
-        product_context["ingredients"] = ["Sugar", "Palm Oil", "Peanuts"] # Mock ingredients
+@app.post("/analyze/household", response_model=HouseholdAnalysis)
+async def analyze_household(request: HouseholdAnalyzeRequest):
+    """
+    Checks one product against every member of a household (allergies, conditions,
+    values): the product is fetched and analysed once, and the per-member agents run
+    for all the members in one pass. Returns the shared verdicts and one row of
+    verdicts per member.
+    """
+    if len(request.user_profiles) > settings.household_max_members:
+        raise HTTPException(status_code=413, detail=f"Household too large: at most {settings.household_max_members} profiles per request.")
 
-    # 2. Parallel Analysis: Bio-Shield and Judge
-    # We pass the user profile and the product data found by the researcher
-    context = {"user_profile": request.user_profile}
-    
-    bio_verdict = await bio_shield.analyze(product_context, context)
-    judge_verdict = await judge.analyze(product_context, context)
-    corporate_verdict = await corporate_detective.analyze(product_context, context)
-    circular_verdict = await circular_guide.analyze(product_context, context)
-    recommender_verdict = await alternative_recommender.analyze(product_context, context)
-    true_cost_verdict = await true_cost.analyze(product_context, context)
-    localvore_verdict = await localvore.analyze(product_context, context)
-    activist_verdict = await activist.analyze(product_context, context)
-
-    # 3. Aggregation
-    verdicts = [product_data_verdict, bio_verdict, judge_verdict, corporate_verdict, circular_verdict, recommender_verdict, true_cost_verdict, localvore_verdict, activist_verdict]
-    
-    # Simple aggregation logic: Worst status wins (Red > Yellow > Green)
-    overall_status = TrafficLightStatus.GREEN
-    overall_score = 0.0
-    
-    has_red = any(v.status == TrafficLightStatus.RED for v in verdicts)
-    has_yellow = any(v.status == TrafficLightStatus.YELLOW for v in verdicts)
-    
-    if has_red:
-        overall_status = TrafficLightStatus.RED
-        overall_score = min(v.score for v in verdicts) # Take the lowest score
-    elif has_yellow:
-        overall_status = TrafficLightStatus.YELLOW
-        overall_score = sum(v.score for v in verdicts) / len(verdicts) # Average? Or lowest?
-    else:
-        overall_status = TrafficLightStatus.GREEN
-        overall_score = sum(v.score for v in verdicts) / len(verdicts)
-
-    return ProductAnalysis(
-        product_id=request.barcode,
-        product_name=product_context.get("product_name", "Unknown Product"),
-        overall_score=overall_score,
-        overall_status=overall_status,
-        agent_verdicts=verdicts,
-        timestamp="2025-12-01T12:00:00Z" # TODO: Use actual time
+    print(f"Received household analysis request for barcode: {request.barcode} ({len(request.user_profiles)} members)")
+    return await household_analyzer.analyze(request.barcode, request.user_profiles, regulation_index.region_code(request.region))
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def stream_analysis_events(barcode: str, user_profile: UserProfile, region: Optional[str] = None) -> AsyncIterator[str]:
+    """
+    Runs the pipeline and yields Server-Sent Events as results become available:
+    "product" (identity, from the Researcher), one "verdict" per agent in completion
+    order, then "result" with the aggregated status (or "error").
+    """
+    events: asyncio.Queue = asyncio.Queue()
+
+    def on_verdict(verdict: AgentVerdict):
+        if verdict.agent_name == researcher.agent_name:
+            details = verdict.details
+            events.put_nowait(sse_event("product", {
+                "product_id": barcode,
+                "product_name": details.get("product_name", "Unknown Product"),
+                "brand_owner": details.get("brand_owner"),
+                "source": details.get("source"),
+                "category": details.get("category"),
+            }))
+        events.put_nowait(sse_event("verdict", verdict.model_dump(mode="json")))
+
+    async def produce():
+        try:
+            analysis = await run_analysis(barcode, user_profile, on_verdict=on_verdict, region=region)
+            events.put_nowait(sse_event("result", analysis.model_dump(mode="json", exclude={"agent_verdicts"})))
+        except Exception as e:
+            print(f"Streaming analysis of {barcode} failed: {e}")
+            events.put_nowait(sse_event("error", {"product_id": barcode, "error": f"{type(e).__name__}: {e}"}))
+        finally:
+            events.put_nowait(None)
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        while True:
+            event = await events.get()
+            if event is None:
+                break
+            yield event
+    finally:
+        # The client went away before the analysis finished
+        producer.cancel()
+
+@app.post("/analyze/stream")
+async def analyze_product_stream(request: AnalyzeRequest):
+    """
+    Same analysis as /analyze, streamed as Server-Sent Events so the client can show
+    the product and the first verdicts (e.g. allergens) before the slow agents finish.
+    """
+    print(f"Received streaming analysis request for barcode: {request.barcode}")
+    return StreamingResponse(
+        stream_analysis_events(request.barcode, request.user_profile, regulation_index.region_code(request.region)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def stream_batch_results(barcodes: List[str], user_profile: UserProfile, max_concurrency: int, region: Optional[str] = None) -> AsyncIterator[str]:
+    """
+    Analyses the barcodes with bounded concurrency and yields one NDJSON line per item
+    as soon as it finishes (so in completion order, not request order).
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def analyze_item(index: int, barcode: str) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                analysis = await run_analysis(barcode, user_profile, region=region)
+                return {"index": index, "barcode": barcode, "analysis": analysis.model_dump(mode="json")}
+            except Exception as e:
+                # Report the failure inline, the rest of the batch carries on
+                print(f"Batch item {index} ({barcode}) failed: {e}")
+                return {"index": index, "barcode": barcode, "error": f"{type(e).__name__}: {e}"}
+
+    tasks = [asyncio.ensure_future(analyze_item(index, barcode)) for index, barcode in enumerate(barcodes)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield json.dumps(await next_done) + "\n"
+    finally:
+        # The client went away before the batch finished
+        for task in tasks:
+            task.cancel()
+
+@app.post("/analyze/batch")
+async def analyze_batch(request: BatchAnalyzeRequest):
+    """
+    Analyses many barcodes for one user profile, streaming results back as NDJSON.
+    Each line is {"index", "barcode", "analysis"} or, for a failed item, {"index", "barcode", "error"}.
+    """
+    if len(request.barcodes) > settings.batch_max_items:
+        raise HTTPException(status_code=413, detail=f"Batch too large: at most {settings.batch_max_items} barcodes per request.")
+
+    max_concurrency = min(request.max_concurrency or settings.batch_max_concurrency, settings.batch_max_concurrency)
+    print(f"Received batch analysis request for {len(request.barcodes)} barcodes (concurrency {max_concurrency})")
+    return StreamingResponse(
+        stream_batch_results(request.barcodes, request.user_profile, max_concurrency, regulation_index.region_code(request.region)),
+        media_type="application/x-ndjson"
     )
 
+@app.post("/pantry/audit", response_model=PantryAudit)
+async def audit_pantry(request: PantryAuditRequest):
+    """
+    Audits a whole pantry (or receipt) against one user profile in a single pass:
+    products are fetched in bulk and every agent runs once over all of them.
+    Returns per-item analyses, in request order, and summary statistics.
+    """
+    if len(request.barcodes) > settings.pantry_max_items:
+        raise HTTPException(status_code=413, detail=f"Pantry too large: at most {settings.pantry_max_items} barcodes per request.")
+
+    print(f"Received pantry audit request for {len(request.barcodes)} barcodes")
+    return await pantry_auditor.audit(request.barcodes, request.user_profile, regulation_index.region_code(request.region))
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,24 @@
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+from app.models.product_analysis import AgentVerdict, TrafficLightStatus
+
+class HouseholdMember(BaseModel):
+    """
+    One member's row of a household analysis.
+    """
+    user_id: str = Field(..., description="The member's user id.")
+    overall_score: float = Field(..., description="Aggregated compatibility score (0-100) for this member.")
+    overall_status: TrafficLightStatus = Field(..., description="Overall traffic light status for this member.")
+    verdicts: List[AgentVerdict] = Field(default_factory=list, description="Verdicts of the profile-dependent agents (Bio-Shield, Judge, ...) for this member.")
+    cache_hit: bool = Field(False, description="True when the member's analysis was served from the result cache.")
+
+class HouseholdAnalysis(BaseModel):
+    """
+    One product checked against every member of a household.
+    """
+    product_id: str = Field(..., description="Barcode or unique product ID.")
+    product_name: Optional[str] = Field(None, description="Name of the product.")
+    shared_verdicts: List[AgentVerdict] = Field(default_factory=list, description="Verdicts that are the same for every member (Researcher, Corporate Detective, True Cost, ...).")
+    members: List[HouseholdMember] = Field(default_factory=list, description="Per-member verdicts, in request order.")
+    timestamp: str = Field(..., description="ISO 8601 timestamp of the analysis.")
@@ -0,0 +1,34 @@
+from typing import List, Dict, Optional
+from pydantic import BaseModel, Field
+
+from app.models.product_analysis import ProductAnalysis
+
+class PantryItem(BaseModel):
+    """
+    One line of a pantry audit: the analysis of the item, or why it failed.
+    """
+    index: int = Field(..., description="Position of the item in the request.")
+    barcode: str = Field(..., description="Barcode of the item.")
+    analysis: Optional[ProductAnalysis] = Field(None, description="Full analysis of the product (shared by repeated barcodes).")
+    error: Optional[str] = Field(None, description="Why the item could not be analysed.")
+
+class PantrySummary(BaseModel):
+    """
+    Statistics over every item of a pantry audit.
+    """
+    total_items: int = Field(..., description="Items in the request, repeated barcodes included.")
+    unique_products: int = Field(..., description="Distinct barcodes analysed.")
+    failed_items: int = Field(0, description="Items that could not be analysed.")
+    cache_hits: int = Field(0, description="Distinct products whose analysis came from the result cache.")
+    status_counts: Dict[str, int] = Field(default_factory=dict, description="Items per overall traffic light status.")
+    average_score: Optional[float] = Field(None, description="Mean overall score of the analysed items.")
+    flagged: List[str] = Field(default_factory=list, description="Barcodes of the items with an overall RED status.")
+    agent_flags: Dict[str, int] = Field(default_factory=dict, description="Items each agent rated YELLOW or RED.")
+    elapsed_ms: float = Field(0.0, description="Time taken by the whole audit.")
+
+class PantryAudit(BaseModel):
+    """
+    Audit of a whole pantry (or grocery receipt) against one user profile.
+    """
+    items: List[PantryItem] = Field(default_factory=list, description="Per-item results, in request order.")
+    summary: PantrySummary
@@ -27,3 +27,4 @@ class ProductAnalysis(BaseModel):
     overall_status: TrafficLightStatus = Field(..., description="Overall traffic light status.")
     agent_verdicts: List[AgentVerdict] = Field(default_factory=list, description="List of verdicts from individual agents.")
     timestamp: str = Field(..., description="ISO 8601 timestamp of the analysis.")
+    cache_hit: bool = Field(False, description="True when the analysis was served from the result cache instead of being recomputed.")
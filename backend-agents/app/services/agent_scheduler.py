@@ -0,0 +1,272 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from app.agents.base_agent import BaseAgent
+from app.models.product_analysis import AgentVerdict, TrafficLightStatus
+from app.services.metrics import AGENT_LATENCY
+from app.services.tracing import start_span
+
+DEFAULT_AGENT_TIMEOUT = 5.0 # Seconds
+
+
+class AgentTask:
+    """
+    A node in the agent dependency graph: the agent to run, the agents whose
+    verdicts it needs as input, and how long it is allowed to take.
+    """
+    def __init__(self, agent: BaseAgent, depends_on: Sequence[str] = (), timeout: float = DEFAULT_AGENT_TIMEOUT):
+        self.agent = agent
+        self.depends_on = tuple(depends_on)
+        self.timeout = timeout
+
+    @property
+    def name(self) -> str:
+        return self.agent.agent_name
+
+
+class AgentScheduler:
+    """
+    Runs the post-research agents concurrently, respecting declared dependencies.
+
+    Every agent starts as soon as the agents it depends on have produced a verdict.
+    Upstream verdicts are handed over in ``context["verdicts"]`` keyed by agent name.
+    An agent that fails or exceeds its timeout degrades to a YELLOW verdict so a
+    single misbehaving agent never fails the whole request.
+
+    Agents are also classified as profile-dependent (they read the user profile,
+    or depend on an agent that does) or profile-independent. The verdicts of the
+    latter can be computed once per product and handed to run() as shared_verdicts.
+    """
+    def __init__(self, tasks: List[AgentTask]):
+        self.tasks = list(tasks)
+        self._order = self._topological_order(self.tasks)
+
+        # Topological order guarantees dependencies are classified first
+        self.profile_dependent: Dict[str, bool] = {}
+        for task in self._order:
+            self.profile_dependent[task.name] = task.agent.profile_dependent or any(
+                self.profile_dependent[dependency] for dependency in task.depends_on
+            )
+        self.profile_independent_tasks = [task for task in self.tasks if not self.profile_dependent[task.name]]
+
+    @staticmethod
+    def _topological_order(tasks: List[AgentTask]) -> List[AgentTask]:
+        by_name = {}
+        for task in tasks:
+            if task.name in by_name:
+                raise ValueError(f"Duplicate agent in schedule: {task.name}")
+            by_name[task.name] = task
+
+        for task in tasks:
+            for dependency in task.depends_on:
+                if dependency not in by_name:
+                    raise ValueError(f"Agent '{task.name}' depends on unknown agent '{dependency}'")
+
+        order: List[AgentTask] = []
+        state: Dict[str, str] = {} # name -> "visiting" | "done"
+
+        def visit(task: AgentTask):
+            if state.get(task.name) == "done":
+                return
+            if state.get(task.name) == "visiting":
+                raise ValueError(f"Dependency cycle detected at agent '{task.name}'")
+            state[task.name] = "visiting"
+            for dependency in task.depends_on:
+                visit(by_name[dependency])
+            state[task.name] = "done"
+            order.append(task)
+
+        for task in tasks:
+            visit(task)
+        return order
+
+    def data_versions(self) -> Dict[str, str]:
+        """
+        Version stamps of the reference data behind the scheduled agents, keyed by agent name.
+        """
+        versions = {}
+        for task in self.tasks:
+            version = task.agent.data_version()
+            if version is not None:
+                versions[task.name] = version
+        return versions
+
+    async def run(
+        self,
+        product_data: Dict[str, Any],
+        context: Optional[Dict[str, Any]] = None,
+        shared_verdicts: Optional[Awaitable[Dict[str, AgentVerdict]]] = None,
+        on_verdict: Optional[Callable[[AgentVerdict], Any]] = None,
+    ) -> List[AgentVerdict]:
+        """
+        Runs every scheduled agent and returns their verdicts in declaration order.
+        If shared_verdicts is given (see run_profile_independent), profile-independent
+        agents take their verdict from it instead of running; profile-dependent agents
+        start right away and only wait for it if they depend on one of those verdicts.
+        on_verdict, if given, is called with each verdict as soon as it is ready.
+        """
+        context = context or {}
+        running: Dict[str, asyncio.Future] = {}
+        if shared_verdicts is not None:
+            shared_verdicts = asyncio.ensure_future(shared_verdicts)
+
+        # Tasks are created in topological order so every dependency already has a future.
+        for task in self._order:
+            if shared_verdicts is not None and not self.profile_dependent[task.name]:
+                running[task.name] = asyncio.ensure_future(self._shared_verdict(task, shared_verdicts))
+            else:
+                running[task.name] = asyncio.ensure_future(self._run_task(task, running, product_data, context))
+            if on_verdict is not None:
+                running[task.name].add_done_callback(self._notify(on_verdict))
+
+        await asyncio.gather(*running.values())
+        return [running[task.name].result() for task in self.tasks]
+
+    @staticmethod
+    def _notify(on_verdict: Callable[[AgentVerdict], Any]) -> Callable[[asyncio.Future], None]:
+        def notify(future: asyncio.Future):
+            if not future.cancelled() and future.exception() is None:
+                on_verdict(future.result())
+        return notify
+
+    async def run_profile_independent(self, product_data: Dict[str, Any], context: Optional[Dict[str, Any]] = None) -> Dict[str, AgentVerdict]:
+        """
+        Runs only the profile-independent agents, returning their verdicts by agent name.
+        The context must not carry user data, the verdicts are shared across users.
+        """
+        context = context or {}
+        running: Dict[str, asyncio.Future] = {}
+        for task in self._order:
+            if not self.profile_dependent[task.name]:
+                running[task.name] = asyncio.ensure_future(self._run_task(task, running, product_data, context))
+
+        await asyncio.gather(*running.values())
+        return {name: future.result() for name, future in running.items()}
+
+    async def run_batch(
+        self,
+        products: Sequence[Dict[str, Any]],
+        contexts: Sequence[Optional[Dict[str, Any]]],
+        shared_verdicts: Optional[Sequence[Dict[str, AgentVerdict]]] = None,
+    ) -> List[List[AgentVerdict]]:
+        """
+        Batch variant of run(): every agent is called once, through its
+        analyze_batch, for all products (products[i] with contexts[i]). Returns each
+        product's verdicts in declaration order. shared_verdicts, if given, holds
+        each product's profile-independent verdicts (see run_profile_independent_batch).
+        """
+        if shared_verdicts is None:
+            tasks = self._order
+            results: Dict[str, List[AgentVerdict]] = {}
+        else:
+            tasks = [task for task in self._order if self.profile_dependent[task.name]]
+            results = {task.name: [verdicts[task.name] for verdicts in shared_verdicts] for task in self.profile_independent_tasks}
+        results.update(await self._run_batch(tasks, products, contexts, results))
+        return [[results[task.name][i] for task in self.tasks] for i in range(len(products))]
+
+    async def run_profile_independent_batch(self, products: Sequence[Dict[str, Any]], context: Optional[Dict[str, Any]] = None) -> List[Dict[str, AgentVerdict]]:
+        """
+        Batch variant of run_profile_independent(): each product's profile-independent verdicts, by agent name.
+        """
+        tasks = [task for task in self._order if not self.profile_dependent[task.name]]
+        results = await self._run_batch(tasks, products, [context or {}] * len(products), {})
+        return [{name: verdicts[i] for name, verdicts in results.items()} for i in range(len(products))]
+
+    async def _run_batch(
+        self,
+        tasks: List[AgentTask],
+        products: Sequence[Dict[str, Any]],
+        contexts: Sequence[Optional[Dict[str, Any]]],
+        done: Dict[str, List[AgentVerdict]],
+    ) -> Dict[str, List[AgentVerdict]]:
+        if not products:
+            return {task.name: [] for task in tasks}
+        running: Dict[str, asyncio.Future] = {}
+        for task in tasks:
+            running[task.name] = asyncio.ensure_future(self._run_batch_task(task, running, done, products, contexts))
+        await asyncio.gather(*running.values())
+        return {name: future.result() for name, future in running.items()}
+
+    async def _run_batch_task(
+        self,
+        task: AgentTask,
+        running: Dict[str, asyncio.Future],
+        done: Dict[str, List[AgentVerdict]],
+        products: Sequence[Dict[str, Any]],
+        contexts: Sequence[Optional[Dict[str, Any]]],
+    ) -> List[AgentVerdict]:
+        upstream_verdicts = {}
+        for dependency in task.depends_on:
+            upstream_verdicts[dependency] = done[dependency] if dependency in done else await running[dependency]
+
+        agent_contexts = []
+        for i, context in enumerate(contexts):
+            agent_context = dict(context or {})
+            agent_context["verdicts"] = {name: verdicts[i] for name, verdicts in upstream_verdicts.items()}
+            agent_contexts.append(agent_context)
+
+        # The whole batch gets the time budget of a single run
+        with start_span(f"agent {task.name}", agent=task.name, batch_size=len(products)) as span, AGENT_LATENCY.time(task.name) as timer:
+            try:
+                verdicts = await asyncio.wait_for(task.agent.analyze_batch(products, agent_contexts), timeout=task.timeout)
+                span.set_attribute("outcome", "ok")
+                return verdicts
+            except asyncio.TimeoutError:
+                print(f"[Scheduler] {task.name} timed out after {task.timeout}s on a batch of {len(products)}")
+                timer.outcome = "timeout"
+                span.set_attribute("outcome", "timeout")
+                span.set_error(f"timed out after {task.timeout}s")
+                return [self._degraded_verdict(task, f"timed out after {task.timeout}s")] * len(products)
+            except Exception as e:
+                print(f"[Scheduler] {task.name} failed on a batch of {len(products)}: {e}")
+                timer.outcome = "error"
+                span.set_attribute("outcome", "error")
+                span.set_error(f"{type(e).__name__}: {e}")
+                return [self._degraded_verdict(task, f"failed ({type(e).__name__}: {e})")] * len(products)
+
+    @staticmethod
+    async def _shared_verdict(task: AgentTask, shared_verdicts: "asyncio.Future") -> AgentVerdict:
+        return (await shared_verdicts)[task.name]
+
+    async def _run_task(
+        self,
+        task: AgentTask,
+        running: Dict[str, asyncio.Future],
+        product_data: Dict[str, Any],
+        context: Dict[str, Any],
+    ) -> AgentVerdict:
+        upstream_verdicts = {}
+        for dependency in task.depends_on:
+            upstream_verdicts[dependency] = await running[dependency]
+
+        agent_context = dict(context)
+        agent_context["verdicts"] = upstream_verdicts
+
+        # Timed from the moment its inputs are ready
+        with start_span(f"agent {task.name}", agent=task.name) as span, AGENT_LATENCY.time(task.name) as timer:
+            try:
+                verdict = await asyncio.wait_for(task.agent.analyze(product_data, agent_context), timeout=task.timeout)
+                span.set_attributes({"outcome": "ok", "status": verdict.status.value})
+                return verdict
+            except asyncio.TimeoutError:
+                print(f"[Scheduler] {task.name} timed out after {task.timeout}s")
+                timer.outcome = "timeout"
+                span.set_attribute("outcome", "timeout")
+                span.set_error(f"timed out after {task.timeout}s")
+                return self._degraded_verdict(task, f"timed out after {task.timeout}s")
+            except Exception as e:
+                print(f"[Scheduler] {task.name} failed: {e}")
+                timer.outcome = "error"
+                span.set_attribute("outcome", "error")
+                span.set_error(f"{type(e).__name__}: {e}")
+                return self._degraded_verdict(task, f"failed ({type(e).__name__}: {e})")
+
+    @staticmethod
+    def _degraded_verdict(task: AgentTask, problem: str) -> AgentVerdict:
+        return AgentVerdict(
+            agent_name=task.name,
+            score=50.0, # Neutral score, we simply don't know
+            status=TrafficLightStatus.YELLOW,
+            reasoning=f"{task.name} is unavailable: {problem}.",
+            details={"degraded": True, "error": problem}
+        )
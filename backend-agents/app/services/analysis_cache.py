@@ -0,0 +1,138 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from app.config import Settings, settings
+from app.models.product_analysis import AgentVerdict, ProductAnalysis
+from app.services.cache import MISSING, LRUCache
+from app.services.single_flight import SingleFlight
+
+class AnalysisCache:
+    """
+    Complete ProductAnalysis results, keyed by (barcode, profile fingerprint).
+
+    Each entry remembers the knowledge-base version (the agents' data version
+    stamps) it was computed against. A lookup under a different version drops the
+    entry, so editing the brand DB, recycling rules, alternatives or carbon factors
+    invalidates every analysis that used them without any explicit flush.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 3600.0):
+        self.memory = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_settings(cls, config: Settings = settings) -> "AnalysisCache":
+        return cls(maxsize=config.analysis_cache_size, ttl=config.analysis_cache_ttl)
+
+    def get(self, barcode: str, profile_fingerprint: str, kb_version: str) -> Optional[ProductAnalysis]:
+        """
+        Returns a copy of the cached analysis marked as a cache hit, or None.
+        """
+        key = (barcode, profile_fingerprint)
+        entry = self.memory.get(key)
+        if entry is MISSING:
+            self.misses += 1
+            return None
+
+        entry_version, analysis = entry
+        if entry_version != kb_version:
+            self.memory.delete(key)
+            self.invalidations += 1
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return analysis.model_copy(update={"cache_hit": True})
+
+    def set(self, barcode: str, profile_fingerprint: str, kb_version: str, analysis: ProductAnalysis, ttl: Optional[float] = None):
+        self.memory.set((barcode, profile_fingerprint), (kb_version, analysis), ttl=ttl)
+
+    def clear(self):
+        self.memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "memory": self.memory.stats(),
+        }
+
+
+class SharedVerdictCache:
+    """
+    Verdicts of the profile-independent agents (Corporate Detective, True Cost, ...),
+    computed once per product and shared by every user who scans it.
+
+    Like AnalysisCache, entries are tied to the knowledge-base version. Concurrent
+    misses for the same product are coalesced into a single computation.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 3600.0):
+        self.memory = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.single_flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_settings(cls, config: Settings = settings) -> "SharedVerdictCache":
+        return cls(maxsize=config.analysis_cache_size, ttl=config.analysis_cache_ttl)
+
+    async def get_or_compute(
+        self,
+        key: Hashable,
+        kb_version: str,
+        compute: Callable[[], Awaitable[Dict[str, AgentVerdict]]],
+        ttl: Optional[float] = None,
+    ) -> Dict[str, AgentVerdict]:
+        """
+        Returns the shared verdicts for a product (keyed by barcode), computing them on a miss.
+        """
+        verdicts = self.get(key, kb_version)
+        if verdicts is not None:
+            return verdicts
+        return await self.single_flight.do((key, kb_version), lambda: self._compute(key, kb_version, compute, ttl))
+
+    def get(self, key: Hashable, kb_version: str) -> Optional[Dict[str, AgentVerdict]]:
+        """
+        Returns the cached shared verdicts for a product, or None (for batch callers computing misses themselves).
+        """
+        entry = self.memory.get(key)
+        if entry is not MISSING:
+            entry_version, verdicts = entry
+            if entry_version == kb_version:
+                self.hits += 1
+                return verdicts
+            self.memory.delete(key)
+            self.invalidations += 1
+
+        self.misses += 1
+        return None
+
+    def set(self, key: Hashable, kb_version: str, verdicts: Dict[str, AgentVerdict], ttl: Optional[float] = None):
+        # A degraded verdict is a transient failure, the next user should retry
+        if not any(v.details.get("degraded") for v in verdicts.values()):
+            self.memory.set(key, (kb_version, verdicts), ttl=ttl)
+
+    async def _compute(self, key, kb_version, compute, ttl) -> Dict[str, AgentVerdict]:
+        verdicts = await compute()
+        self.set(key, kb_version, verdicts, ttl=ttl)
+        return verdicts
+
+    def clear(self):
+        self.memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "coalesced": self.single_flight.stats()["coalesced"],
+            "memory": self.memory.stats(),
+        }
@@ -0,0 +1,87 @@
+"""
+Steps of the analysis pipeline shared by the single-product endpoints and the pantry audit.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from app.config import settings
+from app.models.product_analysis import AgentVerdict, ProductAnalysis, TrafficLightStatus
+from app.services.ingredient_normalizer import normalize_ingredients
+
+class PreparedProduct(NamedTuple):
+    """
+    A product as handed to the post-research agents, and how long analyses of it may be cached.
+    """
+    product_data: Dict[str, Any]
+    cache_ttl: Optional[float] # None for the cache's default, 0 not to cache
+
+
+def prepare_product(product_context: Dict[str, Any]) -> PreparedProduct:
+    """
+    Turns the Researcher's verdict details into the agents' product data.
+    """
+    # Add ingredients for other agents to use (Mocking data if not present)
+    if "ingredients" not in product_context:
+        product_context["ingredients"] = ["Sugar", "Palm Oil", "Peanuts"] # Mock ingredients
+
+    # Normalization: canonical ingredients are computed once and shared by every agent
+    # (on a copy, so they don't end up in the Researcher's verdict details)
+    agent_product_data = dict(product_context)
+    agent_product_data["normalized_ingredients"] = normalize_ingredients(product_context["ingredients"])
+
+    # Unknown or unverified (fallback) products are cached only as long as a not-found lookup
+    raw_data = product_context.get("raw_data") or {}
+    not_found = not raw_data or bool(raw_data.get("is_fallback"))
+    cache_ttl = settings.product_cache_negative_ttl if not_found else None
+    # A lookup that hit a failing upstream is not cached at all, the next scan retries it
+    if product_context.get("cache_status") == "bypass":
+        cache_ttl = 0.0
+    return PreparedProduct(agent_product_data, cache_ttl)
+
+def aggregate_verdicts(verdicts: List[AgentVerdict]) -> Tuple[TrafficLightStatus, float]:
+    """
+    Simple aggregation logic: Worst status wins (Red > Yellow > Green)
+    """
+    has_red = any(v.status == TrafficLightStatus.RED for v in verdicts)
+    has_yellow = any(v.status == TrafficLightStatus.YELLOW for v in verdicts)
+
+    if has_red:
+        overall_status = TrafficLightStatus.RED
+        overall_score = min(v.score for v in verdicts) # Take the lowest score
+    elif has_yellow:
+        overall_status = TrafficLightStatus.YELLOW
+        overall_score = sum(v.score for v in verdicts) / len(verdicts) # Average? Or lowest?
+    else:
+        overall_status = TrafficLightStatus.GREEN
+        overall_score = sum(v.score for v in verdicts) / len(verdicts)
+
+    return overall_status, overall_score
+
+def build_analysis(barcode: str, product_data_verdict: AgentVerdict, agent_verdicts: List[AgentVerdict]) -> ProductAnalysis:
+    """
+    Aggregates the Researcher's verdict and the agents' into the product's analysis.
+    """
+    verdicts = [product_data_verdict] + agent_verdicts
+    overall_status, overall_score = aggregate_verdicts(verdicts)
+
+    return ProductAnalysis(
+        product_id=barcode,
+        product_name=product_data_verdict.details.get("product_name", "Unknown Product"),
+        overall_score=overall_score,
+        overall_status=overall_status,
+        agent_verdicts=verdicts,
+        timestamp=datetime.now(timezone.utc).isoformat()
+    )
+
+def regional_key(key: str, region: Optional[str]) -> str:
+    """
+    Cache key (barcode or profile fingerprint) of results computed for a region;
+    results without a region keep the plain key.
+    """
+    return key if region is None else f"{key}@{region}"
+
+def is_degraded(agent_verdicts: List[AgentVerdict]) -> bool:
+    """
+    Whether an agent failed or timed out: a transient failure, not to be pinned in the cache.
+    """
+    return any(v.details.get("degraded") for v in agent_verdicts)
@@ -0,0 +1,126 @@
+import json
+import os
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from app.services.cache import data_fingerprint
+from app.services.ingredient_normalizer import normalize_text
+from app.services.keyword_matcher import KeywordMatcher
+
+DEFAULT_BRAND_OWNERSHIP_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "brand_ownership.json")
+
+class BrandRecord(NamedTuple):
+    """
+    A brand (or company) resolved against the ownership graph.
+    ownership_path runs from the entity itself up to its ultimate parent.
+    """
+    name: str
+    parent: Optional[str]
+    ultimate_parent: str
+    ownership_path: Tuple[str, ...]
+    issues: Tuple[str, ...] # Inherited from every owner up the chain, then its own
+    investors: Tuple[str, ...]
+
+
+class BrandGraph:
+    """
+    Brand ownership knowledge graph, indexed for lookups by brand string.
+
+    The data holds "brands" (the names printed on products, which lookups match)
+    and "companies" (their owners, possibly owned in turn). Each entity may have
+    a parent, aliases, issues and investors. Ownership chains, ultimate parents
+    and inherited issues are precomputed once when the graph is built, so
+    resolving a brand is a hash lookup on its normalized name, or else a single
+    Aho-Corasick pass over the brand string, whatever the size of the graph.
+    """
+
+    def __init__(self, data: Dict[str, Dict[str, Dict[str, Any]]]):
+        self.data = data
+        self.version = data_fingerprint(data)
+
+        entities: Dict[str, Dict[str, Any]] = {}
+        for section in ("companies", "brands"):
+            entities.update(data.get(section, {}))
+
+        # Every name and alias, normalized, to the entity it designates
+        self._names: Dict[str, str] = {}
+        for name, info in entities.items():
+            for alias in [name] + list(info.get("aliases", [])):
+                self._names.setdefault(normalize_text(alias), name)
+
+        self.records: Dict[str, BrandRecord] = {}
+        for name in entities:
+            self._build_record(name, entities)
+
+        # Only brands are matched in product brand strings (a name shared by two brands goes to the first)
+        self._brand_keys: Dict[str, str] = {}
+        for name, info in data.get("brands", {}).items():
+            for alias in [name] + list(info.get("aliases", [])):
+                self._brand_keys.setdefault(normalize_text(alias), name)
+        self._brand_rank = {key: rank for rank, key in enumerate(self._brand_keys)}
+        self._matcher = KeywordMatcher(self._brand_keys)
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_BRAND_OWNERSHIP_PATH) -> "BrandGraph":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def _build_record(self, name: str, entities: Dict[str, Dict[str, Any]], visiting: Tuple[str, ...] = ()) -> BrandRecord:
+        record = self.records.get(name)
+        if record is not None:
+            return record
+        if name in visiting:
+            raise ValueError(f"Ownership cycle: {' -> '.join(visiting + (name,))}")
+
+        info = entities.get(name, {})
+        parent_name = info.get("parent")
+        parent = None
+        if parent_name:
+            # Parents may be referred to by an alias, or be absent from the data
+            parent_name = self._names.get(normalize_text(parent_name), parent_name)
+            parent = self._build_record(parent_name, entities, visiting + (name,))
+
+        issues = list(parent.issues) if parent else []
+        issues += [issue for issue in info.get("issues", []) if issue not in issues]
+        investors = list(parent.investors) if parent else []
+        investors += [investor for investor in info.get("investors", []) if investor not in investors]
+
+        record = BrandRecord(
+            name=name,
+            parent=parent.name if parent else None,
+            ultimate_parent=parent.ultimate_parent if parent else name,
+            ownership_path=(name,) + (parent.ownership_path if parent else ()),
+            issues=tuple(issues),
+            investors=tuple(investors),
+        )
+        self.records[name] = record
+        return record
+
+    def resolve(self, brand: str) -> Optional[BrandRecord]:
+        """
+        Finds the brand named in a product's brand string ("Ben & Jerry's",
+        "Innocent Drinks, Coca-Cola HBC", ...), or None. Brand names must match
+        whole words; the longest one found wins, then the one listed first.
+        """
+        key = normalize_text(brand)
+        name = self._brand_keys.get(key)
+        if name is None:
+            matches = [
+                m for m in self._matcher.find_all([key])
+                if (m.start == 0 or key[m.start - 1] == " ") and (m.end == len(key) or key[m.end] == " ")
+            ]
+            if not matches:
+                return None
+            best = min(matches, key=lambda m: (-len(m.keyword), self._brand_rank[m.keyword]))
+            name = self._brand_keys[best.keyword]
+        return self.records[name]
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "brands": len(self.data.get("brands", {})),
+            "companies": len(self.records) - len(self.data.get("brands", {})),
+            "names_indexed": len(self._names),
+            "max_depth": max((len(r.ownership_path) for r in self.records.values()), default=0),
+        }
@@ -0,0 +1,252 @@
+"""
+Vectorized carbon footprint estimation.
+
+Usage (offline scoring of the local product store):
+    python -m app.services.carbon_estimator --store local_products.sqlite3 --output carbon_scores.csv
+
+Each product is first reduced to its inputs: which emission factor every
+ingredient matches and what mass it stands for, plus the packaging components
+and their weights. Footprints for a whole batch are then computed at once with
+numpy, as weighted sums over the factor table (one bincount for the
+ingredients, one for the packaging), so scoring thousands of products costs
+one pass of text matching plus a handful of array operations.
+
+Ingredient masses come from the per-ingredient percentages Open Food Facts
+supplies (percent, or its percent_estimate) when it has them; ingredients
+without one share the rest equally. Footprints are for a 100 g reference
+serving, so that products of any size compare on the same scale. Packaging
+uses the measured or specified weight of each component when available, and a
+20 g package of the material named in the packaging text otherwise.
+"""
+import argparse
+import csv
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.cache import data_fingerprint
+from app.services.ingredient_normalizer import get_normalized_ingredients, normalize_ingredients
+from app.services.keyword_matcher import compile_matcher
+
+# Realistic CO2 factors (kg CO2e per kg of product)
+EMISSION_FACTORS = {
+    "beef": 60.0,
+    "lamb": 24.0,
+    "cheese": 21.0,
+    "chocolate": 19.0,
+    "coffee": 17.0,
+    "pork": 7.0,
+    "chicken": 6.0,
+    "eggs": 4.5,
+    "rice": 4.0,
+    "milk": 3.0,
+    "oats": 0.9,
+    "vegetables": 0.5,
+    "plastic": 6.0, # Plastic packaging
+    "glass": 0.9,   # Glass packaging
+    "aluminum": 2.3 # Aluminum packaging
+}
+
+# Packaging material factor for words found in a packaging description, first match wins
+PACKAGING_KEYWORDS = (
+    ("plastic", ("plastic", "polyethylene", "polypropylene", "polystyrene", "pvc", "hdpe", "ldpe")),
+    ("glass", ("glass",)),
+    ("aluminum", ("can", "aluminum", "aluminium")),
+)
+
+SERVING_KG = 0.1 # Reference serving of 100 g
+DEFAULT_PACKAGING_KG = 0.02 # Assume 20g packaging when its weight is unknown
+BASE_FOOTPRINT = 0.5 # Transportation overhead etc., when nothing matched
+
+
+class FootprintInputs(NamedTuple):
+    """
+    What a product's footprint depends on, as factor indices and masses (kg).
+    Hashable, so identical products can share one estimate.
+    """
+    ingredient_factors: Tuple[int, ...]
+    ingredient_kg: Tuple[float, ...]
+    packaging_factors: Tuple[int, ...]
+    packaging_kg: Tuple[float, ...]
+
+
+def _as_percent(value: Any) -> Optional[float]:
+    try:
+        percent = float(value)
+    except (TypeError, ValueError):
+        return None
+    return min(100.0, max(0.0, percent))
+
+def ingredient_percentages(product_data: Dict[str, Any], count: int) -> List[Optional[float]]:
+    """
+    Per-ingredient percentages from the Open Food Facts record, aligned with the
+    product's ingredient list (None where unknown).
+    """
+    raw_data = product_data.get("raw_data") or {}
+    entries = raw_data.get("ingredients") if raw_data else product_data.get("ingredients")
+    if not isinstance(entries, list) or len(entries) != count:
+        return [None] * count
+    percentages = []
+    for entry in entries:
+        if isinstance(entry, dict):
+            percent = entry.get("percent")
+            percentages.append(_as_percent(percent if percent is not None else entry.get("percent_estimate")))
+        else:
+            percentages.append(None)
+    return percentages
+
+def _component_kg(component: Dict[str, Any]) -> Optional[float]:
+    for field in ("weight_measured", "weight_specified"):
+        try:
+            grams = float(component.get(field))
+        except (TypeError, ValueError):
+            continue
+        units = component.get("number_of_units") or 1
+        try:
+            units = float(units)
+        except (TypeError, ValueError):
+            units = 1.0
+        return grams * units / 1000.0
+    return None
+
+
+class CarbonEstimator:
+    def __init__(self, factors: Optional[Dict[str, float]] = None):
+        self.factors = dict(factors if factors is not None else EMISSION_FACTORS)
+        self.keys = list(self.factors)
+        self.index = {key: i for i, key in enumerate(self.keys)}
+        self.factor_values = np.array([self.factors[key] for key in self.keys], dtype=np.float64)
+        self.matcher = compile_matcher(self.keys)
+
+    @property
+    def version(self) -> str:
+        return data_fingerprint(self.factors)
+
+    def _packaging_factor(self, text: Any) -> Optional[int]:
+        if not isinstance(text, str):
+            return None
+        text = text.lower()
+        for key, keywords in PACKAGING_KEYWORDS:
+            if key in self.index and any(keyword in text for keyword in keywords):
+                return self.index[key]
+        return None
+
+    def prepare(self, product_data: Dict[str, Any]) -> FootprintInputs:
+        """
+        Reduces a product (as the agents see it) to its footprint inputs.
+        """
+        ingredients = get_normalized_ingredients(product_data)
+        count = len(ingredients.items)
+        percentages = ingredient_percentages(product_data, count)
+
+        known = [p for p in percentages if p is not None]
+        if known:
+            unknown = count - len(known)
+            remaining = max(0.0, 100.0 - sum(known))
+            masses = [
+                SERVING_KG * (p / 100.0) if p is not None else SERVING_KG * (remaining / 100.0) / unknown
+                for p in percentages
+            ]
+        else:
+            # Without percentages every ingredient is an equal share of the serving
+            masses = [SERVING_KG / count] * count if count else []
+
+        ingredient_factors, ingredient_kg = [], []
+        for text_index, keys in self.matcher.keywords_by_text(ingredients).items():
+            # The first factor (in table order) found in the ingredient wins
+            ingredient_factors.append(min(self.index[key] for key in keys))
+            ingredient_kg.append(masses[text_index])
+
+        packaging_factors, packaging_kg = [], []
+        for component in product_data.get("packagings") or (product_data.get("raw_data") or {}).get("packagings") or []:
+            if not isinstance(component, dict):
+                continue
+            factor = self._packaging_factor(f"{component.get('material') or ''} {component.get('shape') or ''}")
+            kg = _component_kg(component)
+            if factor is not None and kg is not None:
+                packaging_factors.append(factor)
+                packaging_kg.append(kg)
+        if not packaging_factors:
+            factor = self._packaging_factor(product_data.get("packaging", ""))
+            if factor is not None:
+                packaging_factors.append(factor)
+                packaging_kg.append(DEFAULT_PACKAGING_KG)
+
+        return FootprintInputs(tuple(ingredient_factors), tuple(ingredient_kg), tuple(packaging_factors), tuple(packaging_kg))
+
+    def estimate_prepared(self, inputs: Sequence[FootprintInputs]) -> List[float]:
+        """
+        Footprints (kg CO2e, rounded to 10 g) of already prepared products, computed in one vectorized pass.
+        """
+        n = len(inputs)
+        if not n:
+            return []
+
+        def weighted_sums(factor_lists, mass_lists) -> np.ndarray:
+            counts = np.fromiter((len(f) for f in factor_lists), dtype=np.int64, count=n)
+            owners = np.repeat(np.arange(n), counts)
+            factors = np.fromiter((f for fs in factor_lists for f in fs), dtype=np.int64, count=int(counts.sum()))
+            masses = np.fromiter((m for ms in mass_lists for m in ms), dtype=np.float64, count=int(counts.sum()))
+            # (bincount returns integers when there is nothing to add up)
+            return np.bincount(owners, weights=self.factor_values[factors] * masses, minlength=n).astype(np.float64, copy=False)
+
+        totals = (
+            weighted_sums([i.ingredient_factors for i in inputs], [i.ingredient_kg for i in inputs])
+            + weighted_sums([i.packaging_factors for i in inputs], [i.packaging_kg for i in inputs])
+        )
+        totals[totals == 0] = BASE_FOOTPRINT
+        return [round(total, 2) for total in totals.tolist()]
+
+    def estimate_batch(self, products: Iterable[Dict[str, Any]]) -> List[float]:
+        return self.estimate_prepared([self.prepare(product) for product in products])
+
+    def estimate(self, product_data: Dict[str, Any]) -> float:
+        return self.estimate_batch([product_data])[0]
+
+
+def catalog_product(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Shapes a local store / dump record the way the Researcher hands products to the agents.
+    """
+    if isinstance(record.get("ingredients"), list):
+        ingredients = [i.get("text") if isinstance(i, dict) else i for i in record["ingredients"]]
+    else:
+        ingredients = [i.strip() for i in (record.get("ingredients_text") or "").split(",") if i.strip()]
+    return {
+        "product_name": record.get("product_name"),
+        "ingredients": ingredients,
+        "normalized_ingredients": normalize_ingredients(ingredients),
+        "packaging": record.get("packaging") or "",
+        "raw_data": record,
+    }
+
+def main(argv=None):
+    from app.config import settings
+    from app.services.local_product_store import LocalProductStore
+
+    parser = argparse.ArgumentParser(description="Estimate the carbon footprint of every product in the local product store.")
+    parser.add_argument("--store", default=settings.local_store_path, help="SQLite file of the local product store.")
+    parser.add_argument("--output", default="carbon_scores.csv", help="CSV file written with barcode, source and footprint.")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Products estimated per vectorized batch.")
+    args = parser.parse_args(argv)
+
+    estimator = CarbonEstimator()
+    store = LocalProductStore(args.store)
+    total = 0
+    start = time.perf_counter()
+    try:
+        with open(args.output, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["barcode", "source", "carbon_footprint_kg"])
+            for batch in store.iter_batches(args.batch_size):
+                footprints = estimator.estimate_batch(catalog_product(record) for _, _, _, record in batch)
+                writer.writerows((barcode, source, footprint) for (barcode, source, _, _), footprint in zip(batch, footprints))
+                total += len(batch)
+                print(f"Scored {total} products ({total / (time.perf_counter() - start):.0f}/s)...")
+    finally:
+        store.close()
+    print(f"Done: {total} footprints written to {args.output}.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Circuit breakers and adaptive timeouts for upstream product APIs.
+
+Each upstream gets its own breaker. After `failure_threshold` consecutive
+failures (errors, timeouts, 5xx/429 answers, or answers slower than both
+`slow_call_threshold` and the upstream's usual latency) the breaker opens and
+calls are rejected at once with CircuitOpenError, so lookups move straight on
+to the next source instead of waiting on a degraded upstream. After
+`reset_timeout` seconds a single probe call is let through (half-open): any
+answer closes the breaker, however slow, its failure opens it for another
+`reset_timeout`.
+
+The timeout applied to each call follows the upstream's recent latency: a high
+percentile of the last calls, times a safety multiplier, clamped between a
+floor and a ceiling. A call that times out counts as lasting the whole timeout,
+so the timeout grows when the upstream slows down, and half-open probes get the
+ceiling: an upstream that became slower than the old timeout is not locked out.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.config import Settings, settings
+from app.services.metrics import metrics
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+CIRCUIT_STATE = metrics.gauge(
+    "ethical_lens_circuit_breaker_state", "Circuit breaker state per upstream (0 closed, 1 half-open, 2 open).", ["upstream"]
+)
+CIRCUIT_TRANSITIONS = metrics.counter(
+    "ethical_lens_circuit_breaker_transitions_total", "Circuit breaker state changes, by the state entered.", ["upstream", "state"]
+)
+CIRCUIT_REJECTED = metrics.counter(
+    "ethical_lens_circuit_breaker_rejected_total", "Upstream calls skipped because the circuit was open.", ["upstream"]
+)
+UPSTREAM_TIMEOUT = metrics.gauge(
+    "ethical_lens_upstream_timeout_seconds", "Timeout currently applied to calls to each upstream.", ["upstream"]
+)
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling an upstream whose circuit is open.
+    """
+    def __init__(self, upstream: str):
+        super().__init__(f"circuit open for {upstream}")
+        self.upstream = upstream
+
+
+class UpstreamUnavailableError(Exception):
+    """
+    Raised when an upstream answers with a rate limit or a server error: the
+    product may well exist, so the lookup failed rather than found nothing.
+    """
+    def __init__(self, upstream: str, status: int):
+        super().__init__(f"{upstream} answered HTTP {status}")
+        self.upstream = upstream
+        self.status = status
+
+
+class AdaptiveTimeout:
+    """
+    Timeout derived from a sliding window of recent latencies.
+    """
+    def __init__(
+        self,
+        initial: float = 5.0,
+        minimum: float = 0.5,
+        maximum: float = 10.0,
+        percentile: float = 99.0,
+        multiplier: float = 2.0,
+        window: int = 200,
+        min_samples: int = 20,
+    ):
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.min_samples = min_samples
+        self.samples: deque = deque(maxlen=window)
+        self.value = initial
+        self.latency: Optional[float] = None # The percentile the value derives from, once known
+        self._since_update = 0
+
+    def observe(self, elapsed: float, refresh: bool = False):
+        self.samples.append(elapsed)
+        self._since_update += 1
+        # Re-sorting the window on every call isn't worth it, the percentile moves slowly
+        if len(self.samples) >= self.min_samples and (refresh or self._since_update >= max(1, self.min_samples // 2)):
+            self._since_update = 0
+            ordered = sorted(self.samples)
+            rank = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100.0))
+            self.latency = ordered[rank]
+            self.value = min(self.maximum, max(self.minimum, self.latency * self.multiplier))
+
+    def observe_timeout(self, timeout: float):
+        """
+        Records a call cut off after `timeout` seconds: it took at least that long.
+        The timeout is re-derived at once, the next call shouldn't be cut off as early.
+        """
+        self.observe(timeout, refresh=True)
+
+    def current(self) -> float:
+        return self.value
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        slow_call_threshold: float = 2.0,
+        reset_timeout: float = 30.0,
+        timeout: Optional[AdaptiveTimeout] = None,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call_threshold = slow_call_threshold
+        self.reset_timeout = reset_timeout
+        self.timeout = timeout or AdaptiveTimeout()
+
+        self._state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+        self.calls = 0
+        self.failures = 0
+        self.slow_calls = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.times_opened = 0
+
+        CIRCUIT_STATE.set(STATE_VALUES[CLOSED], name)
+        UPSTREAM_TIMEOUT.set(self.timeout.current(), name)
+
+    @classmethod
+    def from_settings(cls, name: str, config: Settings = settings) -> "CircuitBreaker":
+        timeout = AdaptiveTimeout(
+            initial=config.adaptive_timeout_initial,
+            minimum=config.adaptive_timeout_min,
+            maximum=config.adaptive_timeout_max,
+            percentile=config.adaptive_timeout_percentile,
+            multiplier=config.adaptive_timeout_multiplier,
+        )
+        return cls(
+            name,
+            failure_threshold=config.circuit_breaker_failure_threshold,
+            slow_call_threshold=config.circuit_breaker_slow_call_threshold,
+            reset_timeout=config.circuit_breaker_reset_timeout,
+            timeout=timeout,
+        )
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._transition(HALF_OPEN)
+        return self._state
+
+    def _transition(self, state: str):
+        if state == self._state:
+            return
+        print(f"[CircuitBreaker] {self.name}: {self._state} -> {state}")
+        self._state = state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+        CIRCUIT_STATE.set(STATE_VALUES[state], self.name)
+        CIRCUIT_TRANSITIONS.inc(self.name, state)
+
+    def allow_request(self) -> bool:
+        """
+        Whether a call may go out now. In half-open state only one probe at a time is let through.
+        """
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        if self._state == OPEN:
+            return # A straggler from before the circuit opened, wait for the probe
+        self._probe_in_flight = False
+        self.consecutive_failures = 0
+        self._transition(CLOSED)
+
+    def record_failure(self):
+        self._probe_in_flight = False
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self._state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self._transition(OPEN)
+
+    def check(self):
+        """
+        Raises CircuitOpenError if no call may go out now.
+        """
+        if not self.allow_request():
+            self.rejected += 1
+            CIRCUIT_REJECTED.inc(self.name)
+            raise CircuitOpenError(self.name)
+
+    async def call(self, fn: Callable[[], Awaitable[Any]], is_failure: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Runs fn() under the breaker, or raises CircuitOpenError without calling it.
+        """
+        self.check()
+        return await self.run(fn, is_failure)
+
+    async def run(self, fn: Callable[[], Awaitable[Any]], is_failure: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Runs fn() under the adaptive timeout once check() has let the call through.
+        is_failure(result) lets the caller count some answers (e.g. HTTP 503) as
+        failures while still getting them back.
+        """
+        self.calls += 1
+        # A probe gets the longest timeout: the upstream may have recovered slower than it used to be
+        probe = self._state == HALF_OPEN
+        timeout = self.timeout.maximum if probe else self.timeout.current()
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(fn(), timeout=timeout)
+        except asyncio.CancelledError:
+            # The caller went away, that says nothing about the upstream
+            self._probe_in_flight = False
+            raise
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self.timeout.observe_timeout(timeout)
+            UPSTREAM_TIMEOUT.set(self.timeout.current(), self.name)
+            self.record_failure()
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+
+        elapsed = time.perf_counter() - start
+        self.timeout.observe(elapsed)
+        UPSTREAM_TIMEOUT.set(self.timeout.current(), self.name)
+        if is_failure is not None and is_failure(result):
+            self.record_failure()
+        elif elapsed > self.slow_threshold() and not probe:
+            self.slow_calls += 1
+            self.record_failure()
+        else:
+            self.record_success()
+        return result
+
+    def slow_threshold(self) -> float:
+        """
+        Seconds after which an answer counts as a failure. Slow is relative to what the
+        upstream usually takes: one that is steadily slower than slow_call_threshold,
+        but well within its timeout, is not failing.
+        """
+        if self.timeout.latency is None:
+            return self.slow_call_threshold
+        return max(self.slow_call_threshold, self.timeout.latency)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "timeout": round(self.timeout.current(), 3),
+            "calls": self.calls,
+            "failures": self.failures,
+            "slow_calls": self.slow_calls,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "times_opened": self.times_opened,
+        }
+
+def is_unavailable_response(result) -> bool:
+    """
+    is_failure check for SharedHTTPClient.get_json results: rate limiting and server errors.
+    """
+    status = result[0]
+    return status == 429 or status >= 500
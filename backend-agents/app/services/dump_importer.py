@@ -0,0 +1,107 @@
+"""
+Imports the public Open Food Facts / Open Beauty Facts dumps into a LocalProductStore.
+
+Usage:
+    python -m app.services.dump_importer openfoodfacts-products.jsonl.gz --source off
+    python -m app.services.dump_importer en.openbeautyfacts.org.products.csv --source obf --store local_products.sqlite3
+
+Both the JSONL and the (tab-separated) CSV exports are supported, plain or gzipped.
+The dump is streamed line by line and written in fixed-size batches, so memory use
+stays constant whatever the size of the dump.
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import sys
+import time
+from itertools import islice
+from typing import Any, Dict, Iterator, TextIO, Tuple
+
+from app.config import settings
+from app.services.local_product_store import DUMP_SOURCES, STORED_FIELDS, LocalProductStore
+
+BATCH_SIZE = 5000
+
+def open_dump(path: str) -> TextIO:
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8", errors="replace")
+    return open(path, "r", encoding="utf-8", errors="replace")
+
+def iter_jsonl_products(stream: TextIO) -> Iterator[Dict[str, Any]]:
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            continue # Skip corrupt lines, the dumps have a few
+
+def iter_csv_products(stream: TextIO) -> Iterator[Dict[str, Any]]:
+    csv.field_size_limit(sys.maxsize)
+    header = stream.readline()
+    delimiter = "\t" if "\t" in header else ","
+    columns = next(csv.reader([header], delimiter=delimiter))
+    nutriment_columns = [c for c in columns if c.endswith("_100g")]
+
+    for row in csv.DictReader(stream, fieldnames=columns, delimiter=delimiter, quoting=csv.QUOTE_NONE if delimiter == "\t" else csv.QUOTE_MINIMAL):
+        nutriments = {}
+        for column in nutriment_columns:
+            value = row.get(column)
+            if value:
+                try:
+                    nutriments[column] = float(value)
+                except ValueError:
+                    pass
+        product = {field: row.get(field) for field in STORED_FIELDS if field != "nutriments"}
+        product["code"] = row.get("code")
+        product["nutriments"] = nutriments
+        yield product
+
+def iter_rows(path: str, source_key: str) -> Iterator[Tuple[str, str, str, Dict[str, Any]]]:
+    """
+    Yields (barcode, source name, category, compact record) for every usable product in the dump.
+    """
+    source_name, category = DUMP_SOURCES[source_key]
+    is_jsonl = ".jsonl" in path or ".json" in path
+    with open_dump(path) as stream:
+        products = iter_jsonl_products(stream) if is_jsonl else iter_csv_products(stream)
+        for product in products:
+            barcode = str(product.get("code") or "").strip()
+            if not barcode:
+                continue
+            record = LocalProductStore.compact_record(product)
+            if record.get("product_name") or record.get("ingredients_text"):
+                yield barcode, source_name, category, record
+
+def import_dump(path: str, source_key: str, store: LocalProductStore, batch_size: int = BATCH_SIZE) -> int:
+    rows = iter_rows(path, source_key)
+    total = 0
+    start = time.perf_counter()
+    while True:
+        imported = store.upsert_many(islice(rows, batch_size))
+        if not imported:
+            break
+        total += imported
+        print(f"Imported {total} products ({total / (time.perf_counter() - start):.0f}/s)...")
+    return total
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import an Open Food Facts / Open Beauty Facts dump into the local product store.")
+    parser.add_argument("dump", help="Path to the JSONL or CSV dump (optionally .gz).")
+    parser.add_argument("--source", choices=sorted(DUMP_SOURCES), required=True, help="Which catalog the dump comes from.")
+    parser.add_argument("--store", default=settings.local_store_path, help="SQLite file of the local product store.")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Products written per transaction.")
+    args = parser.parse_args(argv)
+
+    store = LocalProductStore(args.store)
+    try:
+        total = import_dump(args.dump, args.source, store, args.batch_size)
+    finally:
+        store.close()
+    print(f"Done: {total} products from {args.dump} stored in {args.store}.")
+
+if __name__ == "__main__":
+    main()
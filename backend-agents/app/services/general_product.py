@@ -1,5 +1,8 @@
-import asyncio
 from typing import Optional, Dict, Any
+from app.services.metrics import upstream_timer
+from app.services.tracing import SPAN_KIND_CLIENT, start_span
+from app.services.simulator import UpstreamSimulator, upstream_simulator
+from app.services.single_flight import SingleFlight
 
 class GeneralProductClient:
     """
@@ -8,7 +11,9 @@ class GeneralProductClient:
     For this prototype, it uses a mock database of common non-food/non-cosmetic items.
     """
 
-    def __init__(self):
+    def __init__(self, simulator: Optional[UpstreamSimulator] = None):
+        self.simulator = simulator or upstream_simulator
+        self.single_flight = SingleFlight()
         self.mock_db = {
             # --- FOOD & BEVERAGE ---
             "028400090896": {
@@ -185,8 +190,13 @@ class GeneralProductClient:
         """
         Simulates searching the web for a product by barcode.
         """
+        # Concurrent scans of the same barcode share one search
+        return await self.single_flight.do(barcode, lambda: self._search(barcode))
+
+    async def _search(self, barcode: str) -> Optional[Dict[str, Any]]:
         print(f"GeneralProductClient: Searching for barcode {barcode}...")
-        await asyncio.sleep(1.0) # Simulate network latency
+        with start_span("GET general_search", kind=SPAN_KIND_CLIENT, upstream="general_search", barcode=barcode), upstream_timer("general_search"):
+            await self.simulator.call("general_search") # Simulate network latency (and faults, in simulated mode)
 
         product = self.mock_db.get(barcode)
         
@@ -203,5 +213,6 @@ class GeneralProductClient:
             "description": "Product details could not be verified against the database. Analyzing as a general item.",
             "materials": ["Plastic", "Unknown Materials"], # Assumed worst-case for safety
             "origin": "Unknown",
-            "image_url": "https://via.placeholder.com/150"
+            "image_url": "https://via.placeholder.com/150",
+            "is_fallback": True # Not a verified match
         }
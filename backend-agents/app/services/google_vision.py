@@ -1,4 +1,7 @@
 from typing import List, Optional
+from app.services.metrics import upstream_timer
+from app.services.tracing import SPAN_KIND_CLIENT, start_span
+from app.services.simulator import UpstreamSimulator, upstream_simulator
 # from google.cloud import vision
 
 class GoogleVisionClient:
@@ -6,9 +9,9 @@ class GoogleVisionClient:
     Client for interacting with Google Cloud Vision API.
     Note: Requires 'google-cloud-vision' package and authentication credentials.
     """
-    def __init__(self):
+    def __init__(self, simulator: Optional[UpstreamSimulator] = None):
         # self.client = vision.ImageAnnotatorClient()
-        pass
+        self.simulator = simulator or upstream_simulator
 
     async def detect_labels(self, image_content: bytes) -> List[str]:
         """
@@ -20,6 +23,8 @@ class GoogleVisionClient:
         # return [label.description for label in labels]
         
         print("Mocking Google Vision Label Detection")
+        with start_span("POST vision", kind=SPAN_KIND_CLIENT, upstream="vision"), upstream_timer("vision"):
+            await self.simulator.call("vision")
         return ["Mock Label 1", "Mock Label 2"]
 
     async def detect_product_from_image(self, image_uri: str) -> Optional[str]:
@@ -28,4 +33,6 @@ class GoogleVisionClient:
         """
         # TODO: Implement Product Search logic
         print(f"Mocking Product Search for image: {image_uri}")
+        with start_span("POST vision", kind=SPAN_KIND_CLIENT, upstream="vision"), upstream_timer("vision"):
+            await self.simulator.call("vision")
         return "1234567890123" # Mock Barcode
@@ -0,0 +1,122 @@
+"""
+Household mode: one scanned product checked against every member's profile.
+
+Calling /analyze once per member fetches the product and reruns every agent
+each time. Here the product is fetched and normalized once, the
+profile-independent agents run once (through the shared verdict cache), and
+each profile-dependent agent is called once for all the members through its
+analyze_batch: Bio-Shield scans the ingredients once for everyone's allergens
+and evaluates everyone's nutrient rules in one vectorized pass, the Judge
+scans once for everyone's value keywords. Members with identical settings
+share one evaluation, and every member's analysis goes through the same
+result cache as /analyze.
+"""
+from typing import Dict, List, Optional, Sequence
+
+from app.agents.researcher import ResearcherAgent
+from app.models.household import HouseholdAnalysis, HouseholdMember
+from app.models.product_analysis import ProductAnalysis
+from app.models.user_profile import UserProfile
+from app.services.agent_scheduler import AgentScheduler
+from app.services.analysis_cache import AnalysisCache, SharedVerdictCache
+from app.services.analysis_pipeline import build_analysis, is_degraded, prepare_product, regional_key
+from app.services.cache import data_fingerprint
+from app.services.metrics import AGENT_LATENCY
+from app.services.profile_compiler import fingerprint_profile
+from app.services.tracing import start_span
+
+
+class HouseholdAnalyzer:
+    def __init__(
+        self,
+        researcher: ResearcherAgent,
+        scheduler: AgentScheduler,
+        analysis_cache: AnalysisCache,
+        shared_verdict_cache: SharedVerdictCache,
+    ):
+        self.researcher = researcher
+        self.scheduler = scheduler
+        self.analysis_cache = analysis_cache
+        self.shared_verdict_cache = shared_verdict_cache
+
+    async def analyze(self, barcode: str, user_profiles: Sequence[UserProfile], region: Optional[str] = None) -> HouseholdAnalysis:
+        """
+        region is a known region code (see RegulationIndex.region_code) or None.
+        """
+        if not user_profiles:
+            raise ValueError("A household analysis needs at least one profile")
+        with start_span("household_analysis", barcode=barcode, members=len(user_profiles)) as span:
+            kb_version = data_fingerprint(self.scheduler.data_versions())
+            fingerprints = [regional_key(fingerprint_profile(profile), region) for profile in user_profiles]
+
+            # Members with identical settings share one analysis
+            analyses: Dict[str, ProductAnalysis] = {}
+            pending: Dict[str, UserProfile] = {}
+            for fingerprint, profile in zip(fingerprints, user_profiles):
+                if fingerprint in analyses or fingerprint in pending:
+                    continue
+                cached = self.analysis_cache.get(barcode, fingerprint, kb_version)
+                if cached is not None:
+                    analyses[fingerprint] = cached
+                else:
+                    pending[fingerprint] = profile
+            span.set_attributes({"distinct_profiles": len(analyses) + len(pending), "cache_hits": len(analyses)})
+
+            if pending:
+                analyses.update(await self._analyze_pending(barcode, pending, kb_version, region))
+            return self._household(barcode, user_profiles, [analyses[fingerprint] for fingerprint in fingerprints])
+
+    async def _analyze_pending(self, barcode: str, pending: Dict[str, UserProfile], kb_version: str, region: Optional[str]) -> Dict[str, ProductAnalysis]:
+        # 1. Researcher, once for the household
+        with start_span(f"agent {self.researcher.agent_name}", agent=self.researcher.agent_name, barcode=barcode) as span, AGENT_LATENCY.time(self.researcher.agent_name):
+            product_data_verdict = await self.researcher.analyze({"barcode": barcode})
+            span.set_attributes({"outcome": "ok", "status": product_data_verdict.status.value})
+
+        # 2. Normalization
+        agent_product_data, cache_ttl = prepare_product(product_data_verdict.details)
+
+        # 3. Profile-independent agents once, profile-dependent agents once for all the members
+        shared = await self.shared_verdict_cache.get_or_compute(
+            regional_key(barcode, region),
+            kb_version,
+            lambda: self.scheduler.run_profile_independent(agent_product_data, {"region": region}),
+            ttl=cache_ttl,
+        )
+        member_verdicts = await self.scheduler.run_batch(
+            [agent_product_data] * len(pending),
+            [{"user_profile": profile, "region": region} for profile in pending.values()],
+            shared_verdicts=[shared] * len(pending),
+        )
+
+        # 4. Aggregation, per member
+        analyses = {}
+        for fingerprint, verdicts in zip(pending, member_verdicts):
+            analysis = build_analysis(barcode, product_data_verdict, verdicts)
+            analyses[fingerprint] = analysis
+            if not is_degraded(verdicts):
+                self.analysis_cache.set(barcode, fingerprint, kb_version, analysis, ttl=cache_ttl)
+        return analyses
+
+    def _household(self, barcode: str, user_profiles: Sequence[UserProfile], analyses: List[ProductAnalysis]) -> HouseholdAnalysis:
+        first = analyses[0]
+        # The Researcher's verdict comes first, then the agents' in schedule order
+        shared_verdicts = [first.agent_verdicts[0]] + [
+            verdict for verdict in first.agent_verdicts[1:] if not self.scheduler.profile_dependent[verdict.agent_name]
+        ]
+        members = [
+            HouseholdMember(
+                user_id=profile.user_id,
+                overall_score=analysis.overall_score,
+                overall_status=analysis.overall_status,
+                verdicts=[verdict for verdict in analysis.agent_verdicts[1:] if self.scheduler.profile_dependent[verdict.agent_name]],
+                cache_hit=analysis.cache_hit,
+            )
+            for profile, analysis in zip(user_profiles, analyses)
+        ]
+        return HouseholdAnalysis(
+            product_id=barcode,
+            product_name=first.product_name,
+            shared_verdicts=shared_verdicts,
+            members=members,
+            timestamp=first.timestamp,
+        )
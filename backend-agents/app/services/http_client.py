@@ -0,0 +1,132 @@
+import asyncio
+import aiohttp
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from app.config import Settings, settings
+
+class SharedHTTPClient:
+    """
+    Application-wide HTTP client used by every upstream product API client.
+
+    Holds a single aiohttp session whose connector keeps connections alive, caches
+    DNS lookups and caps connections per host, so lookups reuse warm TCP/TLS
+    connections instead of paying for a new handshake every time.
+    The session is opened and closed by the FastAPI lifespan; scripts that never
+    go through the lifespan get one lazily on first use, closed when its event
+    loop shuts down (a session cannot be reused, nor closed, from another loop).
+    """
+
+    def __init__(self, config: Settings = settings):
+        self.config = config
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closers: Dict[asyncio.AbstractEventLoop, AsyncIterator[None]] = {}
+
+        # Pool usage statistics
+        self.sessions_opened = 0
+        self.requests_total = 0
+        self.errors_total = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.in_flight_per_host: Dict[str, int] = {}
+
+    async def start(self):
+        """
+        Opens the pooled session (called from the FastAPI lifespan).
+        """
+        self._open_session()
+
+    async def close(self):
+        """
+        Closes the pooled session and all of its idle connections.
+        """
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+    @staticmethod
+    async def _close_at_loop_shutdown(session: aiohttp.ClientSession) -> AsyncIterator[None]:
+        # Parked at the yield until the loop shuts down: asyncio.run() (and uvicorn)
+        # finalize pending async generators while the loop still runs, so the
+        # session and its connections are closed on the loop they belong to.
+        try:
+            yield
+        finally:
+            if not session.closed:
+                await session.close()
+
+    def _open_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.config.http_max_connections,
+            limit_per_host=self.config.http_max_connections_per_host,
+            keepalive_timeout=self.config.http_keepalive_timeout,
+            use_dns_cache=True,
+            ttl_dns_cache=self.config.http_dns_cache_ttl,
+        )
+        timeout = aiohttp.ClientTimeout(
+            connect=self.config.http_connect_timeout,
+            sock_read=self.config.http_read_timeout,
+        )
+        self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        self._loop = asyncio.get_running_loop()
+        self.sessions_opened += 1
+
+        # Closed loops no longer need their closer; keep a reference to this one's until it shuts down
+        self._closers = {loop: closer for loop, closer in self._closers.items() if not loop.is_closed()}
+        closer = self._close_at_loop_shutdown(self._session)
+        asyncio.ensure_future(closer.asend(None))
+        self._closers[self._loop] = closer
+        return self._session
+
+    def session(self) -> aiohttp.ClientSession:
+        """
+        Returns the pooled session, opening it if needed.
+        A session is bound to its event loop, so a new loop (e.g. a second asyncio.run) gets a new one.
+        """
+        if self._session is None or self._session.closed or self._loop is not asyncio.get_running_loop():
+            return self._open_session()
+        return self._session
+
+    async def get_json(self, url: str) -> Tuple[int, Optional[Any]]:
+        """
+        Performs a GET request through the pool.
+        Returns the HTTP status and the decoded JSON body (None unless the status is 200).
+        """
+        host = urlsplit(url).netloc
+        session = self.session()
+
+        self.requests_total += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        self.in_flight_per_host[host] = self.in_flight_per_host.get(host, 0) + 1
+        try:
+            async with session.get(url) as response:
+                data = await response.json(content_type=None) if response.status == 200 else None
+                return response.status, data
+        except Exception:
+            self.errors_total += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.in_flight_per_host[host] -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Pool usage statistics, used to size the pool under load.
+        """
+        return {
+            "open": self._session is not None and not self._session.closed,
+            "sessions_opened": self.sessions_opened,
+            "max_connections": self.config.http_max_connections,
+            "max_connections_per_host": self.config.http_max_connections_per_host,
+            "requests_total": self.requests_total,
+            "errors_total": self.errors_total,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "in_flight_per_host": {host: count for host, count in self.in_flight_per_host.items() if count},
+        }
+
+# Shared instance for the whole application
+shared_http_client = SharedHTTPClient()
@@ -0,0 +1,153 @@
+import re
+from functools import lru_cache
+from typing import Any, Dict, NamedTuple, Optional, Sequence, Tuple
+
+from app.config import settings
+
+# Common food additives, by E-number (in a real app, this would come from the OFF additives taxonomy)
+E_NUMBERS = {
+    "e100": "curcumin",
+    "e102": "tartrazine",
+    "e120": "carmine",
+    "e129": "allura red",
+    "e150a": "caramel color",
+    "e150d": "caramel color",
+    "e160a": "beta carotene",
+    "e211": "sodium benzoate",
+    "e250": "sodium nitrite",
+    "e270": "lactic acid",
+    "e300": "ascorbic acid vitamin c",
+    "e306": "tocopherol vitamin e",
+    "e322": "lecithin",
+    "e330": "citric acid",
+    "e338": "phosphoric acid",
+    "e340": "potassium phosphate",
+    "e407": "carrageenan",
+    "e412": "guar gum",
+    "e415": "xanthan gum",
+    "e420": "sorbitol",
+    "e440": "pectin",
+    "e441": "gelatin",
+    "e471": "mono and diglycerides of fatty acids",
+    "e500": "sodium bicarbonate",
+    "e621": "monosodium glutamate",
+    "e901": "beeswax",
+    "e904": "shellac",
+    "e951": "aspartame",
+}
+
+# INCI (cosmetic) names and other synonyms, mapped to the common name the agents' keywords use
+INCI_SYNONYMS = {
+    "aqua": "water",
+    "parfum": "fragrance",
+    "sodium chloride": "salt",
+    "sucrose": "sugar",
+    "tocopherol": "vitamin e",
+    "paraffinum liquidum": "mineral oil",
+    "cera alba": "beeswax",
+    "lanolin": "wool fat",
+    "butyrospermum parkii butter": "shea butter",
+    "elaeis guineensis oil": "palm oil",
+    "elaeis guineensis kernel oil": "palm kernel oil",
+    "cocos nucifera oil": "coconut oil",
+    "prunus amygdalus dulcis oil": "sweet almond oil",
+    "arachis hypogaea oil": "peanut oil",
+    "glycine soja oil": "soybean oil",
+    "triticum vulgare germ oil": "wheat germ oil",
+}
+
+_NON_WORD = re.compile(r"[\W_]+")
+_E_NUMBER = re.compile(r"\be ?(\d{3,4}[a-z]?)\b")
+
+# Joins an ingredient's text and its resolved names; normalized keywords never contain it,
+# so a keyword cannot match across the boundary.
+SEARCH_SEPARATOR = "|"
+
+def normalize_text(text: str) -> str:
+    """
+    Canonical form used for matching: casefolded, punctuation turned into spaces,
+    whitespace collapsed.
+    """
+    return _NON_WORD.sub(" ", text.casefold()).strip()
+
+
+class NormalizedIngredient(NamedTuple):
+    """
+    One ingredient as listed on the product, with its canonical text and the
+    common names it resolves to (E-numbers, INCI synonyms).
+    """
+    raw: Any
+    text: str
+    resolved: Tuple[str, ...]
+
+    @property
+    def search_text(self) -> str:
+        return SEARCH_SEPARATOR.join((self.text,) + self.resolved)
+
+
+class NormalizedIngredients(NamedTuple):
+    """
+    Immutable, canonical view of a product's ingredient list, computed once per
+    product and shared by every agent. ``raw`` keeps the original entries for
+    display; ``search_texts`` is what keyword matchers scan.
+    """
+    items: Tuple[NormalizedIngredient, ...]
+    raw: Tuple[Any, ...]
+    texts: Tuple[str, ...]
+    search_texts: Tuple[str, ...]
+
+
+def resolve_synonyms(text: str) -> Tuple[str, ...]:
+    """
+    Common names a canonical ingredient text resolves to; none when synonym
+    resolution is switched off (settings.ingredient_synonyms_enabled).
+    """
+    if not settings.ingredient_synonyms_enabled:
+        return ()
+    resolved = []
+    synonym = INCI_SYNONYMS.get(text)
+    if synonym:
+        resolved.append(synonym)
+    for code in _E_NUMBER.findall(text):
+        name = E_NUMBERS.get(f"e{code}")
+        if name and name not in resolved:
+            resolved.append(name)
+    return tuple(resolved)
+
+@lru_cache(maxsize=4096)
+def _normalize(raw_ingredients: Tuple[Any, ...], synonyms_enabled: bool) -> NormalizedIngredients:
+    # synonyms_enabled is only part of the memo key: a memoized list must not outlive a change of setting
+    items = []
+    for raw in raw_ingredients:
+        if isinstance(raw, str):
+            text = normalize_text(raw)
+            items.append(NormalizedIngredient(raw, text, resolve_synonyms(text)))
+        else:
+            items.append(NormalizedIngredient(raw, "", ()))
+    items = tuple(items)
+    return NormalizedIngredients(
+        items=items,
+        raw=raw_ingredients,
+        texts=tuple(item.text for item in items),
+        search_texts=tuple(item.search_text for item in items),
+    )
+
+def normalize_ingredients(ingredients: Optional[Sequence[Any]]) -> NormalizedIngredients:
+    """
+    Builds the canonical ingredient representation. Repeated lists (the same
+    product scanned again) are served from a small memo.
+    """
+    if not isinstance(ingredients, (list, tuple)):
+        ingredients = ()
+    raw = tuple(i if isinstance(i, str) else None for i in ingredients)
+    return _normalize(raw, settings.ingredient_synonyms_enabled)
+
+def get_normalized_ingredients(product_data: Dict[str, Any]) -> NormalizedIngredients:
+    """
+    Returns the ingredients normalized by the pipeline, or normalizes them on the
+    spot when an agent is called on its own.
+    """
+    normalized = product_data.get("normalized_ingredients")
+    if normalized is None:
+        normalized = normalize_ingredients(product_data.get("ingredients", []))
+    return normalized
@@ -0,0 +1,120 @@
+from collections import deque
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, NamedTuple, Sequence, Set, Tuple
+from app.services.ingredient_normalizer import NormalizedIngredients, normalize_text
+
+class KeywordMatch(NamedTuple):
+    """
+    One keyword occurrence: which text it was found in, and where.
+    """
+    text_index: int
+    keyword: str
+    start: int
+    end: int
+
+
+class KeywordMatcher:
+    """
+    Case- and punctuation-insensitive multi-keyword substring matcher (Aho-Corasick automaton).
+
+    The automaton is compiled once per keyword set; scanning a list of texts then
+    finds every occurrence of every keyword in a single pass over the characters,
+    instead of testing each keyword against each text. Keywords and texts are
+    compared in their normalize_text() form, and texts that are not strings are skipped.
+    Passing NormalizedIngredients scans their precomputed search texts (which also
+    carry resolved E-numbers and INCI synonyms) without normalizing anything again.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        # Deduplicate while keeping the caller's order, empty keywords would match everything
+        normalized = (normalize_text(k) for k in keywords if isinstance(k, str))
+        self.keywords: Tuple[str, ...] = tuple(dict.fromkeys(k for k in normalized if k))
+
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Tuple[int, ...]] = [()]
+
+        for keyword_id, keyword in enumerate(self.keywords):
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                state = next_state
+            self._output[state] += (keyword_id,)
+
+        # Breadth-first pass to compute failure links and merge outputs along them
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] += self._output[self._fail[next_state]]
+
+    def find_all(self, texts: Sequence[Any]) -> List[KeywordMatch]:
+        """
+        Returns every keyword occurrence in the texts, ordered by text then by end position.
+        """
+        if isinstance(texts, NormalizedIngredients):
+            texts = texts.search_texts
+        else:
+            texts = [normalize_text(text) if isinstance(text, str) else None for text in texts]
+
+        matches = []
+        goto, fail, output, keywords = self._goto, self._fail, self._output, self.keywords
+        for text_index, text in enumerate(texts):
+            if not text:
+                continue
+            state = 0
+            for position, char in enumerate(text):
+                while state and char not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(char, 0)
+                for keyword_id in output[state]:
+                    keyword = keywords[keyword_id]
+                    matches.append(KeywordMatch(text_index, keyword, position + 1 - len(keyword), position + 1))
+        return matches
+
+    def keywords_found(self, texts: Sequence[Any]) -> Set[str]:
+        """
+        The (normalized) keywords that occur in at least one text.
+        """
+        return {match.keyword for match in self.find_all(texts)}
+
+    def texts_by_keyword(self, texts: Sequence[Any]) -> Dict[str, List[int]]:
+        """
+        Maps each keyword found to the sorted indices of the texts containing it.
+        """
+        found: Dict[str, Set[int]] = {}
+        for match in self.find_all(texts):
+            found.setdefault(match.keyword, set()).add(match.text_index)
+        return {keyword: sorted(indices) for keyword, indices in found.items()}
+
+    def keywords_by_text(self, texts: Sequence[Any]) -> Dict[int, Set[str]]:
+        """
+        Maps each text index that has a match to the set of keywords it contains.
+        """
+        found: Dict[int, Set[str]] = {}
+        for match in self.find_all(texts):
+            found.setdefault(match.text_index, set()).add(match.keyword)
+        return found
+
+
+@lru_cache(maxsize=1024)
+def _compile(keywords: Tuple[str, ...]) -> KeywordMatcher:
+    return KeywordMatcher(keywords)
+
+def compile_matcher(keywords: Iterable[str]) -> KeywordMatcher:
+    """
+    Returns the compiled matcher for a keyword set, building it only the first time it is seen.
+    """
+    return _compile(tuple(keywords))
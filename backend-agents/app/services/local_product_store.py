@@ -0,0 +1,140 @@
+import json
+import os
+import sqlite3
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# The only product fields the agents read. Everything else in the dumps is dropped.
+STORED_FIELDS = ("product_name", "brands", "ingredients_text", "ingredients", "packaging", "packagings", "origins", "nutriments")
+# ...and, within the parsed ingredient and packaging lists, the keys the carbon estimator reads
+INGREDIENT_KEYS = ("text", "percent", "percent_estimate")
+PACKAGING_KEYS = ("material", "shape", "weight_measured", "weight_specified", "number_of_units")
+
+# Source name and category for each supported dump
+DUMP_SOURCES = {
+    "off": ("Open Food Facts", "food"),
+    "obf": ("Open Beauty Facts", "beauty"),
+}
+
+class LocalProductStore:
+    """
+    Local copy of the Open Food Facts / Open Beauty Facts catalogs, indexed by barcode.
+
+    Filled offline by app.services.dump_importer and read by the Researcher before
+    any upstream API. Records hold only STORED_FIELDS (nutriments trimmed to the
+    per-100g values), serialized as compact JSON in a WITHOUT ROWID table so a
+    lookup is a single primary-key probe.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS products ("
+            "barcode TEXT PRIMARY KEY, source TEXT NOT NULL, category TEXT NOT NULL, data TEXT NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+        self.lookups = 0
+        self.hits = 0
+
+    @classmethod
+    def open_if_exists(cls, path: Optional[str]) -> Optional["LocalProductStore"]:
+        """
+        Opens the store if it has been imported, otherwise returns None.
+        """
+        if not path or not os.path.exists(path):
+            return None
+        return cls(path)
+
+    @staticmethod
+    def compact_record(product: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Keeps only the fields the agents read.
+        """
+        record = {}
+        for field in STORED_FIELDS:
+            value = product.get(field)
+            if field == "nutriments" and isinstance(value, dict):
+                value = {k: v for k, v in value.items() if k.endswith("_100g") and v not in (None, "")}
+            elif field in ("ingredients", "packagings"):
+                keys = INGREDIENT_KEYS if field == "ingredients" else PACKAGING_KEYS
+                value = [
+                    {k: item[k] for k in keys if item.get(k) not in (None, "")}
+                    for item in value if isinstance(item, dict)
+                ] if isinstance(value, list) else None
+            if value not in (None, "", {}, []):
+                record[field] = value
+        return record
+
+    def get(self, barcode: str) -> Optional[Tuple[Dict[str, Any], str, str]]:
+        """
+        Returns (product record, source name, category) or None if the barcode is unknown.
+        """
+        self.lookups += 1
+        row = self._conn.execute("SELECT data, source, category FROM products WHERE barcode = ?", (barcode,)).fetchone()
+        if row is None:
+            return None
+        self.hits += 1
+        return json.loads(row[0]), row[1], row[2]
+
+    def get_many(self, barcodes: Iterable[str]) -> Dict[str, Tuple[Dict[str, Any], str, str]]:
+        """
+        Bulk get(): (product record, source name, category) by barcode, for the barcodes found.
+        """
+        barcodes = list(dict.fromkeys(barcodes))
+        found = {}
+        # Chunked to stay under SQLite's limit on query parameters
+        for start in range(0, len(barcodes), 500):
+            chunk = barcodes[start:start + 500]
+            rows = self._conn.execute(
+                f"SELECT barcode, data, source, category FROM products WHERE barcode IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            for barcode, data, source, category in rows:
+                found[barcode] = (json.loads(data), source, category)
+        self.lookups += len(barcodes)
+        self.hits += len(found)
+        return found
+
+    def upsert_many(self, rows: Iterable[Tuple[str, str, str, Dict[str, Any]]]) -> int:
+        """
+        Inserts or replaces (barcode, source name, category, record) rows in one transaction.
+        """
+        count = 0
+        def encoded():
+            nonlocal count
+            for barcode, source, category, record in rows:
+                count += 1
+                yield barcode, source, category, json.dumps(record, separators=(",", ":"), ensure_ascii=False)
+
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO products (barcode, source, category, data) VALUES (?, ?, ?, ?)",
+                encoded(),
+            )
+        return count
+
+    def iter_batches(self, batch_size: int = 10000) -> Iterator[List[Tuple[str, str, str, Dict[str, Any]]]]:
+        """
+        Yields every stored (barcode, source name, category, record), batch_size rows at a time in barcode order.
+        """
+        last_barcode = ""
+        while True:
+            rows = self._conn.execute(
+                "SELECT barcode, source, category, data FROM products WHERE barcode > ? ORDER BY barcode LIMIT ?",
+                (last_barcode, batch_size),
+            ).fetchall()
+            if not rows:
+                return
+            yield [(barcode, source, category, json.loads(data)) for barcode, source, category, data in rows]
+            last_barcode = rows[-1][0]
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"path": self.path, "lookups": self.lookups, "hits": self.hits}
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,284 @@
+"""
+Minimal Prometheus instrumentation (text exposition format 0.0.4), without extra dependencies.
+
+Histograms and gauges are updated in place from the event loop; observing a value
+is a bisect and two additions, so instrumenting the hot path costs next to nothing.
+Values that other components already track (cache statistics, pool usage) are
+read only when /metrics is scraped, through callback metrics.
+"""
+import asyncio
+import math
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from cache hits to slow upstream calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LOOP_LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    return repr(float(value))
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labelnames: Sequence[str], labelvalues: Sequence[Any], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric(ABC):
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+
+    @abstractmethod
+    def collect(self) -> List[str]:
+        """
+        The metric's sample lines, without the HELP/TYPE header.
+        """
+
+
+class Counter(Metric):
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[Any, ...], float] = {}
+
+    def inc(self, *labelvalues: Any, amount: float = 1.0):
+        self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def collect(self) -> List[str]:
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(Counter):
+    metric_type = "gauge"
+
+    def set(self, value: float, *labelvalues: Any):
+        self._values[labelvalues] = value
+
+    def dec(self, *labelvalues: Any, amount: float = 1.0):
+        self.inc(*labelvalues, amount=-amount)
+
+
+class Histogram(Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[Any, ...], list] = {} # labels -> [per-bucket counts (+Inf last), sum, count]
+
+    def observe(self, value: float, *labelvalues: Any):
+        series = self._series.get(labelvalues)
+        if series is None:
+            series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def time(self, *labelvalues: Any) -> "Timer":
+        return Timer(self, labelvalues)
+
+    def collect(self) -> List[str]:
+        lines = self.header()
+        bounds = self.buckets + (math.inf,)
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Timer:
+    """
+    Context manager observing the elapsed time into a histogram. If the histogram
+    has an "outcome" label as its last label, it is filled with "ok", or with
+    "error" / "timeout" / "cancelled" when the block raises (callers may also set
+    timer.outcome themselves).
+    """
+    def __init__(self, histogram: Histogram, labelvalues: Tuple[Any, ...]):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+        self.with_outcome = histogram.labelnames[-1:] == ("outcome",) and len(labelvalues) == len(histogram.labelnames) - 1
+        self.outcome = "ok"
+
+    def __enter__(self) -> "Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        if exc_type is not None and self.outcome == "ok":
+            if issubclass(exc_type, asyncio.CancelledError):
+                self.outcome = "cancelled"
+            elif issubclass(exc_type, asyncio.TimeoutError):
+                self.outcome = "timeout"
+            else:
+                self.outcome = "error"
+        labels = self.labelvalues + (self.outcome,) if self.with_outcome else self.labelvalues
+        self.histogram.observe(elapsed, *labels)
+        return False
+
+
+class CallbackMetric(Metric):
+    """
+    Metric whose samples are read from a callback at scrape time: the callback
+    returns {label values tuple: value}.
+    """
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], callback: Callable[[], Dict[Tuple[Any, ...], float]], metric_type: str = "gauge"):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self.metric_type = metric_type
+
+    def collect(self) -> List[str]:
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in sorted(self.callback().items())
+        ]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name: str, documentation: str, labelnames: Sequence[str], callback: Callable[[], Dict[Tuple[Any, ...], float]], metric_type: str = "gauge") -> CallbackMetric:
+        return self.register(CallbackMetric(name, documentation, labelnames, callback, metric_type))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            try:
+                lines.extend(metric.collect())
+            except Exception as e:
+                # A broken callback must not take the whole scrape down
+                print(f"[Metrics] Failed to collect {metric.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+
+# Shared registry and the metrics updated on the hot path
+metrics = MetricsRegistry()
+
+REQUEST_LATENCY = metrics.histogram(
+    "ethical_lens_request_duration_seconds", "Time to serve an HTTP request, until the last body byte.", ["method", "route", "status"]
+)
+REQUESTS_IN_FLIGHT = metrics.gauge(
+    "ethical_lens_requests_in_flight", "HTTP requests currently being served."
+)
+AGENT_LATENCY = metrics.histogram(
+    "ethical_lens_agent_duration_seconds", "Time an agent takes to produce its verdict.", ["agent", "outcome"]
+)
+UPSTREAM_LATENCY = metrics.histogram(
+    "ethical_lens_upstream_duration_seconds", "Latency of calls to upstream services.", ["upstream", "outcome"]
+)
+REQUESTS_IN_FLIGHT.set(0)
+EVENT_LOOP_LAG = metrics.histogram(
+    "ethical_lens_event_loop_lag_seconds", "How late the event loop woke up a periodic probe.", buckets=LOOP_LAG_BUCKETS
+)
+EVENT_LOOP_LAG_LAST = metrics.gauge(
+    "ethical_lens_event_loop_lag_last_seconds", "Event loop lag measured by the latest probe."
+)
+
+def upstream_timer(upstream: str) -> Timer:
+    """
+    Times one upstream call: with upstream_timer("open_food_facts") as timer: ...
+    """
+    return UPSTREAM_LATENCY.time(upstream)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency per route (including streamed bodies) and in-flight requests.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            # The matched route template is only known once routing has run
+            matched = scope.get("route")
+            route_label = getattr(matched, "path", None) or "unmatched"
+            REQUEST_LATENCY.observe(time.perf_counter() - start, scope["method"], route_label, status["code"])
+
+
+class EventLoopLagMonitor:
+    """
+    Periodically sleeps for a fixed interval and records how much later than
+    expected it woke up: a direct measure of blocking work on the event loop.
+    """
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - expected)
+            EVENT_LOOP_LAG.observe(lag)
+            EVENT_LOOP_LAG_LAST.set(lag)
@@ -0,0 +1,166 @@
+"""
+Declarative nutrient limits for medical conditions (Bio-Shield's disease guard).
+
+Rules are loaded from a data file (app/data/nutrient_rules.json by default):
+each condition, known by its name or any alias, lists nutriments (per 100 g,
+as Open Food Facts reports them) and the threshold above which a product is a
+risk for it. A set of rules compiles into a RuleEvaluator holding the rules'
+nutriment columns and thresholds as arrays, so checking products is one
+comparison between a products x nutriments matrix and the threshold vector,
+whether it is one product against a profile, a whole pantry, or the catalog.
+"""
+import json
+import os
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services.cache import data_fingerprint
+from app.services.ingredient_normalizer import normalize_text
+
+DEFAULT_NUTRIENT_RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "nutrient_rules.json")
+
+class NutrientRule(NamedTuple):
+    """
+    A nutrient limit for a medical condition: warn when nutriment (per 100g) exceeds the threshold.
+    """
+    condition: str
+    nutriment: str
+    threshold: float
+    label: str
+
+
+def _as_float(value: Any) -> float:
+    # Unreadable values count as 0, like an absent nutriment
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+def product_nutriments(product_data: Dict[str, Any]) -> Mapping[str, Any]:
+    """
+    The per-100g nutriments of a product, as the agents see it.
+    """
+    return (product_data.get("raw_data") or {}).get("nutriments") or {}
+
+
+class RuleEvaluator:
+    """
+    A fixed list of rules compiled to arrays: rule i compares column columns[i]
+    of the nutriment matrix with thresholds[i].
+
+    An evaluator selected from a larger one (a profile's rules out of the whole
+    rule set) keeps a link to it: parent.evaluate() over a batch of products,
+    sliced with indices, gives the results for every profile at once.
+    """
+
+    def __init__(self, rules: Sequence[NutrientRule], parent: Optional["RuleEvaluator"] = None, indices: Sequence[int] = ()):
+        self.rules = tuple(rules)
+        self.parent = parent or self
+        self.indices = np.array(indices if parent is not None else range(len(self.rules)), dtype=np.intp)
+        self.nutriments = tuple(dict.fromkeys(rule.nutriment for rule in self.rules))
+        column = {nutriment: i for i, nutriment in enumerate(self.nutriments)}
+        self.columns = np.array([column[rule.nutriment] for rule in self.rules], dtype=np.intp)
+        self.thresholds = np.array([rule.threshold for rule in self.rules], dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def matrix(self, products: Sequence[Mapping[str, Any]]) -> np.ndarray:
+        """
+        Products x nutriments matrix of values from nutriments dicts (0 where missing).
+        """
+        n, k = len(products), len(self.nutriments)
+        values = (_as_float(nutriments.get(key, 0)) for nutriments in products for key in self.nutriments)
+        return np.fromiter(values, dtype=np.float64, count=n * k).reshape(n, k)
+
+    def evaluate(self, matrix: np.ndarray) -> np.ndarray:
+        """
+        Boolean products x rules matrix: True where the product exceeds the rule's threshold.
+        """
+        return matrix[:, self.columns] > self.thresholds
+
+    def warnings_from(self, hits: np.ndarray, nutriments: Mapping[str, Any]) -> List[str]:
+        """
+        Warnings for one product, from its row of evaluate() (in rule order).
+        """
+        warnings = []
+        for r in np.flatnonzero(hits):
+            rule = self.rules[r]
+            value = nutriments.get(rule.nutriment, 0)
+            warnings.append(f"{rule.label} ({value}g/100g) - Risk for {rule.condition}")
+        return warnings
+
+    def warnings_batch(self, products: Sequence[Mapping[str, Any]]) -> List[List[str]]:
+        """
+        Warnings for each of the given nutriments dicts, in rule order.
+        """
+        if not self.rules or not products:
+            return [[] for _ in products]
+        hits = self.evaluate(self.matrix(products))
+        return [self.warnings_from(row, nutriments) for row, nutriments in zip(hits, products)]
+
+    def warnings(self, nutriments: Mapping[str, Any]) -> List[str]:
+        if not self.rules:
+            return []
+        return self.warnings_batch([nutriments])[0]
+
+
+class NutrientRuleSet:
+    """
+    Every rule from the data file, with condition names and aliases indexed for
+    compiling the rules that apply to a profile.
+    """
+
+    def __init__(self, data: Dict[str, Dict[str, Dict[str, Any]]]):
+        self.data = data
+        self.version = data_fingerprint(data)
+
+        rules: List[NutrientRule] = []
+        self._condition_rules: Dict[str, Tuple[int, ...]] = {}
+        self._names: Dict[str, str] = {}
+        for condition, info in data.get("conditions", {}).items():
+            start = len(rules)
+            for rule in info.get("rules", []):
+                rules.append(NutrientRule(condition, rule["nutriment"], float(rule["threshold"]), rule["label"]))
+            self._condition_rules[condition] = tuple(range(start, len(rules)))
+            for alias in [condition] + list(info.get("aliases", [])):
+                self._names.setdefault(normalize_text(alias), condition)
+        self.rules = tuple(rules)
+        self.evaluator = RuleEvaluator(self.rules)
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_NUTRIENT_RULES_PATH) -> "NutrientRuleSet":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def resolve_conditions(self, conditions: Iterable[str]) -> Tuple[str, ...]:
+        """
+        The known conditions among the user's (by name or alias, any case), in data file order.
+        """
+        found = {self._names.get(normalize_text(condition)) for condition in conditions if isinstance(condition, str)}
+        return tuple(condition for condition in self._condition_rules if condition in found)
+
+    def compile(self, conditions: Optional[Iterable[str]] = None) -> RuleEvaluator:
+        """
+        Evaluator for the rules of the given conditions (every rule when None).
+        """
+        if conditions is None:
+            return self.evaluator
+        indices = sorted(i for condition in self.resolve_conditions(conditions) for i in self._condition_rules[condition])
+        return RuleEvaluator([self.rules[i] for i in indices], parent=self.evaluator, indices=indices)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "conditions": len(self._condition_rules),
+            "rules": len(self.rules),
+            "nutriments": len(self.evaluator.nutriments),
+            "names_indexed": len(self._names),
+        }
+
+# Shared rule set for the whole application
+nutrient_rules = NutrientRuleSet.from_file(settings.nutrient_rules_path or DEFAULT_NUTRIENT_RULES_PATH)
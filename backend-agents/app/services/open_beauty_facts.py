@@ -1,5 +1,9 @@
-import aiohttp
 from typing import Optional, Dict, Any
+from app.services.circuit_breaker import CircuitBreaker, UpstreamUnavailableError, is_unavailable_response
+from app.services.http_client import SharedHTTPClient, shared_http_client
+from app.services.metrics import upstream_timer
+from app.services.single_flight import SingleFlight
+from app.services.tracing import SPAN_KIND_CLIENT, start_span
 
 class OpenBeautyFactsClient:
     """
@@ -7,22 +11,41 @@ class OpenBeautyFactsClient:
     """
     BASE_URL = "https://world.openbeautyfacts.org/api/v0"
 
+    def __init__(self, http_client: Optional[SharedHTTPClient] = None, circuit_breaker: Optional[CircuitBreaker] = None):
+        self.http_client = http_client or shared_http_client
+        self.single_flight = SingleFlight()
+        self.circuit_breaker = circuit_breaker or CircuitBreaker.from_settings("open_beauty_facts")
+
     async def get_product_by_barcode(self, barcode: str) -> Optional[Dict[str, Any]]:
         """
         Fetches product data from Open Beauty Facts by barcode.
+        Returns None if the product is not found; raises UpstreamUnavailableError
+        (or the underlying timeout / connection error) if the upstream failed.
         """
+        # Concurrent scans of the same barcode share one upstream request
+        return await self.single_flight.do(barcode, lambda: self._fetch_product(barcode))
+
+    async def _fetch_product(self, barcode: str) -> Optional[Dict[str, Any]]:
         url = f"{self.BASE_URL}/product/{barcode}.json"
-        
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        # OBF returns { "status": 1, "product": { ... } } if found
-                        # or { "status": 0, "status_verbose": "product not found" }
-                        if data and data.get("status") == 1:
-                            return data.get("product")
-                    return None
-        except Exception as e:
-            print(f"Error fetching data from Open Beauty Facts: {e}")
+        # Raises CircuitOpenError while the upstream looks down: the Researcher moves straight on to the next source
+        self.circuit_breaker.check()
+
+        # Timeouts and connection errors propagate too: a failed lookup must not pass for "not found"
+        with start_span("GET open_beauty_facts", kind=SPAN_KIND_CLIENT, upstream="open_beauty_facts", barcode=barcode) as span, upstream_timer("open_beauty_facts") as timer:
+            status, data = await self.circuit_breaker.run(lambda: self.http_client.get_json(url), is_failure=is_unavailable_response)
+            span.set_attribute("http.status_code", status)
+            if status != 200:
+                timer.outcome = "error"
+                span.set_error(f"HTTP {status}")
+            span.set_attribute("outcome", timer.outcome)
+        if status == 200:
+            # OBF returns { "status": 1, "product": { ... } } if found
+            # or { "status": 0, "status_verbose": "product not found" }
+            if data and data.get("status") == 1:
+                return data.get("product")
+            return None
+        elif is_unavailable_response((status, data)):
+            raise UpstreamUnavailableError("open_beauty_facts", status)
+        else:
+            print(f"Error fetching data from Open Beauty Facts: {status}")
             return None
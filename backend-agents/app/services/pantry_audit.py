@@ -0,0 +1,151 @@
+"""
+Pantry audit: one user profile against a whole list of products.
+
+Analysing a pantry item by item repeats, for every barcode, the per-request
+work of /analyze: fingerprinting and compiling the profile, resolving the
+knowledge-base version, a Researcher lookup, one scheduler run with a task per
+agent, and so on. The audit does each of these once for the whole list
+instead: products are fetched in bulk (a single local store query, upstream
+lookups with bounded concurrency), every agent is called once through its
+analyze_batch over all the products that need it, and results are aggregated
+into per-item analyses plus summary statistics.
+
+Analyses are read from and written to the same caches as /analyze, so an
+audited product is a cache hit for the user's next scan and vice versa.
+"""
+import time
+from typing import Dict, List, Optional, Sequence
+
+from app.agents.researcher import ResearcherAgent
+from app.models.pantry_audit import PantryAudit, PantryItem, PantrySummary
+from app.models.product_analysis import AgentVerdict, ProductAnalysis, TrafficLightStatus
+from app.models.user_profile import UserProfile
+from app.services.agent_scheduler import AgentScheduler
+from app.services.analysis_cache import AnalysisCache, SharedVerdictCache
+from app.services.analysis_pipeline import build_analysis, is_degraded, prepare_product, regional_key
+from app.services.cache import data_fingerprint
+from app.services.profile_compiler import fingerprint_profile
+from app.services.tracing import start_span
+
+
+class PantryAuditor:
+    def __init__(
+        self,
+        researcher: ResearcherAgent,
+        scheduler: AgentScheduler,
+        analysis_cache: AnalysisCache,
+        shared_verdict_cache: SharedVerdictCache,
+        max_concurrency: int = 16,
+    ):
+        self.researcher = researcher
+        self.scheduler = scheduler
+        self.analysis_cache = analysis_cache
+        self.shared_verdict_cache = shared_verdict_cache
+        self.max_concurrency = max_concurrency
+
+    async def audit(self, barcodes: Sequence[str], user_profile: UserProfile, region: Optional[str] = None) -> PantryAudit:
+        """
+        region is a known region code (see RegulationIndex.region_code) or None.
+        """
+        with start_span("pantry_audit", items=len(barcodes)) as span:
+            start = time.perf_counter()
+            analyses, errors, cache_hits = await self._analyze(list(dict.fromkeys(barcodes)), user_profile, region)
+
+            items = [
+                PantryItem(index=index, barcode=barcode, analysis=analyses.get(barcode), error=errors.get(barcode))
+                for index, barcode in enumerate(barcodes)
+            ]
+            summary = summarize(items, len(analyses) + len(errors), cache_hits)
+            summary.elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+            span.set_attributes({"unique_products": summary.unique_products, "cache_hits": cache_hits, "failed_items": summary.failed_items})
+            return PantryAudit(items=items, summary=summary)
+
+    async def _analyze(self, barcodes: List[str], user_profile: UserProfile, region: Optional[str]):
+        """
+        Analyses distinct barcodes; returns (analyses, errors, cache hits), keyed by barcode.
+        """
+        profile_fingerprint = regional_key(fingerprint_profile(user_profile), region)
+        kb_version = data_fingerprint(self.scheduler.data_versions())
+
+        analyses: Dict[str, ProductAnalysis] = {}
+        errors: Dict[str, str] = {}
+        for barcode in barcodes:
+            cached = self.analysis_cache.get(barcode, profile_fingerprint, kb_version)
+            if cached is not None:
+                analyses[barcode] = cached
+        cache_hits = len(analyses)
+
+        # 1. Researcher: every missing product in one bulk lookup
+        pending = [barcode for barcode in barcodes if barcode not in analyses]
+        research: Dict[str, AgentVerdict] = {}
+        for barcode, outcome in (await self.researcher.analyze_many(pending, self.max_concurrency)).items():
+            if isinstance(outcome, BaseException):
+                print(f"[PantryAudit] Lookup of {barcode} failed: {outcome}")
+                errors[barcode] = f"{type(outcome).__name__}: {outcome}"
+            else:
+                research[barcode] = outcome
+        pending = [barcode for barcode in pending if barcode in research]
+        if not pending:
+            return analyses, errors, cache_hits
+
+        # 2. Normalization, once per product
+        prepared = {barcode: prepare_product(research[barcode].details) for barcode in pending}
+
+        # 3. Profile-independent agents: cached verdicts where available, one batch run for the rest
+        shared: Dict[str, Dict[str, AgentVerdict]] = {}
+        missing = []
+        for barcode in pending:
+            verdicts = self.shared_verdict_cache.get(regional_key(barcode, region), kb_version)
+            if verdicts is None:
+                missing.append(barcode)
+            else:
+                shared[barcode] = verdicts
+        if missing:
+            computed = await self.scheduler.run_profile_independent_batch([prepared[barcode].product_data for barcode in missing], {"region": region})
+            for barcode, verdicts in zip(missing, computed):
+                shared[barcode] = verdicts
+                self.shared_verdict_cache.set(regional_key(barcode, region), kb_version, verdicts, ttl=prepared[barcode].cache_ttl)
+
+        # Profile-dependent agents, each called once for the whole pantry
+        context = {"user_profile": user_profile, "region": region}
+        agent_verdicts = await self.scheduler.run_batch(
+            [prepared[barcode].product_data for barcode in pending],
+            [context] * len(pending),
+            shared_verdicts=[shared[barcode] for barcode in pending],
+        )
+
+        # 4. Aggregation
+        for barcode, verdicts in zip(pending, agent_verdicts):
+            analysis = build_analysis(barcode, research[barcode], verdicts)
+            analyses[barcode] = analysis
+            if not is_degraded(verdicts):
+                self.analysis_cache.set(barcode, profile_fingerprint, kb_version, analysis, ttl=prepared[barcode].cache_ttl)
+        return analyses, errors, cache_hits
+
+
+def summarize(items: List[PantryItem], unique_products: int, cache_hits: int) -> PantrySummary:
+    status_counts = {status.value: 0 for status in TrafficLightStatus}
+    agent_flags: Dict[str, int] = {}
+    scores = []
+    flagged = []
+    for item in items:
+        if item.analysis is None:
+            continue
+        status_counts[item.analysis.overall_status.value] += 1
+        scores.append(item.analysis.overall_score)
+        if item.analysis.overall_status == TrafficLightStatus.RED:
+            flagged.append(item.barcode)
+        for verdict in item.analysis.agent_verdicts:
+            if verdict.status != TrafficLightStatus.GREEN:
+                agent_flags[verdict.agent_name] = agent_flags.get(verdict.agent_name, 0) + 1
+
+    return PantrySummary(
+        total_items=len(items),
+        unique_products=unique_products,
+        failed_items=sum(1 for item in items if item.analysis is None),
+        cache_hits=cache_hits,
+        status_counts=status_counts,
+        average_score=round(sum(scores) / len(scores), 2) if scores else None,
+        flagged=flagged,
+        agent_flags=agent_flags,
+    )
@@ -0,0 +1,95 @@
+import asyncio
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import Settings, settings
+from app.services.cache import MISSING, LRUCache, SQLiteStore
+
+class ProductCache:
+    """
+    Two-tier cache for product lookups, keyed by barcode.
+
+    Tier 1 is a bounded in-process LRU, tier 2 a local SQLite file that survives
+    restarts. Disk hits are promoted back into memory. A barcode no source knows
+    about is cached as None (negative caching) with a shorter TTL, so repeated
+    scans of unknown products don't keep falling through every source.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        ttl: float = 86400.0,
+        negative_ttl: float = 900.0,
+        path: Optional[str] = None,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.memory = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.disk = SQLiteStore(path, table="products") if path else None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_settings(cls, config: Settings = settings) -> "ProductCache":
+        return cls(
+            maxsize=config.product_cache_size,
+            ttl=config.product_cache_ttl,
+            negative_ttl=config.product_cache_negative_ttl,
+            path=config.product_cache_path or None,
+        )
+
+    async def get(self, barcode: str) -> Tuple[Any, str]:
+        """
+        Returns (entry, tier). The entry is the cached record, None for a cached
+        "not found", or MISSING; the tier is "memory", "disk" or "miss".
+        """
+        entry = self.memory.get(barcode)
+        if entry is not MISSING:
+            self.memory_hits += 1
+            if self._is_negative(entry):
+                self.negative_hits += 1
+            return entry, "memory"
+
+        if self.disk is not None:
+            entry, remaining_ttl = await asyncio.to_thread(self.disk.get_with_ttl, barcode)
+            if entry is not MISSING:
+                self.disk_hits += 1
+                if self._is_negative(entry):
+                    self.negative_hits += 1
+                self.memory.set(barcode, entry, ttl=remaining_ttl)
+                return entry, "disk"
+
+        self.misses += 1
+        return MISSING, "miss"
+
+    @staticmethod
+    def _is_negative(entry: Optional[Dict[str, Any]]) -> bool:
+        return entry is None or bool(entry.get("not_found"))
+
+    async def set(self, barcode: str, entry: Optional[Dict[str, Any]]):
+        """
+        Caches a lookup result. None, or an entry flagged "not_found" (e.g. a generic
+        placeholder), marks the barcode as not found and gets the shorter TTL.
+        """
+        ttl = self.negative_ttl if self._is_negative(entry) else self.ttl
+        self.memory.set(barcode, entry, ttl=ttl)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, barcode, entry, ttl)
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "memory": self.memory.stats(),
+            "disk_entries": len(self.disk) if self.disk is not None else 0,
+        }
@@ -0,0 +1,290 @@
+"""
+Similarity index over the local product catalog (Alternative Recommender).
+
+Usage (offline, after importing the dumps):
+    python -m app.services.product_index --store local_products.sqlite3 --output product_index.npz
+
+Every product becomes a sparse TF-IDF vector over two kinds of terms: its
+canonical ingredients (with the names they resolve to, so "E322" and
+"lecithin" meet) and the words of its name, which stand in for the category
+("milk", "spread", "cola"). Terms found in a single product are dropped, since
+they cannot make two products similar. Vectors are L2-normalized, so the dot
+product of two of them is their cosine similarity.
+
+The index is a handful of flat numpy arrays: the vectors row by row (CSR), and
+the same weights term by term as an inverted index whose postings are sorted
+by decreasing weight. A query scores only the products sharing a term with
+it, and reads at most max_postings of each term's postings: the products
+where that term weighs the most. Very common terms ("sugar", "water") are
+truncated that way instead of touching a large share of the catalog, so a
+top-k query costs a few thousand postings whatever the size of the catalog.
+"""
+import argparse
+import hashlib
+import math
+import os
+import time
+from array import array
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.cache import data_fingerprint
+from app.services.carbon_estimator import catalog_product
+from app.services.ingredient_normalizer import get_normalized_ingredients, normalize_text
+
+# Name words count double: they say what kind of product it is
+NAME_WEIGHT = 2.0
+MIN_DOCUMENT_FREQUENCY = 2
+DEFAULT_MAX_POSTINGS = 4096
+
+class SimilarProduct(NamedTuple):
+    barcode: str
+    category: str
+    similarity: float
+
+
+def product_terms(product_data: Dict[str, Any]) -> List[str]:
+    """
+    The terms of a product's vector: "i:<ingredient>" and "n:<name word>", without repeats.
+    """
+    terms = []
+    for item in get_normalized_ingredients(product_data).items:
+        if item.text:
+            terms.append(f"i:{item.text}")
+            terms.extend(f"i:{name}" for name in item.resolved)
+    for word in normalize_text(product_data.get("product_name") or "").split():
+        # Sizes and other numbers say nothing about the product
+        if len(word) > 2 and not word.isdigit():
+            terms.append(f"n:{word}")
+    return list(dict.fromkeys(terms))
+
+def _term_factors(terms: Sequence[str]) -> np.ndarray:
+    return np.array([NAME_WEIGHT if term.startswith("n:") else 1.0 for term in terms], dtype=np.float64)
+
+
+class ProductIndex:
+    """
+    TF-IDF vectors of the catalog's products and their inverted index.
+    """
+
+    def __init__(
+        self,
+        barcodes: np.ndarray,
+        categories: np.ndarray,
+        category_names: Sequence[str],
+        terms: Sequence[str],
+        idf: np.ndarray,
+        post_indptr: np.ndarray,
+        post_docs: np.ndarray,
+        post_weights: np.ndarray,
+        max_postings: int = DEFAULT_MAX_POSTINGS,
+    ):
+        self.barcodes = barcodes # Fixed-width ASCII bytes, one per product
+        self.categories = categories # Index into category_names, one per product
+        self.category_names = tuple(category_names)
+        self.terms = tuple(terms)
+        self.idf = idf
+        self.post_indptr = post_indptr # Postings of term t: post_docs/post_weights[post_indptr[t]:post_indptr[t + 1]]
+        self.post_docs = post_docs
+        self.post_weights = post_weights
+        self.max_postings = max_postings
+
+        self._term_ids = {term: i for i, term in enumerate(self.terms)}
+        self._factors = _term_factors(self.terms)
+        self._category_codes = {name: code for code, name in enumerate(self.category_names)}
+
+        digest = hashlib.sha256()
+        for values in (barcodes, categories, post_indptr, post_docs, post_weights):
+            digest.update(np.ascontiguousarray(values).tobytes())
+        self.version = data_fingerprint({"index": digest.hexdigest(), "terms": self.terms, "categories": self.category_names})
+
+    @classmethod
+    def build(
+        cls,
+        rows: Iterable[Tuple[str, str, str, Dict[str, Any]]],
+        min_df: int = MIN_DOCUMENT_FREQUENCY,
+        max_postings: int = DEFAULT_MAX_POSTINGS,
+    ) -> "ProductIndex":
+        """
+        Indexes (barcode, source name, category, record) rows, as LocalProductStore.iter_batches yields them.
+        """
+        barcodes: List[str] = []
+        categories = array("B")
+        category_codes: Dict[str, int] = {}
+        vocabulary: Dict[str, int] = {}
+        lengths = array("i")
+        doc_terms = array("i")
+        for barcode, _, category, record in rows:
+            ids = [vocabulary.setdefault(term, len(vocabulary)) for term in product_terms(catalog_product(record))]
+            barcodes.append(barcode)
+            categories.append(category_codes.setdefault(category, len(category_codes)))
+            lengths.append(len(ids))
+            doc_terms.extend(ids)
+
+        n = len(barcodes)
+        term_ids = np.array(doc_terms, dtype=np.int32)
+        doc_ids = np.repeat(np.arange(n, dtype=np.int32), np.array(lengths, dtype=np.intp))
+
+        # Drop the terms too rare to relate two products, and renumber the others
+        df = np.bincount(term_ids, minlength=len(vocabulary))
+        kept = df >= min_df
+        remap = np.cumsum(kept) - 1
+        vocabulary_terms = list(vocabulary)
+        terms = [vocabulary_terms[t] for t in np.flatnonzero(kept)]
+        mask = kept[term_ids]
+        term_ids, doc_ids = remap[term_ids[mask]].astype(np.int32), doc_ids[mask]
+
+        # Binary term frequencies: idf (smoothed), times NAME_WEIGHT for name words, L2-normalized per product
+        idf = np.log((1 + n) / (1 + df[kept])) + 1.0
+        weights = idf[term_ids] * _term_factors(terms)[term_ids]
+        norms = np.sqrt(np.bincount(doc_ids, weights=weights * weights, minlength=n))
+        weights /= norms[doc_ids]
+
+        # Inverted index, each term's postings by decreasing weight
+        order = np.lexsort((-weights, term_ids))
+        post_indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(terms)), out=post_indptr[1:])
+        return cls(
+            barcodes=np.array(barcodes, dtype=np.bytes_) if barcodes else np.zeros(0, dtype="S1"),
+            categories=np.array(categories, dtype=np.uint8),
+            category_names=list(category_codes),
+            terms=terms,
+            idf=idf.astype(np.float32),
+            post_indptr=post_indptr,
+            post_docs=doc_ids[order],
+            post_weights=weights[order].astype(np.float32),
+            max_postings=max_postings,
+        )
+
+    @classmethod
+    def load(cls, path: str, max_postings: int = DEFAULT_MAX_POSTINGS) -> "ProductIndex":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                barcodes=data["barcodes"],
+                categories=data["categories"],
+                category_names=data["category_names"].tolist(),
+                terms=data["terms"].tolist(),
+                idf=data["idf"],
+                post_indptr=data["post_indptr"],
+                post_docs=data["post_docs"],
+                post_weights=data["post_weights"],
+                max_postings=max_postings,
+            )
+
+    @classmethod
+    def open_if_exists(cls, path: Optional[str], max_postings: int = DEFAULT_MAX_POSTINGS) -> Optional["ProductIndex"]:
+        """
+        Loads the index if it has been built, otherwise returns None.
+        """
+        if not path or not os.path.exists(path):
+            return None
+        return cls.load(path, max_postings)
+
+    def save(self, path: str):
+        # Written through a file object so numpy doesn't append .npz to the name
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                barcodes=self.barcodes,
+                categories=self.categories,
+                category_names=np.array(self.category_names, dtype=np.str_),
+                terms=np.array(self.terms, dtype=np.str_),
+                idf=self.idf,
+                post_indptr=self.post_indptr,
+                post_docs=self.post_docs,
+                post_weights=self.post_weights,
+            )
+
+    def vectorize(self, product_data: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The product's (term ids, weights) over the index vocabulary, L2-normalized. Unknown terms are left out.
+        """
+        ids = np.array([t for t in (self._term_ids.get(term) for term in product_terms(product_data)) if t is not None], dtype=np.intp)
+        weights = self.idf[ids].astype(np.float64) * self._factors[ids]
+        norm = math.sqrt(float(weights @ weights)) if len(ids) else 0.0
+        return ids, (weights / norm if norm else weights)
+
+    def search(
+        self,
+        product_data: Dict[str, Any],
+        k: int = 10,
+        category: Optional[str] = None,
+        exclude: Iterable[str] = (),
+    ) -> List[SimilarProduct]:
+        """
+        The k products most similar to product_data (cosine), best first. With a
+        category, only products of that catalog category are returned.
+        """
+        ids, weights = self.vectorize(product_data)
+        if not len(ids) or k <= 0:
+            return []
+
+        # Candidates: the top postings of each query term, scored by accumulating weight products
+        starts = self.post_indptr[ids]
+        ends = np.minimum(self.post_indptr[ids + 1], starts + self.max_postings)
+        docs = np.concatenate([self.post_docs[s:e] for s, e in zip(starts, ends)])
+        contributions = np.concatenate([self.post_weights[s:e] * w for s, e, w in zip(starts, ends, weights)])
+        candidates, inverse = np.unique(docs, return_inverse=True)
+        scores = np.bincount(inverse, weights=contributions)
+
+        keep = np.ones(len(candidates), dtype=bool)
+        if category is not None:
+            code = self._category_codes.get(category)
+            if code is None:
+                return []
+            keep &= self.categories[candidates] == code
+        exclude = [barcode.encode("ascii", "ignore") for barcode in exclude]
+        if exclude:
+            keep &= ~np.isin(self.barcodes[candidates], exclude)
+        candidates, scores = candidates[keep], scores[keep]
+
+        if len(candidates) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            candidates, scores = candidates[top], scores[top]
+        order = np.lexsort((candidates, -scores)) # Best first, ties by catalog order
+        return [
+            SimilarProduct(self.barcodes[d].decode("ascii"), self.category_names[self.categories[d]], round(float(s), 4))
+            for d, s in zip(candidates[order], scores[order])
+        ]
+
+    def __len__(self) -> int:
+        return len(self.barcodes)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "products": len(self.barcodes),
+            "terms": len(self.terms),
+            "postings": len(self.post_docs),
+            "max_postings": self.max_postings,
+            "memory_bytes": sum(a.nbytes for a in (self.barcodes, self.categories, self.idf, self.post_indptr, self.post_docs, self.post_weights)),
+        }
+
+def main(argv=None):
+    from app.config import settings
+    from app.services.local_product_store import LocalProductStore
+
+    parser = argparse.ArgumentParser(description="Build the similarity index of the local product store for the Alternative Recommender.")
+    parser.add_argument("--store", default=settings.local_store_path, help="SQLite file of the local product store.")
+    parser.add_argument("--output", default=settings.product_index_path, help="File the index is written to.")
+    parser.add_argument("--min-df", type=int, default=MIN_DOCUMENT_FREQUENCY, help="Products a term must appear in to be indexed.")
+    args = parser.parse_args(argv)
+
+    store = LocalProductStore(args.store)
+    total = 0
+    start = time.perf_counter()
+    def rows():
+        nonlocal total
+        for batch in store.iter_batches():
+            yield from batch
+            total += len(batch)
+            print(f"Indexed {total} products ({total / (time.perf_counter() - start):.0f}/s)...")
+    try:
+        index = ProductIndex.build(rows(), min_df=args.min_df)
+    finally:
+        store.close()
+    index.save(args.output)
+    print(f"Done: {len(index)} products, {len(index.terms)} terms written to {args.output}.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+from typing import Any, Dict, FrozenSet, NamedTuple, Optional, Tuple
+
+from app.config import settings
+from app.models.user_profile import UserProfile
+from app.services.cache import MISSING, LRUCache, data_fingerprint
+from app.services.ingredient_normalizer import normalize_text
+from app.services.keyword_matcher import KeywordMatcher, compile_matcher
+from app.services.nutrient_rules import NutrientRuleSet, RuleEvaluator, nutrient_rules
+
+# Define some simple keyword maps for values (in a real app, this would be a Knowledge Graph or DB)
+VALUE_KEYWORDS = {
+    "palm_oil": ["palm oil", "palmitate", "palm kernel"],
+    "animal_welfare": ["gelatin", "lard", "tallow"], # Simple check for non-vegan items as proxy
+    "plastic_waste": [], # Hard to check from ingredients alone
+    "fair_labor": [] # Hard to check from ingredients alone
+}
+
+class CompiledProfile(NamedTuple):
+    """
+    Everything Bio-Shield and the Judge need from a UserProfile, normalized and
+    with matchers compiled, so per-request work is only the scan itself.
+    """
+    fingerprint: str
+    allergens: Tuple[str, ...]
+    allergen_matcher: KeywordMatcher
+    conditions: FrozenSet[str]
+    nutrient_guard: RuleEvaluator # Nutrient rules of the user's conditions
+    age: Optional[int]
+    is_minor: bool
+    takes_maoi: bool
+    active_values: Tuple[Tuple[str, float, Tuple[str, ...]], ...] # (category, weight, keywords) with weight > 0
+    value_matcher: KeywordMatcher
+
+
+def fingerprint_profile(profile: UserProfile) -> str:
+    """
+    Stable hash of the profile's contents. The user_id is left out, so users with
+    identical settings share one compiled profile.
+    """
+    return data_fingerprint(profile.model_dump(exclude={"user_id"}))
+
+def build_compiled_profile(profile: UserProfile, fingerprint: str, rules: Optional[NutrientRuleSet] = None) -> CompiledProfile:
+    health = profile.health_profile
+    allergens = tuple(dict.fromkeys(normalize_text(a) for a in health.allergens if normalize_text(a)))
+    conditions = frozenset(health.conditions)
+
+    active_values = tuple(
+        (category, weight, tuple(normalize_text(k) for k in VALUE_KEYWORDS.get(category, [])))
+        for category, weight in profile.value_profile.weights.items()
+        if weight > 0
+    )
+
+    return CompiledProfile(
+        fingerprint=fingerprint,
+        allergens=allergens,
+        allergen_matcher=compile_matcher(allergens),
+        conditions=conditions,
+        nutrient_guard=(rules if rules is not None else nutrient_rules).compile(conditions),
+        age=health.age,
+        is_minor=health.age is not None and health.age < 18,
+        # Using dietary_restrictions field for meds mock
+        takes_maoi="MAOI" in health.dietary_restrictions,
+        active_values=active_values,
+        value_matcher=compile_matcher(keyword for _, _, keywords in active_values for keyword in keywords),
+    )
+
+
+class ProfileCompiler:
+    """
+    Bounded LRU of compiled profiles keyed by profile fingerprint, so returning
+    users skip recompilation entirely.
+    """
+
+    def __init__(self, maxsize: int = 1024, rules: Optional[NutrientRuleSet] = None):
+        self.cache = LRUCache(maxsize=maxsize)
+        self.rules = rules
+
+    def compile(self, profile: UserProfile) -> CompiledProfile:
+        fingerprint = fingerprint_profile(profile)
+        compiled = self.cache.get(fingerprint)
+        if compiled is MISSING:
+            compiled = build_compiled_profile(profile, fingerprint, self.rules)
+            self.cache.set(fingerprint, compiled)
+        return compiled
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+# Shared instance for the whole application
+profile_compiler = ProfileCompiler(maxsize=settings.profile_cache_size)
+
+def compile_profile(profile: UserProfile) -> CompiledProfile:
+    return profile_compiler.compile(profile)
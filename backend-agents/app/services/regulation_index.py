@@ -0,0 +1,214 @@
+"""
+Regional regulations (banned ingredients, additive limits, recycling rules), by region code.
+
+Regulations are loaded once from a data file (app/data/regulations.json by
+default): one RegulationMap per region. A region also follows the rules of its
+parent, its explicit "parent" or else its code minus the last "-" part, so
+US-CA-SF inherits from US-CA, which inherits from US. Region codes that are not
+in the file fall back the same way (US-NY is regulated as US).
+
+Every region is held at once, compactly: each kind of rule has a single
+keyword automaton over the names used by any region, and a region is a bit in
+per-keyword masks, so a region is one integer plus its own (not inherited)
+rules. Checking a product for a region is one scan of its ingredients
+(or packaging text) plus a mask test per match, whatever the number of regions.
+"""
+import json
+import os
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Set, Tuple
+
+from app.config import settings
+from app.models.regulation_map import RegulationMap
+from app.services.cache import data_fingerprint
+from app.services.ingredient_normalizer import NormalizedIngredients, normalize_text
+from app.services.keyword_matcher import compile_matcher
+
+DEFAULT_REGULATIONS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "regulations.json")
+
+class RegionRules(NamedTuple):
+    """
+    A known region and the regions whose rules apply to it, most specific first.
+    """
+    region_code: str
+    chain: Tuple[str, ...]
+    mask: int # Bits of every region in the chain
+
+class BannedIngredient(NamedTuple):
+    text_index: int # Index of the ingredient in the product's list
+    keyword: str
+    banned_in: str # The region of the chain that bans it
+
+class AdditiveExcess(NamedTuple):
+    text: str
+    percent: float
+    limit: float
+    limited_in: str
+
+
+def canonical_region(region: Any) -> str:
+    return region.strip().upper().replace("_", "-") if isinstance(region, str) else ""
+
+def _as_percent(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class RegulationIndex:
+    """
+    Every region's RegulationMap, indexed for per-request checks.
+    """
+
+    def __init__(self, data: Dict[str, Dict[str, Dict[str, Any]]]):
+        self.data = data
+        self.version = data_fingerprint(data)
+
+        maps = [
+            RegulationMap(**dict(info, region_code=canonical_region(code)))
+            for code, info in data.get("regions", {}).items()
+        ]
+        self._bits = {regulation.region_code: 1 << i for i, regulation in enumerate(maps)}
+        self._parents = {
+            regulation.region_code: canonical_region(regulation.parent) if regulation.parent else self._prefix_parent(regulation.region_code)
+            for regulation in maps
+        }
+
+        # Banned ingredient -> mask of the regions banning it; material / additive -> {region: its rule}
+        banned: Dict[str, int] = {}
+        self._recycling: Dict[str, Dict[str, str]] = {}
+        self._limits: Dict[str, Dict[str, float]] = {}
+        for regulation in maps:
+            bit = self._bits[regulation.region_code]
+            for ingredient in regulation.banned_ingredients:
+                keyword = normalize_text(ingredient)
+                if keyword:
+                    banned[keyword] = banned.get(keyword, 0) | bit
+            for material, advice in regulation.recycling_rules.items():
+                self._recycling.setdefault(normalize_text(material), {})[regulation.region_code] = advice
+            for additive, limit in regulation.additives_limits.items():
+                self._limits.setdefault(normalize_text(additive), {})[regulation.region_code] = float(limit)
+        self._banned = banned
+        self.banned_matcher = compile_matcher(banned)
+        self.material_matcher = compile_matcher(self._recycling)
+        self.additive_matcher = compile_matcher(self._limits)
+
+        self.regions = {code: RegionRules(code, chain, self._chain_mask(chain)) for code, chain in ((code, self._chain(code)) for code in self._bits)}
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_REGULATIONS_PATH) -> "RegulationIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    @staticmethod
+    def _prefix_parent(code: str) -> Optional[str]:
+        return code.rsplit("-", 1)[0] if "-" in code else None
+
+    def _known_ancestor(self, code: Optional[str]) -> Optional[str]:
+        # Unknown codes are regulated as their closest known prefix
+        while code and code not in self._bits:
+            code = self._prefix_parent(code)
+        return code
+
+    def _chain(self, code: str) -> Tuple[str, ...]:
+        chain = []
+        while code and code not in chain:
+            chain.append(code)
+            code = self._known_ancestor(self._parents.get(code))
+        return tuple(chain)
+
+    def _chain_mask(self, chain: Iterable[str]) -> int:
+        mask = 0
+        for code in chain:
+            mask |= self._bits[code]
+        return mask
+
+    def get(self, region: Optional[str]) -> Optional[RegionRules]:
+        """
+        The rules for a region code (any case), falling back to its closest known
+        parent region; None when no region applies.
+        """
+        code = self._known_ancestor(canonical_region(region))
+        return self.regions.get(code) if code else None
+
+    def region_code(self, region: Optional[str]) -> Optional[str]:
+        """
+        The known region a code is regulated as (e.g. "US" for "us-ny"), or None.
+        """
+        rules = self.get(region)
+        return rules.region_code if rules else None
+
+    def _first_in_chain(self, rules: RegionRules, mask: int) -> str:
+        return next(code for code in rules.chain if self._bits[code] & mask)
+
+    def scan_banned(self, ingredients: NormalizedIngredients) -> Dict[int, Set[str]]:
+        """
+        Banned-anywhere keywords found in each ingredient (index -> keywords), for banned_in().
+        """
+        return self.banned_matcher.keywords_by_text(ingredients)
+
+    def banned_in(self, found: Mapping[int, Set[str]], rules: RegionRules) -> List[BannedIngredient]:
+        """
+        The ingredients of a scan_banned() result that are banned in the region, in list order.
+        """
+        banned = []
+        for text_index in sorted(found):
+            for keyword in sorted(found[text_index]):
+                mask = self._banned[keyword] & rules.mask
+                if mask:
+                    banned.append(BannedIngredient(text_index, keyword, self._first_in_chain(rules, mask)))
+                    break # One reason per ingredient is enough
+        return banned
+
+    def scan_additives(self, product_data: Dict[str, Any]) -> List[Tuple[str, float, str]]:
+        """
+        Limited-anywhere additives among the ingredients with a declared percentage: (text, percent, additive).
+        """
+        declared = []
+        for item in (product_data.get("raw_data") or {}).get("ingredients") or []:
+            if isinstance(item, dict) and isinstance(item.get("text"), str):
+                percent = _as_percent(item.get("percent"))
+                if percent is not None:
+                    declared.append((item["text"], percent))
+        if not declared:
+            return []
+        found = self.additive_matcher.keywords_by_text([text for text, _ in declared])
+        return [(declared[i][0], declared[i][1], additive) for i in sorted(found) for additive in sorted(found[i])]
+
+    def additive_excesses(self, scanned: Iterable[Tuple[str, float, str]], rules: RegionRules) -> List[AdditiveExcess]:
+        """
+        The scan_additives() results above the region's limit (the most specific region's limit wins).
+        """
+        excesses = []
+        for text, percent, additive in scanned:
+            limits = self._limits[additive]
+            limited_in = next((code for code in rules.chain if code in limits), None)
+            if limited_in is not None and percent > limits[limited_in]:
+                excesses.append(AdditiveExcess(text, percent, limits[limited_in], limited_in))
+        return excesses
+
+    def recycling_advice(self, packaging: Any, rules: RegionRules) -> Optional[Tuple[str, str]]:
+        """
+        (material, advice) for the first material named in the packaging text that
+        the region (or a parent region) has a rule for, or None.
+        """
+        for match in self.material_matcher.find_all([packaging]):
+            by_region = self._recycling[match.keyword]
+            code = next((code for code in rules.chain if code in by_region), None)
+            if code is not None:
+                return match.keyword, by_region[code]
+        return None
+
+    def __len__(self) -> int:
+        return len(self.regions)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "regions": len(self.regions),
+            "banned_ingredients": len(self.banned_matcher.keywords),
+            "materials": len(self.material_matcher.keywords),
+            "limited_additives": len(self.additive_matcher.keywords),
+        }
+
+# Shared index for the whole application
+regulation_index = RegulationIndex.from_file(settings.regulations_path or DEFAULT_REGULATIONS_PATH)
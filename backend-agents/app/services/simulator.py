@@ -0,0 +1,340 @@
+"""
+Local stand-in for every upstream service (Open Food Facts, Open Beauty Facts,
+general web search, carbon API, Google Vision), for realistic performance tests
+without the internet.
+
+Each service gets a latency distribution and fault rates:
+
+    {
+        "open_food_facts": {
+            "latency": {"kind": "lognormal", "median": 0.25, "sigma": 0.6},
+            "error_rate": 0.01, "timeout_rate": 0.005, "rate_limit_rate": 0.02,
+            "timeout": 5.0, "found_rate": 0.8
+        },
+        "carbon": {"latency": {"kind": "histogram", "buckets": [[0.1, 50], [0.25, 40], [1.0, 10]]}}
+    }
+
+Latency kinds are "fixed" (seconds), "lognormal" (median seconds, sigma) and
+"histogram" (replayed [upper bound seconds, count] buckets; a sample is drawn
+uniformly inside a bucket picked by count). Buckets scraped from /metrics are
+cumulative and end with "+Inf": replay them as-is with "cumulative": true.
+
+With ETHICAL_LENS_UPSTREAM_MODE=simulated the OFF/OBF clients talk to a
+SimulatedHTTPClient and the file at ETHICAL_LENS_SIMULATOR_CONFIG_PATH (if any)
+overrides the defaults below. In the default "real" mode only the services that
+are mocks anyway (general search, carbon, Vision) go through the simulator, with
+their historical fixed latencies and no faults.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from app.config import Settings, settings
+from app.services.http_client import shared_http_client
+
+class UpstreamError(Exception):
+    """
+    A (simulated) upstream failure, e.g. a 5xx response.
+    """
+
+class UpstreamRateLimited(UpstreamError):
+    """
+    A (simulated) 429 Too Many Requests response.
+    """
+
+
+class FixedLatency:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    def sample(self, rng: random.Random) -> float:
+        return self.seconds
+
+class LognormalLatency:
+    """
+    Right-skewed latency typical of network calls: most requests near the median, a long tail.
+    """
+    def __init__(self, median: float, sigma: float = 0.5, max: Optional[float] = None):
+        self.median = median
+        self.sigma = sigma
+        self.max = max
+
+    def sample(self, rng: random.Random) -> float:
+        value = rng.lognormvariate(math.log(self.median), self.sigma)
+        return min(value, self.max) if self.max is not None else value
+
+class HistogramLatency:
+    """
+    Replays a recorded latency histogram given as [upper bound (s), count] buckets,
+    or with cumulative=True as Prometheus exports them (count of samples up to each
+    bound, the last bound "+Inf").
+    """
+    def __init__(self, buckets: Sequence[Sequence[Any]], cumulative: bool = False):
+        buckets = sorted((float(bound), float(count)) for bound, count in buckets)
+        if cumulative:
+            previous = [0.0] + [count for _, count in buckets[:-1]]
+            # Samples above the last finite bound can't be drawn from anywhere, they are left out
+            buckets = [(bound, count - before) for (bound, count), before in zip(buckets, previous) if bound != math.inf]
+        if any(bound == math.inf or count < 0 for bound, count in buckets):
+            raise ValueError("A latency histogram needs finite bounds and counts >= 0 (cumulative buckets need cumulative=True)")
+        self.buckets = buckets
+        if not self.buckets or sum(count for _, count in self.buckets) <= 0:
+            raise ValueError("A latency histogram needs at least one non-empty bucket")
+        self._ranges = []
+        lower = 0.0
+        for bound, _ in self.buckets:
+            self._ranges.append((lower, bound))
+            lower = bound
+        self._weights = [count for _, count in self.buckets]
+
+    def sample(self, rng: random.Random) -> float:
+        lower, upper = rng.choices(self._ranges, weights=self._weights)[0]
+        return rng.uniform(lower, upper)
+
+LATENCY_KINDS = {
+    "fixed": FixedLatency,
+    "lognormal": LognormalLatency,
+    "histogram": HistogramLatency,
+}
+
+def latency_from_spec(spec: Dict[str, Any]):
+    spec = dict(spec)
+    kind = spec.pop("kind", "fixed")
+    if kind not in LATENCY_KINDS:
+        raise ValueError(f"Unknown latency kind '{kind}', expected one of {sorted(LATENCY_KINDS)}")
+    return LATENCY_KINDS[kind](**spec)
+
+
+class SimulatedService:
+    """
+    Behaviour of one simulated upstream service.
+    """
+    def __init__(
+        self,
+        name: str,
+        latency,
+        error_rate: float = 0.0,
+        timeout_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        timeout: float = 5.0,
+        found_rate: float = 1.0,
+    ):
+        self.name = name
+        self.latency = latency
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.timeout = timeout # How long a timed-out call hangs before failing
+        self.found_rate = found_rate # Share of barcodes the catalog knows (OFF/OBF)
+
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.rate_limited = 0
+
+    @classmethod
+    def from_spec(cls, name: str, spec: Dict[str, Any]) -> "SimulatedService":
+        spec = dict(spec)
+        latency = latency_from_spec(spec.pop("latency", {"kind": "fixed", "seconds": 0.0}))
+        return cls(name, latency, **spec)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "rate_limited": self.rate_limited,
+        }
+
+# Built-in latencies of the mock services, unchanged in "real" mode
+REAL_MODE_SERVICES = {
+    "general_search": {"latency": {"kind": "fixed", "seconds": 1.0}},
+    "carbon": {"latency": {"kind": "fixed", "seconds": 0.5}},
+    "vision": {"latency": {"kind": "fixed", "seconds": 0.0}},
+}
+
+# Defaults for "simulated" mode, roughly what the public APIs look like from Europe
+SIMULATED_MODE_SERVICES = {
+    "open_food_facts": {
+        "latency": {"kind": "lognormal", "median": 0.35, "sigma": 0.6, "max": 8.0},
+        "error_rate": 0.01, "timeout_rate": 0.002, "rate_limit_rate": 0.005, "found_rate": 0.7,
+    },
+    "open_beauty_facts": {
+        "latency": {"kind": "lognormal", "median": 0.45, "sigma": 0.7, "max": 8.0},
+        "error_rate": 0.02, "timeout_rate": 0.005, "rate_limit_rate": 0.005, "found_rate": 0.2,
+    },
+    "general_search": {"latency": {"kind": "lognormal", "median": 0.8, "sigma": 0.4, "max": 5.0}, "error_rate": 0.01},
+    "carbon": {"latency": {"kind": "lognormal", "median": 0.3, "sigma": 0.5, "max": 5.0}, "error_rate": 0.01},
+    "vision": {"latency": {"kind": "lognormal", "median": 0.6, "sigma": 0.4, "max": 5.0}, "error_rate": 0.01},
+}
+
+
+class UpstreamSimulator:
+    """
+    Injects latency and faults into upstream calls, per service.
+    """
+
+    def __init__(self, services: Dict[str, SimulatedService], seed: Optional[int] = None):
+        self.services = services
+        self.rng = random.Random(seed)
+
+    @classmethod
+    def from_specs(cls, specs: Dict[str, Dict[str, Any]], seed: Optional[int] = None) -> "UpstreamSimulator":
+        return cls({name: SimulatedService.from_spec(name, spec) for name, spec in specs.items()}, seed=seed)
+
+    @classmethod
+    def from_settings(cls, config: Settings = settings) -> "UpstreamSimulator":
+        if config.upstream_mode != "simulated":
+            return cls.from_specs(REAL_MODE_SERVICES)
+
+        specs = dict(SIMULATED_MODE_SERVICES)
+        if config.simulator_config_path:
+            with open(config.simulator_config_path, "r", encoding="utf-8") as f:
+                for name, spec in json.load(f).items():
+                    specs[name] = dict(specs.get(name, {}), **spec)
+        return cls.from_specs(specs, seed=config.simulator_seed)
+
+    async def call(self, service_name: str):
+        """
+        Waits for one simulated call to the service. Raises asyncio.TimeoutError,
+        UpstreamRateLimited or UpstreamError according to the service's fault rates.
+        """
+        service = self.services.get(service_name)
+        if service is None:
+            return
+        service.calls += 1
+
+        roll = self.rng.random()
+        if roll < service.timeout_rate:
+            service.timeouts += 1
+            await asyncio.sleep(service.timeout)
+            raise asyncio.TimeoutError(f"{service_name} timed out (simulated)")
+
+        await asyncio.sleep(service.latency.sample(self.rng))
+
+        roll -= service.timeout_rate
+        if roll < service.rate_limit_rate:
+            service.rate_limited += 1
+            raise UpstreamRateLimited(f"{service_name} rate limited (simulated)")
+        roll -= service.rate_limit_rate
+        if roll < service.error_rate:
+            service.errors += 1
+            raise UpstreamError(f"{service_name} failed (simulated)")
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: service.stats() for name, service in self.services.items()}
+
+
+# Synthetic catalog used by the simulated OFF/OBF APIs
+_SYNTHETIC_INGREDIENTS = [
+    "Sugar", "Water", "Palm Oil", "Salt", "Wheat Flour", "Milk", "Soy Lecithin", "Cocoa",
+    "Hazelnuts", "Peanuts", "Gelatin", "Beef", "Rice", "Oats", "Glycerin", "Methylparaben",
+    "Sodium Laureth Sulfate", "Parfum", "Aqua", "E330", "Caffeine", "Cheese",
+]
+_SYNTHETIC_BRANDS = ["Ben & Jerry's", "Oatly", "Innocent Drinks", "Seventh Generation", "Nestle", "Local Farm Co"]
+_SYNTHETIC_PACKAGING = ["Plastic", "Glass", "Paper", "Composite", "Carton"]
+_SYNTHETIC_ORIGINS = ["United States", "France", "Italy", "Brazil", "China", "Sweden"]
+
+def _barcode_rng(service_name: str, barcode: str) -> random.Random:
+    digest = hashlib.sha256(f"{service_name}:{barcode}".encode("utf-8")).hexdigest()
+    return random.Random(int(digest[:16], 16))
+
+def synthetic_product(service: SimulatedService, barcode: str) -> Optional[Dict[str, Any]]:
+    """
+    Deterministic fake product for a barcode, or None for the (1 - found_rate) share
+    of barcodes the catalog does not know.
+    """
+    rng = _barcode_rng(service.name, barcode)
+    if rng.random() >= service.found_rate:
+        return None
+    return {
+        "code": barcode,
+        "product_name": f"Simulated Product {barcode}",
+        "brands": rng.choice(_SYNTHETIC_BRANDS),
+        "ingredients_text": ", ".join(rng.sample(_SYNTHETIC_INGREDIENTS, rng.randint(3, 8))),
+        "packaging": rng.choice(_SYNTHETIC_PACKAGING),
+        "origins": rng.choice(_SYNTHETIC_ORIGINS),
+        "nutriments": {"sugars_100g": round(rng.uniform(0, 40), 1), "salt_100g": round(rng.uniform(0, 3), 2)},
+    }
+
+# Which simulated service answers for each upstream host
+SIMULATED_HOSTS = {
+    "world.openfoodfacts.org": "open_food_facts",
+    "world.openbeautyfacts.org": "open_beauty_facts",
+}
+
+_PRODUCT_PATH = re.compile(r"/product/([^/]+)\.json$")
+
+
+class SimulatedHTTPClient:
+    """
+    Drop-in replacement for SharedHTTPClient that answers the OFF/OBF product
+    endpoints from a synthetic catalog, through the UpstreamSimulator.
+    Rate limits come back as 429 and errors as 503; timeouts are raised, as aiohttp does.
+    """
+
+    def __init__(self, simulator: UpstreamSimulator, catalog: Optional[Callable[[SimulatedService, str], Optional[Dict[str, Any]]]] = None):
+        self.simulator = simulator
+        self.catalog = catalog or synthetic_product
+        self.requests_total = 0
+        self.errors_total = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def get_json(self, url: str) -> Tuple[int, Optional[Any]]:
+        parts = urlsplit(url)
+        service_name = SIMULATED_HOSTS.get(parts.netloc)
+        match = _PRODUCT_PATH.search(parts.path)
+        if service_name is None or match is None:
+            return 404, None
+
+        self.requests_total += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await self.simulator.call(service_name)
+        except UpstreamRateLimited:
+            return 429, None
+        except UpstreamError:
+            return 503, None
+        except Exception:
+            self.errors_total += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+        product = self.catalog(self.simulator.services[service_name], match.group(1))
+        if product is None:
+            return 200, {"status": 0, "status_verbose": "product not found"}
+        return 200, {"status": 1, "product": product}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": "simulated",
+            "requests_total": self.requests_total,
+            "errors_total": self.errors_total,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+        }
+
+# Shared instance for the whole application
+upstream_simulator = UpstreamSimulator.from_settings()
+
+def upstream_http_client(config: Settings = settings):
+    """
+    The HTTP client the OFF/OBF clients should use in the configured upstream mode.
+    """
+    if config.upstream_mode == "simulated":
+        return SimulatedHTTPClient(upstream_simulator)
+    return shared_http_client
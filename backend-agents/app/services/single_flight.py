@@ -0,0 +1,67 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into a single upstream call.
+
+    The first caller for a key starts the work; callers arriving while it is still
+    running await the same task. Each caller awaits through asyncio.shield, so a
+    caller that is cancelled (e.g. a client disconnecting) never cancels the shared
+    call for the others; once the last one is gone the call is cancelled too, as an
+    unshared call would be (e.g. a hedged lookup giving up on a slower source).
+    Once the call finishes the key is released, so later callers start a fresh one
+    (caching is left to the caller).
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, _Call] = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.cancelled = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        call = self._in_flight.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._in_flight[key] = call
+            call.task.add_done_callback(lambda done: self._release(key, done))
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Every caller was cancelled: nobody wants the result any more. Release the
+                # key first, a caller arriving before the task has wound down starts afresh.
+                if self._in_flight.get(key) is call:
+                    del self._in_flight[key]
+                call.task.cancel()
+                self.cancelled += 1
+
+    def _release(self, key: Hashable, task: asyncio.Task):
+        call = self._in_flight.get(key)
+        if call is not None and call.task is task:
+            del self._in_flight[key]
+        # Mark the exception as retrieved in case every caller has gone away
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "cancelled": self.cancelled,
+            "in_flight": len(self._in_flight),
+        }
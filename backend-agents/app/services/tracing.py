@@ -0,0 +1,384 @@
+"""
+Lightweight request tracing, exported as OTLP/JSON.
+
+A span is opened for each HTTP request, each agent run and each upstream call;
+parent/child links follow the asyncio task context (contextvars), so the agents
+started by the scheduler and the calls they make land in the request's trace.
+
+Sampling is decided once per trace, at its root span: with
+ETHICAL_LENS_TRACING_SAMPLE_RATIO=0.05 one request in twenty is traced and the
+others cost a single random draw. Finished spans are queued and exported in
+batches by a background task, either appended to a local JSON Lines file (one
+OTLP ExportTraceServiceRequest per line, as the OpenTelemetry Collector's file
+exporter writes them) or POSTed to a local collector's OTLP/HTTP endpoint.
+"""
+import asyncio
+import contextvars
+import json
+import os
+import random
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+from app.config import Settings, settings
+
+SERVICE_NAME = "ethical-lens-backend"
+INSTRUMENTATION_SCOPE = "app.services.tracing"
+
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+# OTLP status codes
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+class Span:
+    """
+    One timed operation in a trace.
+    """
+    def __init__(self, tracer: "Tracer", name: str, trace_id: str, parent_span_id: Optional[str], kind: int, attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent_span_id
+        self.kind = kind
+        self.attributes = attributes
+        self.status_code = STATUS_UNSET
+        self.status_message = ""
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+
+    def set_attribute(self, key: str, value: Any):
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def set_error(self, message: str):
+        self.status_code = STATUS_ERROR
+        self.status_message = message
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self.tracer.processor.on_end(self)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [encode_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": self.status_code},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+
+class NoopSpan:
+    """
+    Stands in for a span that is not recorded (tracing off, or trace not sampled).
+    """
+    trace_id = None
+    span_id = None
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]):
+        pass
+
+    def set_error(self, message: str):
+        pass
+
+NOOP_SPAN = NoopSpan()
+
+# The span the current task is running in
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+def encode_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        encoded = {"boolValue": value}
+    elif isinstance(value, int):
+        encoded = {"intValue": str(value)}
+    elif isinstance(value, float):
+        encoded = {"doubleValue": value}
+    else:
+        encoded = {"stringValue": str(value)}
+    return {"key": key, "value": encoded}
+
+def encode_spans(spans: List[Span]) -> Dict[str, Any]:
+    """
+    Wraps finished spans in an OTLP ExportTraceServiceRequest.
+    """
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [encode_attribute("service.name", SERVICE_NAME)]},
+            "scopeSpans": [{
+                "scope": {"name": INSTRUMENTATION_SCOPE},
+                "spans": [span.to_otlp() for span in spans],
+            }],
+        }]
+    }
+
+
+class SpanScope:
+    """
+    Context manager making a span current for the enclosed block. The span is
+    ended on exit; an exception marks it as an error ("cancelled" is recorded as
+    an outcome, not an error).
+    """
+    def __init__(self, span):
+        self.span = span
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        if isinstance(self.span, Span):
+            if exc_type is not None:
+                if issubclass(exc_type, asyncio.CancelledError):
+                    self.span.set_attribute("outcome", "cancelled")
+                else:
+                    self.span.attributes.setdefault("outcome", "timeout" if issubclass(exc_type, asyncio.TimeoutError) else "error")
+                    self.span.set_error(f"{exc_type.__name__}: {exc}")
+            self.span.end()
+        return False
+
+class _DisabledScope:
+    """
+    Shared no-op scope returned when tracing is off, so the fast path allocates nothing.
+    """
+    def __enter__(self):
+        return NOOP_SPAN
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_DISABLED_SCOPE = _DisabledScope()
+
+
+class BatchSpanProcessor:
+    """
+    Queues finished spans and hands them to the exporter in batches from a
+    background task, so request handling never waits on I/O. When the queue is
+    full the oldest spans are dropped (and counted).
+    """
+    def __init__(self, exporter, batch_size: int = 512, flush_interval: float = 2.0, max_queue_size: int = 10000):
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: deque = deque(maxlen=max_queue_size)
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+        self.spans_ended = 0
+        self.spans_dropped = 0
+        self.spans_exported = 0
+        self.export_errors = 0
+
+    def on_end(self, span: Span):
+        if len(self.queue) == self.queue.maxlen:
+            self.spans_dropped += 1
+        self.queue.append(span)
+        self.spans_ended += 1
+        if self._wakeup is not None and len(self.queue) >= self.batch_size:
+            self._wakeup.set()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.ensure_future(self._run())
+
+    async def shutdown(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        await self.exporter.close()
+
+    async def flush(self):
+        while self.queue:
+            batch = [self.queue.popleft() for _ in range(min(self.batch_size, len(self.queue)))]
+            try:
+                await self.exporter.export(batch)
+                self.spans_exported += len(batch)
+            except Exception as e:
+                self.export_errors += 1
+                print(f"[Tracing] Failed to export {len(batch)} spans: {e}")
+
+    async def _run(self):
+        while True:
+            # asyncio.wait (unlike wait_for) never swallows the cancellation sent by shutdown()
+            waiter = asyncio.ensure_future(self._wakeup.wait())
+            try:
+                await asyncio.wait([waiter], timeout=self.flush_interval)
+            finally:
+                waiter.cancel()
+            self._wakeup.clear()
+            await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": len(self.queue),
+            "ended": self.spans_ended,
+            "exported": self.spans_exported,
+            "dropped": self.spans_dropped,
+            "export_errors": self.export_errors,
+        }
+
+
+class OTLPFileExporter:
+    """
+    Appends each batch as one OTLP/JSON line to a local file.
+    """
+    def __init__(self, path: str):
+        self.path = path
+
+    async def export(self, spans: List[Span]):
+        line = json.dumps(encode_spans(spans), separators=(",", ":")) + "\n"
+        await asyncio.to_thread(self._append, line)
+
+    def _append(self, line: str):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+    async def close(self):
+        pass
+
+class OTLPHTTPExporter:
+    """
+    POSTs each batch to a collector's OTLP/HTTP JSON endpoint (e.g. http://localhost:4318/v1/traces).
+    """
+    def __init__(self, endpoint: str, timeout: float = 5.0):
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def export(self, spans: List[Span]):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        async with self._session.post(self.endpoint, json=encode_spans(spans)) as response:
+            if response.status >= 300:
+                raise RuntimeError(f"collector answered {response.status}")
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+
+class Tracer:
+    def __init__(self, processor: Optional[BatchSpanProcessor], sample_ratio: float = 0.0, seed: Optional[int] = None):
+        self.processor = processor
+        self.sample_ratio = sample_ratio if processor is not None else 0.0
+        self.rng = random.Random(seed)
+        self.traces_started = 0
+        self.traces_sampled = 0
+
+    @classmethod
+    def from_settings(cls, config: Settings = settings) -> "Tracer":
+        if config.tracing_sample_ratio <= 0:
+            return cls(None)
+        if config.tracing_exporter == "otlp_http":
+            exporter = OTLPHTTPExporter(config.tracing_endpoint)
+        else:
+            exporter = OTLPFileExporter(config.tracing_file_path)
+        processor = BatchSpanProcessor(exporter, batch_size=config.tracing_batch_size, flush_interval=config.tracing_flush_interval)
+        return cls(processor, sample_ratio=config.tracing_sample_ratio)
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_ratio > 0
+
+    def span(self, name: str, kind: int = SPAN_KIND_INTERNAL, **attributes: Any):
+        """
+        Opens a span as a child of the current one (or as the root of a new,
+        possibly unsampled, trace): with tracer.span("agent Judge", agent="Judge") as span: ...
+        """
+        if not self.enabled:
+            return _DISABLED_SCOPE
+
+        parent = _current_span.get()
+        if parent is None:
+            self.traces_started += 1
+            if self.rng.random() >= self.sample_ratio:
+                return SpanScope(NOOP_SPAN) # Children of an unsampled root are not recorded either
+            self.traces_sampled += 1
+            return SpanScope(Span(self, name, os.urandom(16).hex(), None, kind, attributes))
+        if parent is NOOP_SPAN:
+            return _DISABLED_SCOPE
+        return SpanScope(Span(self, name, parent.trace_id, parent.span_id, kind, attributes))
+
+    def start(self):
+        if self.processor is not None:
+            self.processor.start()
+
+    async def shutdown(self):
+        if self.processor is not None:
+            await self.processor.shutdown()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"sample_ratio": self.sample_ratio, "traces_started": self.traces_started, "traces_sampled": self.traces_sampled}
+        if self.processor is not None:
+            stats["spans"] = self.processor.stats()
+        return stats
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware opening the root (server) span of each HTTP request.
+    """
+    def __init__(self, app, tracer: Optional[Tracer] = None):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        active = self.tracer or tracer
+        if scope["type"] != "http" or not active.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        with active.span(f"HTTP {scope['method']}", kind=SPAN_KIND_SERVER, **{"http.method": scope["method"], "http.target": scope["path"]}) as span:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        span.set_error(f"HTTP {message['status']}")
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+            route = getattr(scope.get("route"), "path", None)
+            if route and isinstance(span, Span):
+                span.name = f"HTTP {scope['method']} {route}"
+                span.set_attribute("http.route", route)
+
+# Shared tracer for the whole application
+tracer = Tracer.from_settings()
+
+def start_span(name: str, kind: int = SPAN_KIND_INTERNAL, **attributes: Any):
+    return tracer.span(name, kind=kind, **attributes)
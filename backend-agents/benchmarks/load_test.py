@@ -0,0 +1,284 @@
+"""
+Load test and latency benchmark for the analysis endpoints.
+
+Usage:
+    python -m benchmarks.load_test --requests 200 --concurrency 1,8,32
+    python -m benchmarks.load_test --endpoints analyze,stream --output results/after.json --compare results/before.json
+    python -m benchmarks.load_test --url http://localhost:8000   # against a running uvicorn
+
+By default the FastAPI app is driven in-process through httpx's ASGI transport,
+with every upstream service replaced by the simulator (seeded, so runs are
+reproducible) and the on-disk caches disabled. Each (endpoint, concurrency) run
+starts from cold in-process caches unless --keep-caches is given.
+
+Reports requests per second and p50/p95/p99 latency per endpoint and, in-process,
+per agent, and writes them to a JSON file (stable key order, so two result files
+can be diffed between commits).
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+import httpx
+
+ENDPOINTS = ("analyze", "stream", "batch")
+
+PROFILES = [
+    {"user_id": "bench_1", "health_profile": {"allergens": ["Peanuts"], "conditions": ["Diabetes"], "age": 34}},
+    {"user_id": "bench_2", "health_profile": {"allergens": ["Milk"], "age": 15}, "value_profile": {"weights": {"palm_oil": 1.0}}},
+    {"user_id": "bench_3", "health_profile": {"conditions": ["Hypertension"], "dietary_restrictions": ["MAOI"]}},
+]
+
+def configure_in_process(seed: int):
+    """
+    Stubs the upstreams and keeps the benchmark off the on-disk stores and any
+    locally built similarity index, whatever files the working directory holds.
+    Must run before app.main is imported (settings are read at import time).
+    """
+    os.environ.setdefault("ETHICAL_LENS_UPSTREAM_MODE", "simulated")
+    os.environ.setdefault("ETHICAL_LENS_SIMULATOR_SEED", str(seed))
+    os.environ.setdefault("ETHICAL_LENS_PRODUCT_CACHE_PATH", "")
+    os.environ.setdefault("ETHICAL_LENS_LOCAL_STORE_PATH", "")
+    os.environ.setdefault("ETHICAL_LENS_PRODUCT_INDEX_PATH", "")
+
+
+class AgentTimings:
+    """
+    Wraps each agent's analyze() to record how long it takes, per agent name.
+    """
+    def __init__(self, agents):
+        self.samples: Dict[str, List[float]] = {}
+        for agent in agents:
+            agent.analyze = self._timed(agent.agent_name, agent.analyze)
+
+    def _timed(self, name, analyze):
+        async def timed_analyze(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await analyze(*args, **kwargs)
+            finally:
+                self.samples.setdefault(name, []).append((time.perf_counter() - start) * 1000)
+        return timed_analyze
+
+    def reset(self):
+        self.samples = {}
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {name: latency_summary(samples) for name, samples in sorted(self.samples.items())}
+
+
+def percentile(sorted_samples: Sequence[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of already sorted samples.
+    """
+    if not sorted_samples:
+        return 0.0
+    # pct * n first: 0.07 * 100 is a hair above 7 in floating point, 7 * 100 / 100 is exact
+    rank = min(len(sorted_samples), max(1, math.ceil(pct * len(sorted_samples) / 100.0)))
+    return sorted_samples[rank - 1]
+
+def latency_summary(samples_ms: Sequence[float]) -> Dict[str, float]:
+    ordered = sorted(samples_ms)
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 2) if ordered else 0.0,
+        "p50": round(percentile(ordered, 50), 2),
+        "p95": round(percentile(ordered, 95), 2),
+        "p99": round(percentile(ordered, 99), 2),
+        "max": round(ordered[-1], 2) if ordered else 0.0,
+    }
+
+
+def barcode_for(index: int, pool: int) -> str:
+    return f"{5000000000000 + index % pool}"
+
+async def call_analyze(client: httpx.AsyncClient, index: int, pool: int) -> Dict[str, Any]:
+    payload = {"barcode": barcode_for(index, pool), "user_profile": PROFILES[index % len(PROFILES)]}
+    response = await client.post("/analyze", json=payload)
+    response.raise_for_status()
+    return {"cache_hit": response.json().get("cache_hit", False)}
+
+async def call_stream(client: httpx.AsyncClient, index: int, pool: int) -> Dict[str, Any]:
+    payload = {"barcode": barcode_for(index, pool), "user_profile": PROFILES[index % len(PROFILES)]}
+    start = time.perf_counter()
+    first_event_ms = None
+    async with client.stream("POST", "/analyze/stream", json=payload) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_text():
+            if first_event_ms is None and chunk.strip():
+                first_event_ms = (time.perf_counter() - start) * 1000
+    return {"first_event_ms": first_event_ms}
+
+async def call_batch(client: httpx.AsyncClient, index: int, pool: int, batch_size: int = 10) -> Dict[str, Any]:
+    payload = {
+        "barcodes": [barcode_for(index * batch_size + i, pool) for i in range(batch_size)],
+        "user_profile": PROFILES[index % len(PROFILES)],
+    }
+    response = await client.post("/analyze/batch", json=payload)
+    response.raise_for_status()
+    lines = [json.loads(line) for line in response.text.splitlines() if line]
+    return {"items": len(lines), "item_errors": sum(1 for line in lines if "error" in line)}
+
+CALLS = {"analyze": call_analyze, "stream": call_stream, "batch": call_batch}
+
+
+async def run_load(client: httpx.AsyncClient, endpoint: str, requests: int, concurrency: int, pool: int) -> Dict[str, Any]:
+    """
+    Fires `requests` calls at the endpoint with at most `concurrency` in flight.
+    """
+    call = CALLS[endpoint]
+    latencies: List[float] = []
+    extras: List[Dict[str, Any]] = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < requests:
+            index = next_index
+            next_index += 1
+            start = time.perf_counter()
+            try:
+                extras.append(await call(client, index, pool))
+            except Exception as e:
+                errors += 1
+                print(f"  {endpoint} #{index} failed: {type(e).__name__}: {e}")
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - start
+
+    result = {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "duration_s": round(duration, 3),
+        "rps": round(requests / duration, 2) if duration else 0.0,
+        "latency_ms": latency_summary(latencies),
+    }
+    if endpoint == "analyze":
+        hits = sum(1 for extra in extras if extra.get("cache_hit"))
+        result["cache_hit_ratio"] = round(hits / len(extras), 4) if extras else 0.0
+    elif endpoint == "stream":
+        result["first_event_ms"] = latency_summary([e["first_event_ms"] for e in extras if e.get("first_event_ms") is not None])
+    elif endpoint == "batch":
+        result["items"] = sum(extra["items"] for extra in extras)
+        result["item_errors"] = sum(extra["item_errors"] for extra in extras)
+    return result
+
+
+def reset_caches(main_module):
+    main_module.analysis_cache.clear()
+    main_module.shared_verdict_cache.clear()
+    main_module.product_cache.memory.clear()
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def compare(previous: Dict[str, Any], current: Dict[str, Any]):
+    """
+    Prints rps and p95 changes for the runs present in both result files.
+    """
+    before = {(run["endpoint"], run["concurrency"]): run for run in previous.get("runs", [])}
+    print(f"\nCompared with {previous.get('meta', {}).get('git_commit')}:")
+    for run in current["runs"]:
+        old = before.get((run["endpoint"], run["concurrency"]))
+        if not old:
+            continue
+        rps_change = (run["rps"] - old["rps"]) / old["rps"] * 100 if old["rps"] else 0.0
+        print(
+            f"  {run['endpoint']:<8} c={run['concurrency']:<4} rps {old['rps']:>8} -> {run['rps']:>8} ({rps_change:+.1f}%)"
+            f"  p95 {old['latency_ms']['p95']:>9} -> {run['latency_ms']['p95']:>9} ms"
+        )
+
+async def benchmark(args) -> Dict[str, Any]:
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    levels = [int(c) for c in args.concurrency.split(",")]
+    for endpoint in endpoints:
+        if endpoint not in CALLS:
+            raise SystemExit(f"Unknown endpoint '{endpoint}', expected one of {', '.join(ENDPOINTS)}")
+
+    main_module = None
+    timings = None
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+    else:
+        configure_in_process(args.seed)
+        import app.main as main_module
+        timings = AgentTimings([main_module.researcher] + [task.agent for task in main_module.agent_scheduler.tasks])
+        transport = httpx.ASGITransport(app=main_module.app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=args.timeout)
+
+    runs = []
+    async with client:
+        for endpoint in endpoints:
+            for concurrency in levels:
+                if main_module is not None and not args.keep_caches:
+                    reset_caches(main_module)
+                if timings is not None:
+                    timings.reset()
+                print(f"Running {endpoint} x{args.requests} at concurrency {concurrency}...")
+                run = await run_load(client, endpoint, args.requests, concurrency, args.barcodes)
+                if timings is not None:
+                    run["agents_ms"] = timings.summary()
+                latency = run["latency_ms"]
+                print(f"  {run['rps']} req/s, p50 {latency['p50']} ms, p95 {latency['p95']} ms, p99 {latency['p99']} ms, {run['errors']} errors")
+                runs.append(run)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "target": args.url or "in-process",
+            "upstream_mode": os.environ.get("ETHICAL_LENS_UPSTREAM_MODE", "real") if not args.url else None,
+            "seed": args.seed,
+            "barcodes": args.barcodes,
+            "keep_caches": args.keep_caches,
+        },
+        "runs": runs,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test and latency benchmark for the analysis endpoints.")
+    parser.add_argument("--endpoints", default="analyze,stream,batch", help=f"Comma-separated endpoints to load ({', '.join(ENDPOINTS)}).")
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels.")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per (endpoint, concurrency) run.")
+    parser.add_argument("--barcodes", type=int, default=50, help="Distinct barcodes cycled through (fewer means more cache hits).")
+    parser.add_argument("--seed", type=int, default=1234, help="Simulator seed (in-process only).")
+    parser.add_argument("--keep-caches", action="store_true", help="Don't reset the in-process caches between runs.")
+    parser.add_argument("--url", help="Benchmark a running server instead of the in-process app.")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds.")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the JSON results.")
+    parser.add_argument("--compare", help="Previous results file to compare against.")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(benchmark(args))
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(json.load(f), results)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,18 @@
+"""
+Settings for the test run, applied before any test imports the app: pytest
+loads this file first, and tests run as scripts import it before the app.
+
+Tests talk to the local upstream simulator (seeded, so runs are reproducible)
+instead of the live product APIs, and leave no cache or store files behind.
+"""
+import os
+import sys
+
+# Add the parent directory to the path so we can import the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("ETHICAL_LENS_UPSTREAM_MODE", "simulated")
+os.environ.setdefault("ETHICAL_LENS_SIMULATOR_SEED", "42")
+os.environ.setdefault("ETHICAL_LENS_PRODUCT_CACHE_PATH", "")
+os.environ.setdefault("ETHICAL_LENS_LOCAL_STORE_PATH", "")
+os.environ.setdefault("ETHICAL_LENS_PRODUCT_INDEX_PATH", "")
@@ -0,0 +1,95 @@
+import asyncio
+import sys
+import os
+import time
+
+# Add the parent directory to the path so we can import the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.agents.base_agent import BaseAgent
+from app.models.product_analysis import AgentVerdict, TrafficLightStatus
+from app.services.agent_scheduler import AgentScheduler, AgentTask
+from app.services.analysis_cache import SharedVerdictCache
+
+class SlowAgent(BaseAgent):
+    def __init__(self, name, delay, fail=False, profile_dependent=True):
+        super().__init__(agent_name=name)
+        self.delay = delay
+        self.fail = fail
+        self.profile_dependent = profile_dependent
+        self.calls = 0
+
+    async def analyze(self, product_data, context=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("upstream exploded")
+        return AgentVerdict(
+            agent_name=self.agent_name,
+            score=100.0,
+            status=TrafficLightStatus.GREEN,
+            reasoning="ok",
+            details={"saw": sorted(context.get("verdicts", {}).keys())}
+        )
+
+def test_agent_scheduler():
+    scheduler = AgentScheduler([
+        AgentTask(SlowAgent("A", 0.2)),
+        AgentTask(SlowAgent("B", 0.2)),
+        AgentTask(SlowAgent("C", 0.1), depends_on=["A", "B"]),
+        AgentTask(SlowAgent("Slow", 1.0), timeout=0.3),
+        AgentTask(SlowAgent("Broken", 0.0, fail=True)),
+    ])
+
+    start = time.perf_counter()
+    verdicts = asyncio.run(scheduler.run({}, {}))
+    elapsed = time.perf_counter() - start
+    print(f"Scheduled 5 agents in {elapsed:.2f}s")
+
+    # Independent agents overlap: A/B (0.2s) then C (0.1s), Slow is cut at 0.3s
+    assert elapsed < 0.6
+    assert [v.agent_name for v in verdicts] == ["A", "B", "C", "Slow", "Broken"]
+    assert verdicts[2].details["saw"] == ["A", "B"]
+    assert verdicts[3].status == TrafficLightStatus.YELLOW and verdicts[3].details["degraded"]
+    assert verdicts[4].status == TrafficLightStatus.YELLOW and "upstream exploded" in verdicts[4].reasoning
+
+    # Cycles are rejected up front
+    try:
+        AgentScheduler([AgentTask(SlowAgent("X", 0), depends_on=["Y"]), AgentTask(SlowAgent("Y", 0), depends_on=["X"])])
+        assert False, "cycle not detected"
+    except ValueError as e:
+        print(f"Cycle rejected: {e}")
+
+def test_shared_verdicts():
+    brand = SlowAgent("Brand", 0.1, profile_dependent=False)
+    health = SlowAgent("Health", 0.1)
+    scheduler = AgentScheduler([
+        AgentTask(brand),
+        AgentTask(SlowAgent("Email", 0.0, profile_dependent=False), depends_on=["Brand"]),
+        AgentTask(health),
+        AgentTask(SlowAgent("Swap", 0.0, profile_dependent=False), depends_on=["Health"]), # Dependent through Health
+    ])
+    assert scheduler.profile_dependent == {"Brand": False, "Email": False, "Health": True, "Swap": True}
+    assert [task.name for task in scheduler.profile_independent_tasks] == ["Brand", "Email"]
+
+    cache = SharedVerdictCache(maxsize=10, ttl=60)
+
+    async def scan_by_many_users():
+        async def scan():
+            shared = cache.get_or_compute("123", "v1", lambda: scheduler.run_profile_independent({}, {}))
+            return await scheduler.run({}, {"user_profile": "someone"}, shared_verdicts=shared)
+        return await asyncio.gather(*(scan() for _ in range(5)))
+
+    results = asyncio.run(scan_by_many_users())
+    print(f"Shared verdict cache: {cache.stats()}")
+    assert all([v.agent_name for v in verdicts] == ["Brand", "Email", "Health", "Swap"] for verdicts in results)
+    assert results[0][1].details["saw"] == ["Brand"]
+    assert brand.calls == 1 # Computed once, shared by every user
+    assert health.calls == 5 # Run per user
+
+    asyncio.run(scan_by_many_users())
+    assert brand.calls == 1 and cache.stats()["hits"] == 5
+
+if __name__ == "__main__":
+    test_agent_scheduler()
+    test_shared_verdicts()
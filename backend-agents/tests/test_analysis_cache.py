@@ -0,0 +1,57 @@
+import copy
+import sys
+import os
+
+# Add the parent directory to the path so we can import the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.agents.circular_guide import CircularGuideAgent
+from app.agents.corporate_detective import CorporateDetectiveAgent
+from app.services.brand_graph import BrandGraph
+from app.models.product_analysis import ProductAnalysis, TrafficLightStatus
+from app.services.agent_scheduler import AgentScheduler, AgentTask
+from app.services.analysis_cache import AnalysisCache
+from app.services.cache import data_fingerprint
+
+def make_analysis(barcode):
+    return ProductAnalysis(
+        product_id=barcode,
+        product_name="Test Product",
+        overall_score=80.0,
+        overall_status=TrafficLightStatus.GREEN,
+        agent_verdicts=[],
+        timestamp="2025-12-01T12:00:00Z"
+    )
+
+def test_analysis_cache():
+    detective = CorporateDetectiveAgent()
+    scheduler = AgentScheduler([AgentTask(detective), AgentTask(CircularGuideAgent())])
+    versions = scheduler.data_versions()
+    print(f"Data versions: {versions}")
+    assert set(versions) == {"Corporate Detective", "Circular Guide"}
+    kb_version = data_fingerprint(versions)
+
+    cache = AnalysisCache(maxsize=10, ttl=60)
+    assert cache.get("123", "profile_a", kb_version) is None
+    cache.set("123", "profile_a", kb_version, make_analysis("123"))
+
+    cached = cache.get("123", "profile_a", kb_version)
+    assert cached is not None and cached.cache_hit
+    assert cache.get("123", "profile_b", kb_version) is None # Other profile, other entry
+
+    # Editing the brand DB changes the knowledge-base version and drops the entry
+    data = copy.deepcopy(detective.brand_graph.data)
+    data["brands"]["Oatly"]["issues"].append("Greenwashing")
+    detective.brand_graph = BrandGraph(data)
+    new_version = data_fingerprint(scheduler.data_versions())
+    assert new_version != kb_version
+    assert cache.get("123", "profile_a", new_version) is None
+    assert cache.get("123", "profile_a", kb_version) is None
+
+    stats = cache.stats()
+    print(f"Stats: {stats}")
+    assert stats["hits"] == 1 and stats["invalidations"] == 1 and stats["misses"] == 4
+
+if __name__ == "__main__":
+    test_analysis_cache()
+    print("Analysis cache test passed!")
@@ -0,0 +1,85 @@
+import asyncio
+import sys
+import os
+import json
+from datetime import datetime, timezone
+
+# Add the parent directory to the path so we can import the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import conftest # Simulated upstreams, no cache files: set before the app is imported
+
+from fastapi.testclient import TestClient
+from app import main
+from app.main import app
+from app.models.product_analysis import ProductAnalysis, TrafficLightStatus
+from app.config import settings
+
+PROFILE = {"user_id": "batch_user", "health_profile": {"allergens": ["Hazelnuts"]}}
+
+def post_batch(client, barcodes, **extra):
+    response = client.post("/analyze/batch", json=dict({"barcodes": barcodes, "user_profile": PROFILE}, **extra))
+    lines = [json.loads(line) for line in response.text.splitlines()] if response.status_code == 200 else []
+    return response, lines
+
+def test_analyze_batch():
+    barcodes = ["3017620422003", "5449000000996", "3017620422003"]
+    with TestClient(app) as client:
+        response, lines = post_batch(client, barcodes)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    print(f"Batch lines: {[(line['index'], line['barcode']) for line in lines]}")
+    # One line per item, duplicates included, each telling which item it answers
+    assert sorted(line["index"] for line in lines) == [0, 1, 2]
+    for line in lines:
+        assert line["barcode"] == barcodes[line["index"]]
+        assert line["analysis"]["product_id"] == line["barcode"]
+        # Stamped when analysed (cached repeats keep their original time)
+        assert datetime.fromisoformat(line["analysis"]["timestamp"]).tzinfo == timezone.utc
+
+def test_batch_order_concurrency_and_errors():
+    # Items with known durations, to follow completion order and concurrency
+    delays = {"slow": 0.3, "fast": 0.01, "medium": 0.1}
+    running = {"now": 0, "peak": 0}
+
+    async def fake_analysis(barcode, user_profile, on_verdict=None, region=None):
+        running["now"] += 1
+        running["peak"] = max(running["peak"], running["now"])
+        try:
+            if barcode == "broken":
+                raise ValueError("no such product")
+            await asyncio.sleep(delays[barcode])
+            return ProductAnalysis(product_id=barcode, overall_score=100.0, overall_status=TrafficLightStatus.GREEN, timestamp="")
+        finally:
+            running["now"] -= 1
+
+    run_analysis, max_items, max_concurrency = main.run_analysis, settings.batch_max_items, settings.batch_max_concurrency
+    main.run_analysis = fake_analysis
+    settings.batch_max_items, settings.batch_max_concurrency = 4, 2
+    try:
+        with TestClient(app) as client:
+            # Lines come in completion order; a failed item is reported inline
+            response, lines = post_batch(client, ["slow", "broken", "fast", "medium"], max_concurrency=10)
+            assert response.status_code == 200
+            print(f"Batch lines: {lines}")
+            assert [line["index"] for line in lines] == [1, 2, 3, 0]
+            assert lines[0] == {"index": 1, "barcode": "broken", "error": "ValueError: no such product"}
+            assert lines[3]["analysis"]["product_id"] == "slow"
+            # The requested concurrency is capped by the server's
+            assert running["peak"] == 2
+
+            running["peak"] = 0
+            response, lines = post_batch(client, ["slow", "medium", "fast"], max_concurrency=1)
+            assert [line["index"] for line in lines] == [0, 1, 2] and running["peak"] == 1
+
+            # Too many items is refused up front
+            response, _ = post_batch(client, ["fast"] * 5)
+            assert response.status_code == 413
+            assert response.json()["detail"] == "Batch too large: at most 4 barcodes per request."
+    finally:
+        main.run_analysis = run_analysis
+        settings.batch_max_items, settings.batch_max_concurrency = max_items, max_concurrency
+
+if __name__ == "__main__":
+    test_analyze_batch()
+    test_batch_order_concurrency_and_errors()
+    print("Batch endpoint tests passed!")
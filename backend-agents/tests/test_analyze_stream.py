@@ -0,0 +1,46 @@
+import sys
+import os
+import json
+
+# Add the parent directory to the path so we can import the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import conftest # Simulated upstreams, no cache files: set before the app is imported
+
+from fastapi.testclient import TestClient
+from app.main import app
+
+def parse_events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+def test_analyze_stream():
+    payload = {
+        "barcode": "3017620422003",
+        "user_profile": {"user_id": "test_user_1", "health_profile": {"allergens": ["Hazelnuts"]}}
+    }
+
+    with TestClient(app) as client:
+        with client.stream("POST", "/analyze/stream", json=payload) as response:
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/event-stream")
+            events = parse_events("".join(response.iter_text()))
+
+    names = [name for name, _ in events]
+    print(f"Events: {names}")
+    assert names[0] == "product" and events[0][1]["product_id"] == "3017620422003"
+    assert names[-1] == "result" and "agent_verdicts" not in events[-1][1]
+
+    verdicts = [data for name, data in events if name == "verdict"]
+    assert len(verdicts) == 9
+    assert verdicts[0]["agent_name"] == "Researcher"
+
+    # Fast per-user agents arrive before the slow carbon estimate
+    order = [v["agent_name"] for v in verdicts]
+    assert order.index("Bio-Shield") < order.index("True Cost")
+
+if __name__ == "__main__":
+    test_analyze_stream()
+    print("Streaming endpoint test passed!")
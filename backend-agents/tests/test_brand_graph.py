@@ -0,0 +1,79 @@
+import asyncio
+import sys
+import os
+import time
+
+# Add the parent directory to the path so we can import the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.agents.corporate_detective import CorporateDetectiveAgent
+from app.services.brand_graph import BrandGraph
+
+GRAPH = {
+    "brands": {
+        "Sunny Oats": {"parent": "Oat Holdings", "aliases": ["Sunny-Oats"], "issues": ["Greenwashing"]},
+        "Oatmeal Club": {"parent": "Oat Holdings"},
+        "Oat": {"parent": "Other Co"},
+    },
+    "companies": {
+        "Oat Holdings": {"parent": "MegaFoods Group", "investors": ["Private Equity LP"]},
+        "MegaFoods Group": {"aliases": ["MegaFoods"], "issues": ["Palm Oil", "Greenwashing"]},
+    },
+}
+
+def test_transitive_ownership():
+    graph = BrandGraph(GRAPH)
+    record = graph.resolve("sunny oats")
+    print(record)
+    assert record.ownership_path == ("Sunny Oats", "Oat Holdings", "MegaFoods Group")
+    assert record.parent == "Oat Holdings" and record.ultimate_parent == "MegaFoods Group"
+    assert record.issues == ("Palm Oil", "Greenwashing") # Inherited first, no duplicates
+    assert record.investors == ("Private Equity LP",)
+
+    # Aliases, punctuation and surrounding text; whole words only, the longest name wins
+    assert graph.resolve("SUNNY-OATS").name == "Sunny Oats"
+    assert graph.resolve("Oat, Sunny Oats Ltd").name == "Sunny Oats"
+    assert graph.resolve("Goat Farm") is None
+    assert graph.resolve("Oatmeal Club").name == "Oatmeal Club"
+    assert graph.resolve("MegaFoods") is None # Companies are owners, not brands
+    assert graph.stats()["max_depth"] == 3
+
+    try:
+        BrandGraph({"companies": {"A": {"parent": "B"}, "B": {"parent": "A"}}})
+        assert False, "ownership cycles must be rejected"
+    except ValueError as e:
+        print(f"Cycle rejected: {e}")
+
+def test_corporate_detective_reports_path():
+    agent = CorporateDetectiveAgent(brand_graph=BrandGraph(GRAPH))
+    verdict = asyncio.run(agent.analyze({"brand_owner": "Sunny Oats"}))
+    print(verdict.reasoning)
+    assert verdict.details["ownership_trace"] == "Sunny Oats -> Oat Holdings -> MegaFoods Group"
+    assert verdict.score == 60.0
+    assert "ultimately 'MegaFoods Group'" in verdict.reasoning
+
+    # The bundled data file
+    verdict = asyncio.run(CorporateDetectiveAgent().analyze({"brand_owner": "Ben & Jerry's"}))
+    assert verdict.details["ownership_path"] == ["Ben & Jerry's", "Unilever"]
+    assert verdict.details["issues"] == ["Plastic Pollution", "Palm Oil"]
+
+def test_large_graph():
+    data = {
+        "brands": {f"Brand {i}": {"parent": f"Holding {i % 500}"} for i in range(20000)},
+        "companies": {f"Holding {i}": {"parent": f"Group {i % 20}", "issues": [f"Issue {i % 7}"]} for i in range(500)},
+    }
+    start = time.perf_counter()
+    graph = BrandGraph(data)
+    built = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(0, 20000, 10):
+        assert graph.resolve(f"Brand {i}").ultimate_parent == f"Group {i % 500 % 20}"
+    lookups = (time.perf_counter() - start) / 2000
+    print(f"Built {len(graph)} entities in {built * 1000:.0f} ms, {lookups * 1e6:.1f} us per lookup")
+    assert graph.resolve("Organic Brand 1234 Snacks").name == "Brand 1234"
+
+if __name__ == "__main__":
+    test_transitive_ownership()
+    test_corporate_detective_reports_path()
+    test_large_graph()
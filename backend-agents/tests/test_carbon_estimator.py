@@ -0,0 +1,82 @@
+import csv
+import json
+import sys
+import os
+import tempfile
+import time
+
+# Add the parent directory to the path so we can import the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.carbon_estimator import CarbonEstimator, main
+from app.services.dump_importer import import_dump
+from app.services.local_product_store import LocalProductStore
+
+def test_percentages_and_packaging():
+    estimator = CarbonEstimator()
+
+    # Equal shares of 100 g: 60 * 0.05 + 3 * 0.05, plus 20 g of plastic
+    assert estimator.estimate({"ingredients": ["Beef", "Milk"], "packaging": "Plastic tray"}) == 3.27
+
+    # Open Food Facts percentages: 10% beef, 90% milk, the packaging weighed 5 g
+    product = {
+        "ingredients": ["Beef", "Milk"],
+        "packaging": "Plastic tray",
+        "raw_data": {
+            "ingredients": [{"text": "Beef", "percent_estimate": 10}, {"text": "Milk", "percent": 90}],
+            "packagings": [{"material": "en:pp-5-polypropylene", "shape": "en:tray", "weight_measured": 5}],
+        },
+    }
+    assert estimator.estimate(product) == round(60 * 0.01 + 3 * 0.09 + 6 * 0.005, 2)
+
+    # Ingredients without a percentage share what is left
+    product["raw_data"]["ingredients"][1] = {"text": "Milk"}
+    assert estimator.estimate(product) == round(60 * 0.01 + 3 * 0.09 + 6 * 0.005, 2)
+
+    assert estimator.estimate({"ingredients": ["Water"], "packaging": "Paper"}) == 0.5 # Nothing matched
+
+def test_batch_matches_single_estimates():
+    estimator = CarbonEstimator()
+    words = ["Beef", "Cheese", "Cocoa", "Coffee", "Rice", "Oats", "Sugar", "Water", "skim milk", "chicken"]
+    products = [
+        {"ingredients": words[i % 7:i % 7 + 1 + i % 4], "packaging": ["Glass Jar", "Can", "Plastic", "Carton"][i % 4]}
+        for i in range(5000)
+    ]
+    start = time.perf_counter()
+    batch = estimator.estimate_batch(products)
+    elapsed = time.perf_counter() - start
+    print(f"Estimated {len(products)} products in {elapsed * 1000:.0f} ms")
+    assert batch[:200] == [estimator.estimate(p) for p in products[:200]]
+
+def test_score_local_store():
+    with tempfile.TemporaryDirectory() as tmp:
+        dump = os.path.join(tmp, "off.jsonl")
+        with open(dump, "w") as f:
+            for i, ingredients in enumerate(["Beef, Salt", "Water", "Cheese, Milk"]):
+                f.write(json.dumps({
+                    "code": f"100{i}",
+                    "product_name": f"Product {i}",
+                    "ingredients_text": ingredients,
+                    "ingredients": [{"text": text, "percent_estimate": 50, "vegan": "no"} for text in ingredients.split(", ")],
+                    "packaging": "Glass",
+                }) + "\n")
+
+        store_path = os.path.join(tmp, "store.sqlite3")
+        store = LocalProductStore(store_path)
+        import_dump(dump, "off", store)
+        record, _, _ = store.get("1000")
+        assert record["ingredients"] == [{"text": "Beef", "percent_estimate": 50}, {"text": "Salt", "percent_estimate": 50}]
+        store.close()
+
+        output = os.path.join(tmp, "scores.csv")
+        main(["--store", store_path, "--output", output, "--batch-size", "2"])
+        with open(output, newline="") as f:
+            rows = list(csv.DictReader(f))
+        print(rows)
+        assert [row["barcode"] for row in rows] == ["1000", "1001", "1002"]
+        assert float(rows[0]["carbon_footprint_kg"]) == round(60 * 0.05 + 0.9 * 0.02, 2)
+
+if __name__ == "__main__":
+    test_percentages_and_packaging()
+    test_batch_matches_single_estimates()
+    test_score_local_store()
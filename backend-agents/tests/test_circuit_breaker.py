@@ -0,0 +1,178 @@
+import asyncio
+import sys
+import os
+
+# Add the parent directory to the path so we can import the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.agents.researcher import ResearcherAgent
+from app.services.analysis_pipeline import prepare_product
+from app.services.circuit_breaker import AdaptiveTimeout, CircuitBreaker, CircuitOpenError, UpstreamUnavailableError
+from app.services.general_product import GeneralProductClient
+from app.services.metrics import metrics
+from app.services.open_food_facts import OpenFoodFactsClient
+from app.services.product_cache import ProductCache
+from app.services.simulator import SimulatedHTTPClient, UpstreamSimulator
+
+def test_breaker_opens_and_recovers():
+    breaker = CircuitBreaker("test_upstream", failure_threshold=3, slow_call_threshold=0.05, reset_timeout=0.1)
+
+    async def failing():
+        raise ConnectionError("down")
+
+    async def slow():
+        await asyncio.sleep(0.06)
+        return "slow"
+
+    async def healthy():
+        return "ok"
+
+    async def scenario():
+        for fn in (failing, failing):
+            try:
+                await breaker.call(fn)
+            except ConnectionError:
+                pass
+        # Slow answers are returned, but count as failures
+        assert await breaker.call(slow) == "slow"
+        assert breaker.state == "open"
+
+        try:
+            await breaker.call(healthy)
+            assert False, "an open circuit must not call the upstream"
+        except CircuitOpenError:
+            pass
+
+        await asyncio.sleep(0.12)
+        assert breaker.state == "half_open"
+        assert await breaker.call(healthy) == "ok" # The probe closes it again
+        assert breaker.state == "closed"
+
+    asyncio.run(scenario())
+    stats = breaker.stats()
+    print(stats)
+    assert stats["rejected"] == 1 and stats["slow_calls"] == 1 and stats["times_opened"] == 1
+    assert 'ethical_lens_circuit_breaker_transitions_total{upstream="test_upstream",state="open"} 1.0' in metrics.render()
+
+def test_adaptive_timeout():
+    timeout = AdaptiveTimeout(initial=5.0, minimum=0.1, maximum=10.0, percentile=99, multiplier=2.0, min_samples=20)
+    for _ in range(19):
+        timeout.observe(0.2)
+    assert timeout.current() == 5.0 # Not enough samples yet
+    for _ in range(100):
+        timeout.observe(0.2)
+    print(f"Adaptive timeout after 0.2s answers: {timeout.current()}s")
+    assert abs(timeout.current() - 0.4) < 1e-9
+
+def test_timeout_follows_slower_upstream():
+    timeout = AdaptiveTimeout(initial=1.0, minimum=0.005, maximum=0.5, percentile=99, multiplier=2.0, min_samples=10)
+    breaker = CircuitBreaker("slowing_upstream", failure_threshold=2, slow_call_threshold=1.0, reset_timeout=0.02, timeout=timeout)
+    latency = {"seconds": 0.01}
+
+    async def upstream():
+        await asyncio.sleep(latency["seconds"])
+        return "ok"
+
+    async def scenario():
+        for _ in range(20):
+            assert await breaker.call(upstream) == "ok"
+        assert timeout.current() < 0.04
+
+        # Latency steps up 8x: the first calls time out, until the timeout has caught up
+        latency["seconds"] = 0.08
+        answers = 0
+        for _ in range(20):
+            try:
+                answers += await breaker.call(upstream) == "ok"
+            except (asyncio.TimeoutError, CircuitOpenError):
+                await asyncio.sleep(0.03)
+        return answers
+
+    answers = asyncio.run(scenario())
+    print(f"Answers after the step: {answers}, timeout: {timeout.current()}s, stats: {breaker.stats()}")
+    assert answers >= 15 and breaker.state == "closed"
+    assert timeout.current() >= 0.16
+
+def test_steady_slow_upstream_not_locked_out():
+    timeout = AdaptiveTimeout(initial=1.0, minimum=0.005, maximum=0.5, percentile=99, multiplier=2.0, min_samples=10)
+    breaker = CircuitBreaker("steady_slow_upstream", failure_threshold=3, slow_call_threshold=0.02, reset_timeout=0.02, timeout=timeout)
+
+    async def upstream():
+        await asyncio.sleep(0.03) # Always above slow_call_threshold, always well within the timeout
+        return "ok"
+
+    async def scenario():
+        answers = []
+        for _ in range(40):
+            try:
+                answers.append(await breaker.call(upstream) == "ok")
+            except CircuitOpenError:
+                answers.append(False)
+                await asyncio.sleep(0.025)
+        return answers
+
+    answers = asyncio.run(scenario())
+    print(f"Answers: {answers.count(True)}/{len(answers)}, stats: {breaker.stats()}")
+    # Slow until its usual latency is known (the probes close the circuit nonetheless), then simply the norm
+    assert all(answers[-20:]) and breaker.state == "closed"
+    assert breaker.slow_threshold() >= 0.03
+
+def test_open_circuit_skips_upstream():
+    simulator = UpstreamSimulator.from_specs({
+        "open_food_facts": {"latency": {"kind": "fixed", "seconds": 0.01}, "error_rate": 1.0},
+    })
+    breaker = CircuitBreaker("open_food_facts_test", failure_threshold=2, reset_timeout=60.0)
+    client = OpenFoodFactsClient(http_client=SimulatedHTTPClient(simulator), circuit_breaker=breaker)
+    researcher = ResearcherAgent(lookup_mode="sequential")
+    researcher.off_client = client
+
+    async def lookups():
+        # Two 503s open the circuit
+        for barcode in ("1000", "1001"):
+            try:
+                await client.get_product_by_barcode(barcode)
+                assert False, "a 503 is not a missing product"
+            except UpstreamUnavailableError as e:
+                assert e.status == 503
+        return await researcher._timed_fetch(researcher._fetch_off, "1002", "Open Food Facts", timings)
+
+    timings = {}
+    product = asyncio.run(lookups())
+    print(f"Timings: {timings}, stats: {breaker.stats()}")
+    assert product is None
+    assert timings["Open Food Facts"]["outcome"] == "circuit_open"
+    assert simulator.stats()["open_food_facts"]["calls"] == 2
+
+def test_failed_lookup_not_cached():
+    simulator = UpstreamSimulator.from_specs({
+        "open_food_facts": {"latency": {"kind": "fixed", "seconds": 0.01}, "error_rate": 1.0, "found_rate": 1.0},
+        "open_beauty_facts": {"latency": {"kind": "fixed", "seconds": 0.01}, "found_rate": 0.0},
+        "general_search": {"latency": {"kind": "fixed", "seconds": 0.01}},
+    })
+    researcher = ResearcherAgent(lookup_mode="sequential", product_cache=ProductCache(maxsize=10))
+    researcher.off_client = OpenFoodFactsClient(
+        http_client=SimulatedHTTPClient(simulator), circuit_breaker=CircuitBreaker("off_failing_test", failure_threshold=100)
+    )
+    researcher.obf_client.http_client = SimulatedHTTPClient(simulator)
+    researcher.general_client = GeneralProductClient(simulator)
+
+    # Open Food Facts answers 503: the general search's placeholder is used for this request only
+    verdict = asyncio.run(researcher.analyze({"barcode": "1000"}))
+    print(f"Timings: {verdict.details['source_timings']}")
+    assert verdict.details["source_timings"]["Open Food Facts"]["outcome"] == "error"
+    assert verdict.details["raw_data"]["is_fallback"] and verdict.details["cache_status"] == "bypass"
+    assert prepare_product(verdict.details).cache_ttl == 0.0
+
+    # Once it is back, the product is found (and cached)
+    simulator.services["open_food_facts"].error_rate = 0.0
+    verdict = asyncio.run(researcher.analyze({"barcode": "1000"}))
+    assert verdict.details["source"] == "Open Food Facts" and verdict.details["cache_status"] == "miss"
+    assert asyncio.run(researcher.analyze({"barcode": "1000"})).details["cache_status"] == "memory"
+
+if __name__ == "__main__":
+    test_breaker_opens_and_recovers()
+    test_adaptive_timeout()
+    test_timeout_follows_slower_upstream()
+    test_steady_slow_upstream_not_locked_out()
+    test_open_circuit_skips_upstream()
+    test_failed_lookup_not_cached()
@@ -0,0 +1,97 @@
+import asyncio
+import sys
+import os
+import tempfile
+
+# Add the parent directory to the path so we can import the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.agents.alternative_recommender import AlternativeRecommenderAgent
+from app.agents.bio_shield import BioShieldAgent
+from app.agents.corporate_detective import CorporateDetectiveAgent
+from app.agents.judge import JudgeAgent
+from app.agents.researcher import ResearcherAgent
+from app.models.product_analysis import TrafficLightStatus
+from app.models.user_profile import UserProfile, HealthProfile, ValueProfile
+from app.services.agent_scheduler import AgentScheduler, AgentTask
+from app.services.analysis_cache import AnalysisCache, SharedVerdictCache
+from app.services.analysis_pipeline import prepare_product
+from app.services.household import HouseholdAnalyzer
+from app.services.local_product_store import LocalProductStore
+
+BARCODE = "2000000000001"
+PRODUCT = {
+    "product_name": "Hazelnut Spread",
+    "brands": "Ben & Jerry's",
+    "ingredients_text": "Sugar, Palm Oil, Hazelnuts, Coffee, Cheese",
+    "nutriments": {"sugars_100g": 56.3, "salt_100g": 0.1},
+}
+
+MEMBERS = [
+    UserProfile(user_id="parent", health_profile=HealthProfile(conditions=["Diabetes"]), value_profile=ValueProfile(weights={"palm_oil": 1.0})),
+    UserProfile(user_id="child", health_profile=HealthProfile(allergens=["Hazelnuts"], age=9)),
+    UserProfile(user_id="teen", health_profile=HealthProfile(age=15, dietary_restrictions=["MAOI"])),
+    UserProfile(user_id="other_parent", health_profile=HealthProfile(conditions=["Diabetes"]), value_profile=ValueProfile(weights={"palm_oil": 1.0})),
+]
+
+class CountingAgent:
+    """
+    Counts the batch calls made to an agent.
+    """
+    def __init__(self, agent):
+        self.agent = agent
+        self.batch_sizes = []
+        analyze_batch = agent.analyze_batch
+        async def counting(products, contexts):
+            self.batch_sizes.append(len(products))
+            return await analyze_batch(products, contexts)
+        agent.analyze_batch = counting
+
+def test_household():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalProductStore(os.path.join(tmp, "products.sqlite3"))
+        store.upsert_many([(BARCODE, "Open Food Facts", "food", PRODUCT)])
+
+        bio_shield, judge = BioShieldAgent(), JudgeAgent()
+        scheduler = AgentScheduler([
+            AgentTask(bio_shield),
+            AgentTask(judge),
+            AgentTask(CorporateDetectiveAgent()),
+            AgentTask(AlternativeRecommenderAgent(), depends_on=[bio_shield.agent_name, judge.agent_name]),
+        ])
+        bio_counter, judge_counter = CountingAgent(bio_shield), CountingAgent(judge)
+        analyzer = HouseholdAnalyzer(ResearcherAgent(local_store=store), scheduler, AnalysisCache(), SharedVerdictCache())
+
+        household = asyncio.run(analyzer.analyze(BARCODE, MEMBERS))
+        for member in household.members:
+            print(f"{member.user_id}: {member.overall_status.value} {[v.reasoning for v in member.verdicts]}")
+
+        assert [v.agent_name for v in household.shared_verdicts] == ["Researcher", "Corporate Detective"]
+        assert [member.user_id for member in household.members] == ["parent", "child", "teen", "other_parent"]
+        assert all([v.agent_name for v in m.verdicts] == ["Bio-Shield", "Judge", "Alternative Recommender"] for m in household.members)
+        # One batch call for the three distinct profiles (identical settings are evaluated once)
+        assert bio_counter.batch_sizes == [3] and judge_counter.batch_sizes == [3]
+        assert store.stats()["lookups"] == 1
+
+        rows = {member.user_id: {v.agent_name: v for v in member.verdicts} for member in household.members}
+        assert rows["child"]["Bio-Shield"].status == TrafficLightStatus.RED
+        assert rows["parent"]["Bio-Shield"].details["warnings"] == ["High Sugar (56.3g/100g) - Risk for Diabetes"]
+        assert "Contains coffee - Not recommended for age 15" in rows["teen"]["Bio-Shield"].details["warnings"]
+        assert rows["parent"] == rows["other_parent"]
+
+        # Each member gets the verdicts a single-profile analysis would give
+        product_data = prepare_product(dict(household.shared_verdicts[0].details)).product_data
+        for profile in MEMBERS:
+            context = {"user_profile": profile}
+            single = asyncio.run(scheduler.run(product_data, context))
+            assert [v for v in single if v.agent_name != "Corporate Detective"] == list(rows[profile.user_id].values())
+
+        # Members' analyses land in the result cache
+        again = asyncio.run(analyzer.analyze(BARCODE, MEMBERS))
+        assert all(member.cache_hit for member in again.members)
+        assert store.stats()["lookups"] == 1
+        store.close()
+
+if __name__ == "__main__":
+    test_household()
+    print("Household test passed!")
@@ -0,0 +1,46 @@
+import asyncio
+import sys
+import os
+
+# Add the parent directory to the path so we can import the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiohttp import web
+from app.services.http_client import SharedHTTPClient
+
+async def ok(request):
+    return web.json_response({"ok": True})
+
+async def serve():
+    app = web.Application()
+    app.router.add_get("/", ok)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{runner.addresses[0][1]}/"
+
+def test_session_closed_with_its_loop():
+    client = SharedHTTPClient()
+    sessions = []
+
+    async def request():
+        runner, url = await serve()
+        try:
+            assert await client.get_json(url) == (200, {"ok": True})
+            assert await client.get_json(url) == (200, {"ok": True})
+            sessions.append(client.session())
+        finally:
+            await runner.cleanup()
+
+    # Each asyncio.run is a new loop: one pooled session per loop, closed when its loop shuts down
+    asyncio.run(request())
+    assert sessions[0].closed
+    asyncio.run(request())
+    assert sessions[1] is not sessions[0] and sessions[1].closed
+    assert client.stats()["sessions_opened"] == 2 and client.stats()["requests_total"] == 4
+    assert not client.stats()["open"]
+
+if __name__ == "__main__":
+    test_session_closed_with_its_loop()
+    print("HTTP client test passed!")
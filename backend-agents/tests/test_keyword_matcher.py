@@ -0,0 +1,59 @@
+import sys
+import os
+
+# Add the parent directory to the path so we can import the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import settings
+from app.services.ingredient_normalizer import normalize_ingredients
+from app.services.keyword_matcher import KeywordMatch, KeywordMatcher, compile_matcher
+
+def test_keyword_matcher():
+    ingredients = ["Sugar", "Palm Oil", "Hazelnuts", None, "Sodium Palmitate", "Organic palm kernel oil"]
+    matcher = KeywordMatcher(["palm oil", "Palmitate", "palm kernel", "oil", "nut"])
+
+    matches = matcher.find_all(ingredients)
+    print(f"Matches: {matches}")
+    assert KeywordMatch(1, "palm oil", 0, 8) in matches
+    assert KeywordMatch(1, "oil", 5, 8) in matches # Overlapping matches are all reported
+    assert KeywordMatch(4, "palmitate", 7, 16) in matches
+
+    assert matcher.keywords_found(ingredients) == {"palm oil", "oil", "nut", "palmitate", "palm kernel"}
+    assert matcher.texts_by_keyword(ingredients)["oil"] == [1, 5]
+    assert matcher.keywords_by_text(ingredients)[5] == {"palm kernel", "oil"}
+
+    # Same semantics as the substring loops it replaces
+    for keyword in matcher.keywords:
+        expected = [i for i, text in enumerate(ingredients) if isinstance(text, str) and keyword in text.lower()]
+        assert matcher.texts_by_keyword(ingredients).get(keyword, []) == expected
+
+    # Compiled once per keyword set
+    assert compile_matcher(["a", "b"]) is compile_matcher(["a", "b"])
+    assert KeywordMatcher([]).find_all(ingredients) == []
+
+def test_normalized_ingredients():
+    normalized = normalize_ingredients(["  Elaeis Guineensis Oil ", "Emulsifier (E441)", "Soy-Lecithin", 42])
+    print(f"Search texts: {normalized.search_texts}")
+    assert normalized.texts == ("elaeis guineensis oil", "emulsifier e441", "soy lecithin", "")
+    assert normalized.items[0].resolved == ("palm oil",)
+    assert normalized.items[1].resolved == ("gelatin",)
+
+    # INCI names, E-numbers and punctuation variants all reach the agents' keywords
+    matcher = compile_matcher(["palm oil", "gelatin", "soy lecithin"])
+    assert matcher.keywords_found(normalized) == {"palm oil", "gelatin", "soy lecithin"}
+
+    # Computed once per ingredient list
+    assert normalize_ingredients(["  Elaeis Guineensis Oil ", "Emulsifier (E441)", "Soy-Lecithin", 42]) is normalized
+
+    # With synonym resolution switched off, only the listed names are matched
+    settings.ingredient_synonyms_enabled = False
+    try:
+        plain = normalize_ingredients(["  Elaeis Guineensis Oil ", "Emulsifier (E441)", "Soy-Lecithin", 42])
+        assert plain.texts == normalized.texts and plain.search_texts == plain.texts
+        assert matcher.keywords_found(plain) == {"soy lecithin"}
+    finally:
+        settings.ingredient_synonyms_enabled = True
+
+if __name__ == "__main__":
+    test_keyword_matcher()
+    test_normalized_ingredients()
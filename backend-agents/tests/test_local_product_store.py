@@ -0,0 +1,55 @@
+import asyncio
+import json
+import sys
+import os
+import tempfile
+
+# Add the parent directory to the path so we can import the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.agents.researcher import ResearcherAgent
+from app.services.dump_importer import import_dump
+from app.services.local_product_store import LocalProductStore
+
+def test_import_and_lookup():
+    with tempfile.TemporaryDirectory() as tmp:
+        off_dump = os.path.join(tmp, "off.jsonl")
+        with open(off_dump, "w") as f:
+            f.write(json.dumps({
+                "code": "3017620422003",
+                "product_name": "Nutella",
+                "brands": "Ferrero",
+                "ingredients_text": "Sugar, Palm Oil, Hazelnuts",
+                "nutriments": {"sugars_100g": 56.3, "energy-kcal": 539},
+                "images": {"front": "https://example.com/nutella.jpg"} # Not stored
+            }) + "\n")
+            f.write("{corrupt line\n")
+
+        obf_dump = os.path.join(tmp, "obf.csv")
+        with open(obf_dump, "w") as f:
+            f.write("code\tproduct_name\tbrands\tingredients_text\tpackaging\torigins\n")
+            f.write("3600522606824\tElvive Shampoo\tL'Oreal\tAqua, Sodium Laureth Sulfate\tPlastic Bottle\tFrance\n")
+
+        store = LocalProductStore(os.path.join(tmp, "store.sqlite3"))
+        assert import_dump(off_dump, "off", store) == 1
+        assert import_dump(obf_dump, "obf", store) == 1
+
+        record, source, category = store.get("3017620422003")
+        assert record == {
+            "product_name": "Nutella",
+            "brands": "Ferrero",
+            "ingredients_text": "Sugar, Palm Oil, Hazelnuts",
+            "nutriments": {"sugars_100g": 56.3}
+        }
+        assert (source, category) == ("Open Food Facts", "food")
+
+        researcher = ResearcherAgent(local_store=store)
+        verdict = asyncio.run(researcher.analyze({"barcode": "3600522606824"}))
+        print(f"Researcher: {verdict.reasoning} {verdict.details['source_timings']}")
+        assert verdict.details["source"] == "Open Beauty Facts"
+        assert verdict.details["cache_status"] == "local"
+        assert "Sodium Laureth Sulfate" in verdict.details["ingredients"]
+        store.close()
+
+if __name__ == "__main__":
+    test_import_and_lookup()
@@ -0,0 +1,54 @@
+import asyncio
+import sys
+import os
+
+# Add the parent directory to the path so we can import the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import conftest # Simulated upstreams, no cache files: set before the app is imported
+
+from fastapi.testclient import TestClient
+from app.services.metrics import MetricsRegistry
+
+def test_metrics_registry():
+    registry = MetricsRegistry()
+    latency = registry.histogram("test_duration_seconds", "Test latency.", ["agent", "outcome"], buckets=(0.1, 1.0))
+    latency.observe(0.05, "Judge", "ok")
+    latency.observe(0.5, "Judge", "ok")
+    latency.observe(0.1, "Judge", "ok") # Upper bounds are inclusive
+
+    async def failing_call():
+        with latency.time("Bio-Shield"):
+            raise asyncio.TimeoutError()
+    try:
+        asyncio.run(failing_call())
+    except asyncio.TimeoutError:
+        pass
+
+    registry.callback("test_hit_ratio", "Test ratio.", ["cache"], lambda: {("product",): 0.75})
+    text = registry.render()
+    print(text)
+    assert "# TYPE test_duration_seconds histogram" in text
+    assert 'test_duration_seconds_bucket{agent="Judge",outcome="ok",le="0.1"} 2' in text
+    assert 'test_duration_seconds_bucket{agent="Judge",outcome="ok",le="+Inf"} 3' in text
+    assert 'test_duration_seconds_count{agent="Judge",outcome="ok"} 3' in text
+    assert 'test_duration_seconds_count{agent="Bio-Shield",outcome="timeout"} 1' in text
+    assert 'test_hit_ratio{cache="product"} 0.75' in text
+
+def test_metrics_endpoint():
+    from app.main import app
+
+    with TestClient(app) as client:
+        client.get("/")
+        response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert 'ethical_lens_request_duration_seconds_count{method="GET",route="/",status="200"}' in text
+    assert 'ethical_lens_cache_hit_ratio{cache="analysis"}' in text
+    assert "ethical_lens_requests_in_flight 1.0" in text # The scrape itself
+    assert "# TYPE ethical_lens_event_loop_lag_seconds histogram" in text
+
+if __name__ == "__main__":
+    test_metrics_registry()
+    test_metrics_endpoint()
+    print("Metrics tests passed!")
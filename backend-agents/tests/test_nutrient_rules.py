@@ -0,0 +1,85 @@
+import asyncio
+import sys
+import os
+
+import numpy as np
+
+# Add the parent directory to the path so we can import the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.agents.bio_shield import BioShieldAgent
+from app.models.user_profile import UserProfile, HealthProfile
+from app.services.nutrient_rules import NutrientRuleSet, nutrient_rules
+from app.services.profile_compiler import ProfileCompiler
+
+RULES = {
+    "conditions": {
+        "Diabetes": {"rules": [{"nutriment": "sugars_100g", "threshold": 10, "label": "High Sugar"}]},
+        "Kidney Disease": {
+            "aliases": ["CKD"],
+            "rules": [
+                {"nutriment": "potassium_100g", "threshold": 0.3, "label": "High Potassium"},
+                {"nutriment": "sugars_100g", "threshold": 20, "label": "Very High Sugar"},
+            ],
+        },
+    }
+}
+
+def test_rule_matrix():
+    rules = NutrientRuleSet(RULES)
+    evaluator = rules.compile()
+    assert evaluator.nutriments == ("sugars_100g", "potassium_100g") # Shared nutriments are read once
+
+    products = [
+        {"sugars_100g": 12, "potassium_100g": 0.1},
+        {"sugars_100g": 25.5, "potassium_100g": "0.45"},
+        {}, # Missing values count as 0
+        {"sugars_100g": None, "potassium_100g": 0.3}, # Threshold itself is not exceeded
+    ]
+    hits = evaluator.evaluate(evaluator.matrix(products))
+    print(hits)
+    assert hits.shape == (4, 3)
+    assert np.array_equal(hits, [
+        [True, False, False],
+        [True, True, True],
+        [False, False, False],
+        [False, False, False],
+    ])
+
+def test_profile_rules():
+    rules = NutrientRuleSet(RULES)
+    # Conditions match by name or alias, in any case, and keep the data file order
+    assert rules.resolve_conditions(["ckd", "DIABETES", "Asthma"]) == ("Diabetes", "Kidney Disease")
+    guard = rules.compile(["CKD"])
+    assert [rule.label for rule in guard.rules] == ["High Potassium", "Very High Sugar"]
+    assert guard.warnings({"potassium_100g": 0.5, "sugars_100g": 21}) == [
+        "High Potassium (0.5g/100g) - Risk for Kidney Disease",
+        "Very High Sugar (21g/100g) - Risk for Kidney Disease",
+    ]
+    assert rules.compile([]).warnings({"sugars_100g": 50}) == []
+
+    batch = guard.warnings_batch([{"potassium_100g": 1}, {}, {"sugars_100g": 30}])
+    assert batch == [
+        ["High Potassium (1g/100g) - Risk for Kidney Disease"],
+        [],
+        ["Very High Sugar (30g/100g) - Risk for Kidney Disease"],
+    ]
+
+    compiled = ProfileCompiler(rules=rules).compile(
+        UserProfile(user_id="u", health_profile=HealthProfile(conditions=["diabetes"]))
+    )
+    assert [rule.condition for rule in compiled.nutrient_guard.rules] == ["Diabetes"]
+
+def test_bundled_rules_in_bio_shield():
+    print(f"Bundled rules: {nutrient_rules.stats()}")
+    profile = UserProfile(user_id="u", health_profile=HealthProfile(conditions=["Pregnant", "Hypertension"]))
+    product = {"ingredients": ["Water", "Coffee"], "raw_data": {"nutriments": {"caffeine_100g": 0.04, "salt_100g": 0.1}}}
+    verdict = asyncio.run(BioShieldAgent().analyze(product, {"user_profile": profile}))
+    print(verdict.reasoning)
+    assert verdict.details["warnings"] == ["High Caffeine (0.04g/100g) - Risk for Pregnancy"]
+
+if __name__ == "__main__":
+    test_rule_matrix()
+    test_profile_rules()
+    test_bundled_rules_in_bio_shield()
+    print("Nutrient rules test passed!")
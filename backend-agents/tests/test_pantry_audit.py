@@ -0,0 +1,87 @@
+import asyncio
+import sys
+import os
+import tempfile
+
+# Add the parent directory to the path so we can import the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.agents.alternative_recommender import AlternativeRecommenderAgent
+from app.agents.bio_shield import BioShieldAgent
+from app.agents.judge import JudgeAgent
+from app.agents.researcher import ResearcherAgent
+from app.agents.true_cost import TrueCostAgent
+from app.models.user_profile import UserProfile, HealthProfile, ValueProfile
+from app.services.agent_scheduler import AgentScheduler, AgentTask
+from app.services.analysis_cache import AnalysisCache, SharedVerdictCache
+from app.services.analysis_pipeline import prepare_product
+from app.services.local_product_store import LocalProductStore
+from app.services.pantry_audit import PantryAuditor
+
+PRODUCTS = {
+    "1000000000001": {"product_name": "Chocolate Spread", "ingredients_text": "Sugar, Palm Oil, Hazelnuts", "nutriments": {"sugars_100g": 56.3}},
+    "1000000000002": {"product_name": "Oat Drink", "ingredients_text": "Water, Oats, Salt", "nutriments": {"sugars_100g": 4.0, "salt_100g": 0.1}},
+    "1000000000003": {"product_name": "Cola", "ingredients_text": "Carbonated Water, Sugar, Caffeine", "packaging": "Plastic Bottle", "nutriments": {"sugars_100g": 10.6}},
+}
+
+PROFILE = UserProfile(
+    user_id="pantry_user",
+    health_profile=HealthProfile(allergens=["Hazelnuts"], conditions=["Diabetes"]),
+    value_profile=ValueProfile(weights={"palm_oil": 1.0}),
+)
+
+def make_auditor(store):
+    bio_shield, judge, true_cost = BioShieldAgent(), JudgeAgent(), TrueCostAgent()
+    scheduler = AgentScheduler([
+        AgentTask(bio_shield),
+        AgentTask(judge),
+        AgentTask(AlternativeRecommenderAgent(), depends_on=[bio_shield.agent_name, judge.agent_name]),
+        AgentTask(true_cost),
+    ])
+    researcher = ResearcherAgent(local_store=store)
+    return PantryAuditor(researcher, scheduler, AnalysisCache(), SharedVerdictCache()), true_cost
+
+def test_pantry_audit():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LocalProductStore(os.path.join(tmp, "products.sqlite3"))
+        store.upsert_many((barcode, "Open Food Facts", "food", record) for barcode, record in PRODUCTS.items())
+        auditor, true_cost = make_auditor(store)
+
+        carbon_calls = []
+        estimate_footprints = true_cost.carbon_api.estimate_footprints
+        async def counting_estimate(products):
+            carbon_calls.append(len(products))
+            return await estimate_footprints(products)
+        true_cost.carbon_api.estimate_footprints = counting_estimate
+
+        barcodes = ["1000000000001", "1000000000002", "1000000000001", "1000000000003"]
+        audit = asyncio.run(auditor.audit(barcodes, PROFILE))
+        summary = audit.summary
+        print(f"Summary: {summary}")
+
+        assert [item.barcode for item in audit.items] == barcodes
+        assert summary.total_items == 4 and summary.unique_products == 3 and summary.failed_items == 0
+        assert audit.items[0].analysis is audit.items[2].analysis # Repeats share one analysis
+        assert summary.flagged == ["1000000000001", "1000000000001"] # Hazelnut allergy
+        assert store.stats() == {"path": store.path, "lookups": 3, "hits": 3} # One bulk query
+        assert carbon_calls == [3] # One carbon call for the whole pantry
+
+        # Batch verdicts are the verdicts a single analysis would give
+        bio_shield, judge = auditor.scheduler.tasks[0].agent, auditor.scheduler.tasks[1].agent
+        for item in audit.items:
+            verdicts = {v.agent_name: v for v in item.analysis.agent_verdicts}
+            product_data = prepare_product(dict(verdicts["Researcher"].details)).product_data
+            context = {"user_profile": PROFILE}
+            assert verdicts["Bio-Shield"] == asyncio.run(bio_shield.analyze(product_data, context))
+            assert verdicts["Judge"] == asyncio.run(judge.analyze(product_data, context))
+        cola = {v.agent_name: v for v in audit.items[3].analysis.agent_verdicts}
+        assert cola["Bio-Shield"].details["warnings"] == ["High Sugar (10.6g/100g) - Risk for Diabetes"]
+
+        # A second audit is served from the result cache
+        again = asyncio.run(auditor.audit(barcodes, PROFILE))
+        assert again.summary.cache_hits == 3 and carbon_calls == [3]
+        store.close()
+
+if __name__ == "__main__":
+    test_pantry_audit()
+    print("Pantry audit test passed!")
@@ -0,0 +1,60 @@
+import asyncio
+import sys
+import os
+import tempfile
+import time
+
+# Add the parent directory to the path so we can import the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.cache import MISSING, LRUCache
+from app.services.product_cache import ProductCache
+
+def test_lru_cache():
+    cache = LRUCache(maxsize=2, ttl=0.05)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")       # "a" becomes most recently used
+    cache.set("c", 3)    # evicts "b"
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    time.sleep(0.06)
+    assert cache.get("a") is MISSING
+    stats = cache.stats()
+    print(f"LRU stats: {stats}")
+    assert stats["evictions"] == 1 and stats["expirations"] == 1
+
+    # A zero TTL caches nothing, and drops what was there
+    cache.set("a", 1)
+    cache.set("a", 2, ttl=0)
+    assert cache.get("a") is MISSING
+
+def test_product_cache_tiers():
+    async def run():
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache.sqlite3")
+            entry = {"product_info": {"product_name": "Nutella"}, "source": "Open Food Facts", "category": "food"}
+
+            cache = ProductCache(maxsize=10, path=path, negative_ttl=60)
+            assert (await cache.get("123"))[1] == "miss"
+            await cache.set("123", entry)
+            await cache.set("404", None) # Not found anywhere
+            assert await cache.get("123") == (entry, "memory")
+            assert await cache.get("404") == (None, "memory")
+            cache.close()
+
+            # A fresh process only has the disk tier, hits get promoted to memory
+            restarted = ProductCache(maxsize=10, path=path)
+            assert await restarted.get("123") == (entry, "disk")
+            assert await restarted.get("123") == (entry, "memory")
+            assert await restarted.get("404") == (None, "disk")
+            stats = restarted.stats()
+            print(f"Product cache stats: {stats}")
+            assert stats["disk_hits"] == 2 and stats["memory_hits"] == 1 and stats["negative_hits"] == 1
+            restarted.close()
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    test_lru_cache()
+    test_product_cache_tiers()
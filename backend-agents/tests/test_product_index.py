@@ -0,0 +1,106 @@
+import asyncio
+import sys
+import os
+import tempfile
+
+# Add the parent directory to the path so we can import the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.agents.alternative_recommender import AlternativeRecommenderAgent
+from app.models.user_profile import UserProfile, HealthProfile, ValueProfile
+from app.services.carbon_estimator import catalog_product
+from app.services.local_product_store import LocalProductStore
+from app.services.product_index import ProductIndex, main
+
+CATALOG = [
+    ("3000000000001", "Open Food Facts", "food", {"product_name": "Hazelnut Cocoa Spread", "ingredients_text": "Sugar, Palm Oil, Hazelnuts, Cocoa, Milk Powder"}),
+    ("3000000000002", "Open Food Facts", "food", {"product_name": "Organic Hazelnut Spread", "ingredients_text": "Hazelnuts, Sugar, Cocoa, Sunflower Oil"}),
+    ("3000000000003", "Open Food Facts", "food", {"product_name": "Cocoa Spread", "ingredients_text": "Sugar, Sunflower Oil, Cocoa, Milk Powder"}),
+    ("3000000000004", "Open Food Facts", "food", {"product_name": "Peanut Spread", "ingredients_text": "Peanuts, Sugar, Palm Oil, Salt"}),
+    ("3000000000005", "Open Food Facts", "food", {"product_name": "Oat Drink", "ingredients_text": "Water, Oats, Sunflower Oil, Salt"}),
+    ("3000000000006", "Open Food Facts", "food", {"product_name": "Almond Drink", "ingredients_text": "Water, Almonds, Salt"}),
+    ("3000000000007", "Open Beauty Facts", "beauty", {"product_name": "Cocoa Body Butter", "ingredients_text": "Cocoa Butter, Sunflower Oil, Parfum"}),
+]
+
+SCANNED = {"product_name": "Chocolate Hazelnut Spread", "category": "food", "ingredients": ["Sugar", "Palm Oil", "Hazelnuts", "Cocoa", "Milk Powder"]}
+
+def make_store(tmp):
+    store = LocalProductStore(os.path.join(tmp, "products.sqlite3"))
+    store.upsert_many(CATALOG)
+    return store
+
+def test_search():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(tmp)
+        index = ProductIndex.build(row for batch in store.iter_batches() for row in batch)
+        assert len(index) == len(CATALOG)
+        assert "i:hazelnuts" in index.terms and "n:drink" in index.terms
+        assert "i:peanuts" not in index.terms # Found in one product only
+
+        results = index.search(SCANNED, k=3)
+        print(f"Similar: {results}")
+        assert [r.barcode for r in results] == ["3000000000001", "3000000000002", "3000000000004"]
+        assert all(a.similarity >= b.similarity for a, b in zip(results, results[1:]))
+
+        # Every candidate is scored exactly like a full cosine over all the products
+        catalog = {barcode: catalog_product(record) for barcode, _, _, record in CATALOG}
+        for result in index.search(SCANNED, k=len(CATALOG)):
+            ids, weights = index.vectorize(catalog[result.barcode])
+            query_ids, query_weights = index.vectorize(SCANNED)
+            common = {t: w for t, w in zip(ids, weights)}
+            expected = sum(w * common.get(t, 0.0) for t, w in zip(query_ids, query_weights))
+            assert abs(result.similarity - expected) < 1e-4
+
+        # "Cocoa" in the name also matches the cocoa body butter, unless the search stays within food
+        cocoa = dict(SCANNED, product_name="Cocoa Hazelnut Spread")
+        assert "3000000000007" in [r.barcode for r in index.search(cocoa, k=10)]
+        assert {r.category for r in index.search(cocoa, k=10, category="food")} == {"food"}
+        assert "3000000000001" not in [r.barcode for r in index.search(SCANNED, k=10, exclude=["3000000000001"])]
+        assert index.search({"product_name": "Xyz", "ingredients": ["Unobtainium"]}) == []
+
+        # Saved and loaded through the CLI
+        path = os.path.join(tmp, "index.npz")
+        main(["--store", store.path, "--output", path])
+        loaded = ProductIndex.load(path)
+        assert loaded.version == index.version and loaded.search(SCANNED, k=3) == results
+        store.close()
+
+def test_recommendations_follow_profile():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(tmp)
+        index = ProductIndex.build(row for batch in store.iter_batches() for row in batch)
+        agent = AlternativeRecommenderAgent(index=index, store=store, top_k=2)
+
+        profile = UserProfile(
+            user_id="spread_user",
+            health_profile=HealthProfile(allergens=["Hazelnuts"]),
+            value_profile=ValueProfile(weights={"palm_oil": 1.0}),
+        )
+        verdict = asyncio.run(agent.analyze(SCANNED, {"user_profile": profile}))
+        recommendations = verdict.details["recommendations"]
+        print(f"Recommendations: {recommendations}")
+        # No hazelnuts, no palm oil: the hazelnut spreads and the palm oil peanut spread are left out
+        assert [r["barcode"] for r in recommendations] == ["3000000000003"]
+        assert recommendations[0]["reason"] == "Similar product without hazelnuts, palm oil"
+
+        # A minor value conflict lowers the rank instead
+        profile = UserProfile(user_id="lenient_user", value_profile=ValueProfile(weights={"palm_oil": 0.2}))
+        verdict = asyncio.run(agent.analyze(SCANNED, {"user_profile": profile}))
+        recommendations = verdict.details["recommendations"]
+        assert [r["barcode"] for r in recommendations] == ["3000000000002", "3000000000001"]
+        assert recommendations[1]["score"] == round(recommendations[1]["similarity"] * 0.9, 4)
+
+        # Without a profile, only similarity counts
+        verdict = asyncio.run(agent.analyze(SCANNED, {}))
+        assert [r["barcode"] for r in verdict.details["recommendations"]] == ["3000000000001", "3000000000002"]
+
+        # Products with nothing in common with the catalog fall back to the curated lists
+        verdict = asyncio.run(agent.analyze({"product_name": "Cola", "ingredients": ["Unobtainium"]}, {}))
+        assert verdict.details["category"] == "Soda"
+        assert agent.data_version() != AlternativeRecommenderAgent().data_version()
+        store.close()
+
+if __name__ == "__main__":
+    test_search()
+    test_recommendations_follow_profile()
+    print("Product index tests passed!")
@@ -0,0 +1,42 @@
+import sys
+import os
+
+# Add the parent directory to the path so we can import the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.user_profile import UserProfile, HealthProfile, ValueProfile
+from app.services.profile_compiler import ProfileCompiler, fingerprint_profile
+
+def make_profile(user_id, allergens):
+    return UserProfile(
+        user_id=user_id,
+        health_profile=HealthProfile(allergens=allergens, conditions=["Diabetes"], age=16, dietary_restrictions=["MAOI"]),
+        value_profile=ValueProfile(weights={"palm_oil": 1.0, "animal_welfare": 0.0}),
+    )
+
+def test_profile_compiler():
+    compiler = ProfileCompiler(maxsize=2)
+
+    first = compiler.compile(make_profile("user_1", ["Peanuts", "peanuts", "Milk"]))
+    print(f"Compiled: {first.allergens}, {first.active_values}")
+    assert first.allergens == ("peanuts", "milk")
+    assert [rule.condition for rule in first.nutrient_guard.rules] == ["Diabetes"]
+    assert first.is_minor and first.takes_maoi
+    assert [category for category, _, _ in first.active_values] == ["palm_oil"] # Zero weights are dropped
+    assert first.value_matcher.keywords == ("palm oil", "palmitate", "palm kernel")
+
+    # Same settings under another user id share the compiled profile
+    assert fingerprint_profile(make_profile("user_2", ["Peanuts", "peanuts", "Milk"])) == first.fingerprint
+    assert compiler.compile(make_profile("user_2", ["Peanuts", "peanuts", "Milk"])) is first
+
+    # Any change to the settings gives a new fingerprint
+    other = compiler.compile(make_profile("user_1", ["Soy"]))
+    assert other.fingerprint != first.fingerprint
+
+    stats = compiler.stats()
+    print(f"Stats: {stats}")
+    assert stats["hits"] == 1 and stats["misses"] == 2
+
+if __name__ == "__main__":
+    test_profile_compiler()
+    print("Profile compiler test passed!")
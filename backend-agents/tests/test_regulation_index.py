@@ -0,0 +1,92 @@
+import asyncio
+import sys
+import os
+
+# Add the parent directory to the path so we can import the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.agents.bio_shield import BioShieldAgent
+from app.agents.circular_guide import CircularGuideAgent
+from app.models.product_analysis import TrafficLightStatus
+from app.models.user_profile import UserProfile
+from app.services.ingredient_normalizer import normalize_ingredients
+from app.services.regulation_index import RegulationIndex, regulation_index
+
+DATA = {
+    "regions": {
+        "EU": {"banned_ingredients": ["Titanium Dioxide", "Potassium Bromate"], "additives_limits": {"Sodium Nitrite": 0.015}},
+        "FR": {"parent": "EU", "recycling_rules": {"Plastic": "Yellow Bin", "Glass": "Glass Bank"}},
+        "US": {"banned_ingredients": ["Brominated Vegetable Oil"], "recycling_rules": {"Plastic": "Blue Bin", "Composite": "Trash"}},
+        "US-CA": {"banned_ingredients": ["Potassium Bromate"], "recycling_rules": {"Glass": "Blue Bin"}, "additives_limits": {"Sodium Nitrite": 0.01}},
+    }
+}
+
+def test_region_fallback_and_rules():
+    index = RegulationIndex(DATA)
+    assert [index.region_code(code) for code in ["us-ca", "US-CA-SF", "US-NY", "fr", "FR-75", "JP", "", None]] == \
+        ["US-CA", "US-CA", "US", "FR", "FR", None, None, None]
+    assert index.get("US-CA").chain == ("US-CA", "US") and index.get("FR").chain == ("FR", "EU")
+
+    ingredients = normalize_ingredients(["Flour", "Potassium bromate", "Brominated vegetable oil", "Titanium dioxide (E171)"])
+    found = index.scan_banned(ingredients)
+    assert [(b.text_index, b.banned_in) for b in index.banned_in(found, index.get("US-CA"))] == [(1, "US-CA"), (2, "US")]
+    assert [(b.text_index, b.banned_in) for b in index.banned_in(found, index.get("FR"))] == [(1, "EU"), (3, "EU")]
+
+    # Materials are found anywhere in the packaging text, rules inherited from the parent region
+    assert index.recycling_advice("Plastic Bottle", index.get("US-CA")) == ("plastic", "Blue Bin")
+    assert index.recycling_advice("Glass jar, plastic lid", index.get("US-CA")) == ("glass", "Blue Bin")
+    assert index.recycling_advice("Composite carton", index.get("FR")) is None
+
+    # The most specific limit wins
+    product = {"raw_data": {"ingredients": [{"text": "Pork"}, {"text": "Sodium nitrite", "percent": 0.012}]}}
+    scanned = index.scan_additives(product)
+    assert [e.limited_in for e in index.additive_excesses(scanned, index.get("US-CA"))] == ["US-CA"]
+    assert index.additive_excesses(scanned, index.get("FR")) == []
+
+def test_compact_for_many_regions():
+    # Every region shares one automaton per kind of rule: a region only adds its own bit
+    regions = {f"R{i}": {"banned_ingredients": [f"additive {i % 50}", "potassium bromate"]} for i in range(500)}
+    regions.update({f"R{i}-S": {"recycling_rules": {"Plastic": f"Bin {i}"}} for i in range(500)})
+    index = RegulationIndex({"regions": regions})
+    assert index.stats() == {"regions": 1000, "banned_ingredients": 51, "materials": 1, "limited_additives": 0}
+    found = index.scan_banned(normalize_ingredients(["Additive 7", "Water"]))
+    assert [(b.keyword, b.banned_in) for b in index.banned_in(found, index.get("R7-S"))] == [("additive 7", "R7")]
+    assert [(b.keyword, b.banned_in) for b in index.banned_in(found, index.get("R57"))] == [("additive 7", "R57")]
+    assert index.banned_in(found, index.get("R8")) == []
+    assert index.recycling_advice("plastic tray", index.get("r499-s")) == ("plastic", "Bin 499")
+
+def test_agents_use_region():
+    bio_shield, circular_guide = BioShieldAgent(), CircularGuideAgent()
+    profile = UserProfile(user_id="regional_user")
+    product = {
+        "product_name": "Bread",
+        "packaging": "Plastic Bag",
+        "ingredients": ["Wheat Flour", "Water", "Potassium Bromate"],
+        "normalized_ingredients": normalize_ingredients(["Wheat Flour", "Water", "Potassium Bromate"]),
+    }
+
+    verdict = asyncio.run(bio_shield.analyze(product, {"user_profile": profile, "region": "US-CA"}))
+    print(f"Bio-Shield (US-CA): {verdict.reasoning}")
+    assert verdict.status == TrafficLightStatus.RED
+    assert verdict.details == {"banned_ingredients": ["Potassium Bromate"], "region": "US-CA"}
+    assert asyncio.run(bio_shield.analyze(product, {"user_profile": profile, "region": "US-TX"})).status == TrafficLightStatus.GREEN
+    assert asyncio.run(bio_shield.analyze(product, {"user_profile": profile})).status == TrafficLightStatus.GREEN
+
+    # A household batch mixing regions gets each its own answer
+    verdicts = asyncio.run(bio_shield.analyze_batch([product] * 3, [{"user_profile": profile, "region": r} for r in ("DE", None, "US-CA-SF")]))
+    assert [v.status for v in verdicts] == [TrafficLightStatus.RED, TrafficLightStatus.GREEN, TrafficLightStatus.RED]
+    assert "banned in EU" in verdicts[0].reasoning and "banned in US-CA" in verdicts[2].reasoning
+
+    verdict = asyncio.run(circular_guide.analyze(product, {"region": "de"}))
+    print(f"Circular Guide (DE): {verdict.reasoning}")
+    assert verdict.status == TrafficLightStatus.GREEN
+    assert verdict.details == {"packaging_detected": "Plastic Bag", "location_used": "DE", "disposal_instructions": "Yellow Bin (Gelber Sack)"}
+    # Without a region, the default rules (exact packaging names) still apply
+    assert asyncio.run(circular_guide.analyze(product, {})).details["location_used"] == "default"
+    assert regulation_index.get("US-CA-SF").chain == ("US-CA-SF", "US-CA", "US")
+
+if __name__ == "__main__":
+    test_region_fallback_and_rules()
+    test_compact_for_many_regions()
+    test_agents_use_region()
+    print("Regulation index tests passed!")
@@ -0,0 +1,65 @@
+import asyncio
+import sys
+import os
+
+# Add the parent directory to the path so we can import the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.agents.researcher import ResearcherAgent
+from app.services.general_product import GeneralProductClient
+from app.services.simulator import SimulatedHTTPClient, UpstreamSimulator
+
+# Open Food Facts knows the spread, Open Beauty Facts the shampoo
+CATALOG = {
+    ("open_food_facts", "3017620422003"): {"product_name": "Nutella", "ingredients_text": "Sugar, Palm Oil, Hazelnuts"},
+    ("open_beauty_facts", "3600522606824"): {"product_name": "Elvive Shampoo", "ingredients_text": "Aqua, Sodium Laureth Sulfate"},
+}
+
+def make_researcher(lookup_mode, off_latency=0.02, obf_latency=0.02):
+    simulator = UpstreamSimulator.from_specs({
+        "open_food_facts": {"latency": {"kind": "fixed", "seconds": off_latency}},
+        "open_beauty_facts": {"latency": {"kind": "fixed", "seconds": obf_latency}},
+        "general_search": {"latency": {"kind": "fixed", "seconds": 0.5}},
+    })
+    http_client = SimulatedHTTPClient(simulator, catalog=lambda service, barcode: CATALOG.get((service.name, barcode)))
+    researcher = ResearcherAgent(lookup_mode=lookup_mode, http_client=http_client)
+    researcher.general_client = GeneralProductClient(simulator)
+    return researcher, http_client
+
+def test_sequential_lookup():
+    researcher, http_client = make_researcher("sequential")
+    verdict = asyncio.run(researcher.analyze({"barcode": "3600522606824"}))
+    timings = verdict.details["source_timings"]
+    print(f"Sequential timings: {timings}")
+    # One source after the other, until one has the product
+    assert verdict.details["source"] == "Open Beauty Facts" and verdict.details["category"] == "beauty"
+    assert [(source, t["outcome"]) for source, t in timings.items()] == [("Open Food Facts", "miss"), ("Open Beauty Facts", "hit")]
+    assert http_client.requests_total == 2
+
+def test_hedged_lookup():
+    # The slower Open Beauty Facts answers too, but the better-ranked source wins
+    researcher, _ = make_researcher("hedged", off_latency=0.05, obf_latency=0.01)
+    verdict = asyncio.run(researcher.analyze({"barcode": "3017620422003"}))
+    assert verdict.details["source"] == "Open Food Facts" and verdict.details["product_name"] == "Nutella"
+
+    # Open Food Facts answers first: the lookups still running are cancelled, upstream calls included
+    researcher, http_client = make_researcher("hedged", off_latency=0.01, obf_latency=0.5)
+
+    async def lookup():
+        verdict = await researcher.analyze({"barcode": "3017620422003"})
+        await asyncio.sleep(0.01) # Let the cancellations run
+        return verdict, http_client.in_flight
+
+    verdict, in_flight = asyncio.run(lookup())
+    timings = verdict.details["source_timings"]
+    print(f"Hedged timings: {timings}")
+    assert verdict.details["source"] == "Open Food Facts"
+    assert timings["Open Beauty Facts"]["outcome"] == "cancelled" and timings["General Web Search"]["outcome"] == "cancelled"
+    assert in_flight == 0
+    assert researcher.obf_client.single_flight.stats()["cancelled"] == 1
+    assert researcher.general_client.single_flight.stats()["cancelled"] == 1
+
+if __name__ == "__main__":
+    test_sequential_lookup()
+    test_hedged_lookup()
+    print("Researcher lookup tests passed!")
@@ -0,0 +1,87 @@
+import asyncio
+import sys
+import os
+import random
+import time
+
+# Add the parent directory to the path so we can import the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.open_food_facts import OpenFoodFactsClient
+from app.services.simulator import (
+    HistogramLatency, LognormalLatency, SimulatedHTTPClient, UpstreamError, UpstreamSimulator
+)
+
+def test_latency_models():
+    rng = random.Random(1)
+
+    samples = sorted(LognormalLatency(median=0.2, sigma=0.5).sample(rng) for _ in range(2000))
+    median = samples[len(samples) // 2]
+    print(f"Lognormal median: {median:.3f}s, p99: {samples[int(len(samples) * 0.99)]:.3f}s")
+    assert 0.18 < median < 0.22
+    assert samples[-1] > 2 * median # Long tail
+
+    histogram = HistogramLatency([[0.1, 90], [1.0, 10]])
+    samples = [histogram.sample(rng) for _ in range(2000)]
+    assert all(0.0 <= s <= 1.0 for s in samples)
+    assert 0.85 < sum(1 for s in samples if s <= 0.1) / len(samples) < 0.95
+
+    # The cumulative buckets of a /metrics scrape replay as the same histogram
+    scraped = HistogramLatency([[0.1, 90], [1.0, 100], ["+Inf", 100]], cumulative=True)
+    assert scraped.buckets == histogram.buckets
+    try:
+        HistogramLatency([[0.1, 90], ["+Inf", 100]])
+        assert False, "cumulative buckets must be declared as such"
+    except ValueError:
+        pass
+
+def test_fault_injection():
+    simulator = UpstreamSimulator.from_specs({
+        "flaky": {"latency": {"kind": "fixed", "seconds": 0.0}, "error_rate": 0.2, "rate_limit_rate": 0.1, "timeout_rate": 0.1, "timeout": 0.0},
+    }, seed=42)
+
+    async def call_many():
+        outcomes = {"ok": 0, "error": 0, "timeout": 0}
+        for _ in range(1000):
+            try:
+                await simulator.call("flaky")
+                outcomes["ok"] += 1
+            except asyncio.TimeoutError:
+                outcomes["timeout"] += 1
+            except UpstreamError:
+                outcomes["error"] += 1
+        return outcomes
+
+    outcomes = asyncio.run(call_many())
+    stats = simulator.stats()["flaky"]
+    print(f"Outcomes: {outcomes}, stats: {stats}")
+    assert 520 < outcomes["ok"] < 680
+    assert 70 < stats["timeouts"] < 130 and 70 < stats["rate_limited"] < 130 and 160 < stats["errors"] < 240
+
+def test_simulated_open_food_facts():
+    simulator = UpstreamSimulator.from_specs({
+        "open_food_facts": {"latency": {"kind": "fixed", "seconds": 0.05}, "found_rate": 1.0},
+    })
+    client = OpenFoodFactsClient(http_client=SimulatedHTTPClient(simulator))
+
+    async def lookups():
+        return await asyncio.gather(*(client.get_product_by_barcode(str(1000 + i)) for i in range(20)))
+
+    start = time.perf_counter()
+    products = asyncio.run(lookups())
+    elapsed = time.perf_counter() - start
+    print(f"20 simulated lookups in {elapsed:.2f}s")
+    assert elapsed < 0.5 # Concurrent, no network
+    assert all(p and p["ingredients_text"] for p in products)
+    assert products[0] == asyncio.run(lookups())[0] # Deterministic catalog
+
+    # Rate limits come back as HTTP 429
+    simulator.services["open_food_facts"].rate_limit_rate = 1.0
+    status, data = asyncio.run(client.http_client.get_json("https://world.openfoodfacts.org/api/v0/product/1.json"))
+    assert status == 429 and data is None
+
+if __name__ == "__main__":
+    test_latency_models()
+    test_fault_injection()
+    test_simulated_open_food_facts()
+    print("Simulator tests passed!")
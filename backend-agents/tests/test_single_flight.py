@@ -0,0 +1,89 @@
+import asyncio
+import sys
+import os
+
+# Add the parent directory to the path so we can import the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.general_product import GeneralProductClient
+from app.services.single_flight import SingleFlight
+
+def test_single_flight():
+    async def run():
+        flight = SingleFlight()
+        upstream_calls = []
+
+        async def lookup():
+            upstream_calls.append(1)
+            await asyncio.sleep(0.1)
+            return {"product_name": "Nutella"}
+
+        callers = [asyncio.ensure_future(flight.do("3017620422003", lookup)) for _ in range(50)]
+        await asyncio.sleep(0.01)
+        callers[0].cancel() # One impatient user must not cancel the lookup for the others
+
+        results = await asyncio.gather(*callers, return_exceptions=True)
+        assert isinstance(results[0], asyncio.CancelledError)
+        assert all(r == {"product_name": "Nutella"} for r in results[1:])
+        assert len(upstream_calls) == 1
+        print(f"Single-flight stats: {flight.stats()}")
+        assert flight.stats() == {"calls": 50, "coalesced": 49, "cancelled": 0, "in_flight": 0}
+
+    asyncio.run(run())
+
+def test_abandoned_call_cancelled():
+    async def run():
+        flight = SingleFlight()
+        finished = []
+
+        async def lookup():
+            await asyncio.sleep(0.1)
+            finished.append(1)
+
+        callers = [asyncio.ensure_future(flight.do("3017620422003", lookup)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        for caller in callers: # The last caller going away stops the upstream call
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0.15)
+        assert finished == []
+        assert flight.stats() == {"calls": 3, "coalesced": 2, "cancelled": 1, "in_flight": 0}
+
+    asyncio.run(run())
+
+def test_caller_after_cancel_starts_afresh():
+    async def run():
+        flight = SingleFlight()
+        upstream_calls = []
+
+        async def lookup():
+            upstream_calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"product_name": "Nutella"}
+
+        first = asyncio.ensure_future(flight.do("3017620422003", lookup))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        # Arrives as the only caller leaves, before the abandoned call has wound down: it must not join it
+        second = asyncio.ensure_future(flight.do("3017620422003", lookup))
+        results = await asyncio.gather(first, second, return_exceptions=True)
+        assert isinstance(results[0], asyncio.CancelledError)
+        assert results[1] == {"product_name": "Nutella"} and len(upstream_calls) == 2
+        assert flight.stats() == {"calls": 2, "coalesced": 0, "cancelled": 1, "in_flight": 0}
+
+    asyncio.run(run())
+
+def test_general_client_coalescing():
+    async def run():
+        client = GeneralProductClient()
+        results = await asyncio.gather(*[client.get_product_by_barcode("8806085081111") for _ in range(20)])
+        assert all(r["product_name"] == "Sony WH-1000XM5 Wireless Headphones" for r in results)
+        assert client.single_flight.coalesced == 19
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    test_single_flight()
+    test_abandoned_call_cancelled()
+    test_caller_after_cancel_starts_afresh()
+    test_general_client_coalescing()
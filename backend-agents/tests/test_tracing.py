@@ -0,0 +1,89 @@
+import asyncio
+import json
+import sys
+import os
+import tempfile
+
+# Add the parent directory to the path so we can import the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.tracing import SPAN_KIND_CLIENT, BatchSpanProcessor, OTLPFileExporter, Tracer
+
+def read_spans(path):
+    spans = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            request = json.loads(line)
+            for resource_spans in request["resourceSpans"]:
+                for scope_spans in resource_spans["scopeSpans"]:
+                    spans.extend(scope_spans["spans"])
+    return {span["name"]: span for span in spans}
+
+def test_spans_exported_as_otlp():
+    path = os.path.join(tempfile.mkdtemp(), "traces.otlp.jsonl")
+    tracer = Tracer(BatchSpanProcessor(OTLPFileExporter(path), batch_size=2, flush_interval=0.05), sample_ratio=1.0)
+
+    async def agent(name):
+        with tracer.span(f"agent {name}", agent=name) as span:
+            with tracer.span("GET open_food_facts", kind=SPAN_KIND_CLIENT, upstream="open_food_facts") as upstream:
+                await asyncio.sleep(0.01)
+                upstream.set_attribute("http.status_code", 200)
+            span.set_attribute("outcome", "ok")
+
+    async def failing():
+        with tracer.span("agent Judge"):
+            raise ValueError("boom")
+
+    async def request():
+        tracer.start()
+        with tracer.span("analysis", barcode="123") as root:
+            # Tasks inherit the current span, like the scheduler's agent tasks
+            await asyncio.gather(asyncio.create_task(agent("Researcher")), asyncio.create_task(agent("Bio-Shield")))
+            try:
+                await failing()
+            except ValueError:
+                pass
+            root.set_attribute("cache_hit", False)
+        await tracer.shutdown()
+
+    asyncio.run(request())
+    spans = read_spans(path)
+    print(json.dumps(spans, indent=2))
+
+    root = spans["analysis"]
+    assert "parentSpanId" not in root
+    assert {"key": "barcode", "value": {"stringValue": "123"}} in root["attributes"]
+    assert {"key": "cache_hit", "value": {"boolValue": False}} in root["attributes"]
+    assert spans["agent Researcher"]["parentSpanId"] == root["spanId"]
+    assert all(span["traceId"] == root["traceId"] for span in spans.values())
+    assert spans["GET open_food_facts"]["kind"] == SPAN_KIND_CLIENT
+    assert {"key": "http.status_code", "value": {"intValue": "200"}} in spans["GET open_food_facts"]["attributes"]
+    assert spans["agent Judge"]["status"] == {"code": 2, "message": "ValueError: boom"}
+    assert tracer.stats()["spans"]["exported"] == 6
+
+def test_sampling():
+    path = os.path.join(tempfile.mkdtemp(), "traces.otlp.jsonl")
+    tracer = Tracer(BatchSpanProcessor(OTLPFileExporter(path)), sample_ratio=0.25, seed=7)
+
+    async def requests():
+        for _ in range(200):
+            with tracer.span("analysis"):
+                with tracer.span("agent Judge"):
+                    pass
+        await tracer.shutdown()
+
+    asyncio.run(requests())
+    stats = tracer.stats()
+    print(stats)
+    # Sampled per trace: a child span is recorded only with its root
+    assert 20 < stats["traces_sampled"] < 80
+    assert stats["spans"]["exported"] == 2 * stats["traces_sampled"]
+
+    disabled = Tracer(None, sample_ratio=1.0)
+    assert not disabled.enabled
+    with disabled.span("analysis") as span:
+        span.set_attribute("cache_hit", True)
+
+if __name__ == "__main__":
+    test_spans_exported_as_otlp()
+    test_sampling()